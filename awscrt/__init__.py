@@ -11,4 +11,4 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
-__all__ = ['io', 'mqtt', 'crypto', 'http']
+__all__ = ['io', 'mqtt', 'crypto', 'http', 'transfer', 'memory']
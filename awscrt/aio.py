@@ -0,0 +1,566 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+asyncio flavored versions of the http and mqtt APIs.
+
+Instead of concurrent.futures.Future, everything here returns asyncio.Future objects that are completed directly on
+the event loop that issued the call. Completions coming from CRT event-loop threads are queued and handed to the
+asyncio loop with a single call_soon_threadsafe() per batch, so a burst of completions costs one loop wakeup.
+
+This module is python 3 only.
+"""
+
+import _aws_crt_python
+import asyncio
+from collections import deque
+import threading
+import weakref
+from awscrt import http, mqtt
+from awscrt.io import ClientBootstrap, TlsConnectionOptions, SocketOptions
+
+
+class _LoopCompleter(object):
+    """
+    Runs functions on an asyncio loop on behalf of CRT threads, batching everything that arrives before the loop
+    gets around to draining the queue.
+    """
+    __slots__ = ('_loop', '_lock', '_pending', '_scheduled', '__weakref__')
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pending = []
+        self._scheduled = False
+
+    def post(self, fn, *args):
+        with self._lock:
+            self._pending.append((fn, args))
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        self._loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._scheduled = False
+
+        for fn, args in pending:
+            fn(*args)
+
+
+_completers = weakref.WeakKeyDictionary()
+_completers_lock = threading.Lock()
+
+
+def _get_completer(loop):
+    with _completers_lock:
+        completer = _completers.get(loop)
+        if completer is None:
+            completer = _LoopCompleter(loop)
+            _completers[loop] = completer
+        return completer
+
+
+def _get_loop(loop):
+    return loop if loop is not None else asyncio.get_event_loop()
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
+
+
+class _AsyncQueue(object):
+    """
+    Unbounded queue fed from CRT threads (through a _LoopCompleter) and consumed with `async for`.
+    Only touched from the loop thread.
+    """
+    __slots__ = ('_loop', '_items', '_waiter', '_finished', '_exception')
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._items = deque()
+        self._waiter = None
+        self._finished = False
+        self._exception = None
+
+    def _put(self, item):
+        if self._finished:
+            return
+        self._items.append(item)
+        self._wake()
+
+    def _finish(self, exception=None):
+        if self._finished:
+            return
+        self._finished = True
+        self._exception = exception
+        self._wake()
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            self._complete_next(waiter)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = self._loop.create_future()
+        if self._items or self._finished:
+            self._complete_next(future)
+        else:
+            self._waiter = future
+        return future
+
+    def _complete_next(self, future):
+        if future.done():
+            return
+        if self._items:
+            future.set_result(self._items.popleft())
+        elif self._exception is not None:
+            future.set_exception(self._exception)
+        else:
+            future.set_exception(StopAsyncIteration())
+
+
+class _AsyncBodyReader(object):
+    """
+    Async iterator over a response body held natively (incoming_body_stream_capacity). Reads never block the loop:
+    when nothing is buffered, the CRT thread wakes the reader up through the loop's completer once data or
+    completion arrives. Only touched from the loop thread.
+    """
+    __slots__ = ('_request', '_chunk_size', '_waiter', '_exception')
+
+    def __init__(self, request, chunk_size):
+        self._request = request
+        self._chunk_size = chunk_size
+        self._waiter = None
+        self._exception = None
+
+    def _on_available(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            self._complete_next(waiter)
+
+    def _finish(self, exception=None):
+        # the native side reports the end of the body itself, this only matters if the request never started
+        if self._request._stream is None:
+            self._exception = exception
+        self._on_available()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = self._request._loop.create_future()
+        self._complete_next(future)
+        return future
+
+    def _complete_next(self, future):
+        if future.done():
+            return
+
+        if self._request._stream is None:
+            future.set_exception(self._exception if self._exception is not None else StopAsyncIteration())
+            return
+
+        try:
+            chunk = _aws_crt_python.aws_py_http_client_stream_read(self._request._stream, self._chunk_size, False)
+        except Exception as e:
+            future.set_exception(e)
+            return
+
+        if chunk is None:
+            self._waiter = future
+        elif chunk:
+            future.set_result(chunk)
+        else:
+            future.set_exception(StopAsyncIteration())
+
+
+class HttpClientConnection(http.HttpClientConnection):
+    """
+    asyncio version of awscrt.http.HttpClientConnection.
+    """
+    __slots__ = ('_loop',)
+
+    def __init__(self, bootstrap, on_connection_shutdown, tls_connection_options, loop, initial_window_size=None):
+        super(HttpClientConnection, self).__init__(bootstrap, on_connection_shutdown, tls_connection_options,
+                                                   initial_window_size)
+        self._loop = loop
+
+    @staticmethod
+    def new_connection(bootstrap, host_name, port, socket_options,
+                       on_connection_shutdown=None, tls_connection_options=None, loop=None, initial_window_size=None):
+        """
+        Same as awscrt.http.HttpClientConnection.new_connection(), but returns an asyncio.Future belonging to loop
+        (the current event loop by default). on_connection_shutdown is still invoked from a CRT thread.
+        initial_window_size is as for awscrt.http, and is required for make_request(incoming_body_stream_capacity=...).
+        """
+        assert isinstance(bootstrap, ClientBootstrap)
+        assert tls_connection_options is None or isinstance(tls_connection_options, TlsConnectionOptions)
+        assert host_name is not None
+        assert port is not None
+        assert socket_options is not None and isinstance(socket_options, SocketOptions)
+        assert initial_window_size is None or initial_window_size >= 0
+
+        loop = _get_loop(loop)
+        completer = _get_completer(loop)
+        future = loop.create_future()
+        connection = HttpClientConnection(bootstrap, on_connection_shutdown, tls_connection_options, loop,
+                                          initial_window_size)
+
+        def on_setup(native_handle, error_code):
+            if error_code == 0:
+                connection._native_handle = native_handle
+                _set_result(future, connection)
+            else:
+                _set_exception(future, http.CrtError(error_code, "Error during connect: err={}".format(error_code)))
+
+        def on_connection_setup_native_cb(native_handle, error_code):
+            completer.post(on_setup, native_handle, error_code)
+
+        try:
+            if tls_connection_options is not None:
+                internal_conn_options_handle = tls_connection_options._internal_tls_conn_options
+            else:
+                internal_conn_options_handle = None
+
+            _aws_crt_python.aws_py_http_client_connection_create(bootstrap._internal_bootstrap,
+                                                                 on_connection_setup_native_cb,
+                                                                 connection._on_connection_shutdown,
+                                                                 host_name,
+                                                                 port,
+                                                                 socket_options,
+                                                                 internal_conn_options_handle,
+                                                                 initial_window_size)
+
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def make_request(self, method, uri_str, outgoing_headers, on_outgoing_body=None,
+                     incoming_body_min_chunk_size=None, incoming_body_max_delay_ms=None,
+                     incoming_body_stream_capacity=None, decode_content=False, first_byte_timeout_ms=None,
+                     total_timeout_ms=None):
+        """
+        Same as awscrt.http.HttpClientConnection.make_request(), but the returned HttpRequest has asyncio futures
+        and delivers the response body through `async for chunk in request.body`.
+        on_outgoing_body is still invoked from a CRT thread. As for awscrt.http, it may instead be an
+        OutgoingBodySource, a bytes-like object or a file object, which is read natively.
+        incoming_body_min_chunk_size and incoming_body_max_delay_ms coalesce body chunks as they do for
+        awscrt.http, which also means fewer hand-offs to the event loop.
+        With incoming_body_stream_capacity, request.body is instead read out of a bounded native buffer as the
+        consumer iterates, and the server is only let to send more as it does (see awscrt.http). The connection
+        must have an initial_window_size no larger than the capacity.
+        decode_content decompresses gzip/deflate response bodies natively, as it does for awscrt.http.
+        first_byte_timeout_ms and total_timeout_ms are native deadlines, see awscrt.http. Prefer them to
+        asyncio.wait_for(), which gives up waiting but leaves the request running.
+        """
+        outgoing_body_source = None
+        if on_outgoing_body is not None and not callable(on_outgoing_body):
+            outgoing_body_source = http.OutgoingBodySource._from_body(on_outgoing_body)
+            on_outgoing_body = None
+            outgoing_headers = outgoing_body_source._add_content_length(outgoing_headers)
+
+        if decode_content and not any(name.lower() == 'accept-encoding' for name in outgoing_headers):
+            outgoing_headers = dict(outgoing_headers)
+            outgoing_headers['accept-encoding'] = 'gzip, deflate'
+
+        request = HttpRequest(self, method, uri_str, outgoing_headers, on_outgoing_body, self._loop,
+                              incoming_body_min_chunk_size, incoming_body_max_delay_ms,
+                              incoming_body_stream_capacity, decode_content, first_byte_timeout_ms,
+                              total_timeout_ms, outgoing_body_source)
+        completer = _get_completer(self._loop)
+
+        def on_completed(error_code):
+            if error_code == 0:
+                _set_result(request.response_completed, error_code)
+                request.body._finish()
+            else:
+                exception = http.CrtError(error_code)
+                _set_exception(request.response_completed, exception)
+                request.body._finish(exception)
+
+        def on_headers_received(headers, response_code, has_body):
+            request.response_headers = http.HttpHeaders(headers)
+            request.response_code = response_code
+            request.has_response_body = has_body
+            _set_result(request.response_headers_received, response_code)
+
+        def on_stream_completed(error_code):
+            if outgoing_body_source is not None:
+                outgoing_body_source._close()
+            completer.post(on_completed, error_code)
+
+        def on_incoming_headers_received(headers, response_code, has_body):
+            completer.post(on_headers_received, headers, response_code, has_body)
+
+        try:
+            request._stream = _aws_crt_python.aws_py_http_client_connection_make_request(self._native_handle,
+                                                                                         request,
+                                                                                         on_stream_completed,
+                                                                                         on_incoming_headers_received)
+
+        except Exception as e:
+            if outgoing_body_source is not None:
+                outgoing_body_source._close()
+            request.response_headers_received.set_exception(e)
+            request.response_completed.set_exception(e)
+            request.body._finish(e)
+
+        return request
+
+
+class HttpRequest(http.HttpRequest):
+    """
+    asyncio version of awscrt.http.HttpRequest. response_headers_received and response_completed are
+    asyncio.Futures, and the response body is an async iterator of bytes: `async for chunk in request.body`.
+    """
+    __slots__ = ('body', '_loop')
+
+    def __init__(self, connection, method, path_and_query, outgoing_headers, on_read_body, loop,
+                 incoming_body_min_chunk_size=None, incoming_body_max_delay_ms=None,
+                 incoming_body_stream_capacity=None, decode_content=False, first_byte_timeout_ms=None,
+                 total_timeout_ms=None, outgoing_body_source=None):
+        completer = _get_completer(loop)
+        on_incoming_body = None
+
+        if incoming_body_stream_capacity is None:
+            body = _AsyncQueue(loop)
+
+            def on_incoming_body(chunk):
+                completer.post(body._put, chunk)
+        else:
+            body = _AsyncBodyReader(self, min(incoming_body_stream_capacity, 64 * 1024))
+
+        super(HttpRequest, self).__init__(connection, method, path_and_query, outgoing_headers, on_read_body,
+                                          on_incoming_body,
+                                          outgoing_body_source=outgoing_body_source,
+                                          incoming_body_min_chunk_size=incoming_body_min_chunk_size,
+                                          incoming_body_max_delay_ms=incoming_body_max_delay_ms,
+                                          incoming_body_stream_capacity=incoming_body_stream_capacity,
+                                          decode_content=decode_content,
+                                          first_byte_timeout_ms=first_byte_timeout_ms,
+                                          total_timeout_ms=total_timeout_ms)
+        self._loop = loop
+        self.body = body
+        self.response_completed = loop.create_future()
+        self.response_headers_received = loop.create_future()
+
+        if incoming_body_stream_capacity is not None:
+            def on_incoming_body_available():
+                completer.post(body._on_available)
+
+            self._on_incoming_body_available = on_incoming_body_available
+
+
+class MessageStream(_AsyncQueue):
+    """
+    Async iterator of (topic, payload) tuples received on a subscription made with Connection.subscribe_stream().
+    """
+    __slots__ = ()
+
+    def close(self):
+        """
+        Ends iteration. This does not unsubscribe, use Connection.unsubscribe() for that.
+        """
+        self._finish()
+
+
+class Connection(mqtt.Connection):
+    """
+    asyncio version of awscrt.mqtt.Connection. Every method that returns a future returns an asyncio.Future
+    belonging to loop (the current event loop by default). on_connection_interrupted, on_connection_resumed and
+    subscribe() callbacks are still invoked from a CRT thread.
+    """
+    __slots__ = ('_loop', '_completer')
+
+    def __init__(self,
+            client,
+            on_connection_interrupted=None,
+            on_connection_resumed=None,
+            reconnect_min_timeout_sec=5.0,
+            reconnect_max_timeout_sec=60.0,
+            loop=None):
+        super(Connection, self).__init__(client, on_connection_interrupted, on_connection_resumed,
+                                         reconnect_min_timeout_sec, reconnect_max_timeout_sec)
+        self._loop = _get_loop(loop)
+        self._completer = _get_completer(self._loop)
+
+    def connect(self,
+            client_id,
+            host_name, port,
+            use_websocket=False,
+            clean_session=True, keep_alive=0,
+            ping_timeout=0,
+            will=None,
+            username=None, password=None,
+            connect_timeout_sec=5.0):
+        """
+        Connects to host_name and port, see mqtt.Connection.connect(). The future's result is a dict with
+        session_present.
+        """
+        future = self._loop.create_future()
+
+        def on_connected(error_code, return_code, session_present):
+            if error_code == 0 and return_code == 0:
+                _set_result(future, dict(session_present=session_present))
+            else:
+                _set_exception(future,
+                               Exception("Error during connect: err={} rc={}".format(error_code, return_code)))
+
+        def on_connect(error_code, return_code, session_present):
+            self._completer.post(on_connected, error_code, return_code, session_present)
+
+        try:
+            self._native_connect(client_id, host_name, port, use_websocket, keep_alive, ping_timeout, will, username,
+                                 password, on_connect)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def reconnect(self):
+        """
+        Reconnects with the settings of the last connect(). The future's result is a dict with session_present.
+        """
+        future = self._loop.create_future()
+
+        def on_connected(error_code, return_code, session_present):
+            if error_code == 0 and return_code == 0:
+                _set_result(future, dict(session_present=session_present))
+            else:
+                _set_exception(future, Exception("Error during reconnect"))
+
+        def on_connect(error_code, return_code, session_present):
+            self._completer.post(on_connected, error_code, return_code, session_present)
+
+        try:
+            _aws_crt_python.aws_py_mqtt_client_connection_reconnect(self._internal_connection, on_connect)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def disconnect(self):
+        """
+        Disconnects, the future completes once the connection is closed.
+        """
+        future = self._loop.create_future()
+
+        def on_disconnect():
+            self._completer.post(_set_result, future, dict())
+
+        try:
+            _aws_crt_python.aws_py_mqtt_client_connection_disconnect(self._internal_connection, on_disconnect)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def subscribe(self, topic, qos, callback):
+        """
+        Subscribes to topic and returns (future, packet_id). The future's result is a dict with packet_id, topic and
+        qos once the server acknowledges. callback, with signature (topic, message), is invoked from a CRT thread.
+        Use subscribe_stream() to receive messages on the asyncio loop instead.
+        """
+        future = self._loop.create_future()
+        packet_id = 0
+
+        def suback(packet_id, topic, qos):
+            self._completer.post(_set_result, future, dict(
+                packet_id=packet_id,
+                topic=topic,
+                qos=mqtt.QoS(qos),
+            ))
+
+        try:
+            packet_id = self._native_subscribe(topic, qos, callback, suback)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future, packet_id
+
+    def subscribe_stream(self, topic, qos):
+        """
+        Subscribes to topic and returns (future, packet_id, stream). The future completes with the same dict as
+        subscribe(). stream is a MessageStream: `async for topic, payload in stream`.
+        """
+        stream = MessageStream(self._loop)
+        completer = self._completer
+
+        def on_message(topic, payload):
+            completer.post(stream._put, (topic, payload))
+
+        def on_suback(suback_future):
+            if suback_future.cancelled():
+                stream._finish()
+            elif suback_future.exception() is not None:
+                stream._finish(suback_future.exception())
+
+        future, packet_id = self.subscribe(topic, qos, on_message)
+        future.add_done_callback(on_suback)
+        return future, packet_id, stream
+
+    def unsubscribe(self, topic):
+        """
+        Unsubscribes from topic and returns (future, packet_id). The future's result is a dict with packet_id.
+        """
+        future = self._loop.create_future()
+        packet_id = 0
+
+        def unsuback(packet_id):
+            self._completer.post(_set_result, future, dict(
+                packet_id=packet_id
+            ))
+
+        try:
+            packet_id = self._native_unsubscribe(topic, unsuback)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future, packet_id
+
+    def publish(self, topic, payload, qos, retain=False):
+        """
+        Publishes payload to topic and returns (future, packet_id). The future's result is a dict with packet_id,
+        once the message is sent for QoS 0 or acknowledged otherwise.
+        """
+        future = self._loop.create_future()
+        packet_id = 0
+
+        def puback(packet_id):
+            self._completer.post(_set_result, future, dict(
+                packet_id=packet_id
+            ))
+
+        try:
+            packet_id = self._native_publish(topic, payload, qos, retain, puback)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future, packet_id
@@ -12,19 +12,64 @@
 # permissions and limitations under the License.
 
 import _aws_crt_python
-from concurrent.futures import Future
+from collections import deque
+from concurrent.futures import Future, TimeoutError
 from enum import IntEnum
-from awscrt.io import ClientBootstrap, TlsConnectionOptions, SocketOptions
+import os
+import random
+import threading
+import time
+from awscrt.io import ClientBootstrap, ServerBootstrap, TlsConnectionOptions, SocketOptions
+
+# time.monotonic() doesn't exist in python 2
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+def _claim_future(future):
+    """
+    Returns True if the caller gets to complete future, False if it was cancelled or someone else got there first.
+    """
+    if future.done():
+        return False
+
+    try:
+        return future.set_running_or_notify_cancel()
+    except RuntimeError:
+        return False
+
+
+class CrtError(Exception):
+    """
+    A connection or request failed inside the CRT. error_code is the CRT error code.
+    """
+
+    def __init__(self, error_code, message=None):
+        super(CrtError, self).__init__(error_code if message is None else message)
+        self.error_code = error_code
+
+    def error_name(self):
+        """
+        Returns the symbolic name of error_code, such as 'AWS_IO_SOCKET_TIMEOUT'.
+        """
+        return _aws_crt_python.aws_py_get_error_name(self.error_code)
+
+
+def is_content_encoding_available():
+    """
+    Returns True if the native module can gzip/deflate http bodies (decode_content and compress_outgoing_body).
+    """
+    return _aws_crt_python.aws_py_http_is_content_encoding_available()
 
 
 class HttpClientConnection(object):
     """
     Represents an Http connection to a remote endpoint. Everything in this class is non-blocking.
     """
-    __slots__ = ('_bootstrap', '_tls_connection_options', '_on_connection_shutdown', '_native_handle')
+    __slots__ = ('_bootstrap', '_tls_connection_options', '_on_connection_shutdown', '_native_handle', '_pool',
+                 'initial_window_size')
 
     # don't call me, I'm private
-    def __init__(self, bootstrap, on_connection_shutdown, tls_connection_options):
+    def __init__(self, bootstrap, on_connection_shutdown, tls_connection_options, initial_window_size=None):
         assert isinstance(bootstrap, ClientBootstrap)
         assert tls_connection_options is None or isinstance(tls_connection_options, TlsConnectionOptions)
 
@@ -35,16 +80,22 @@ class HttpClientConnection(object):
         self._tls_connection_options = tls_connection_options
         self._on_connection_shutdown = on_connection_shutdown
         self._native_handle = None
+        self._pool = None
+        self.initial_window_size = initial_window_size
 
     @staticmethod
     def new_connection(bootstrap, host_name, port, socket_options,
-                       on_connection_shutdown=None, tls_connection_options=None):
+                       on_connection_shutdown=None, tls_connection_options=None, initial_window_size=None):
         """
         Initiates a new connection to host_name and port using socket_options and tls_connection_options if supplied.
         if tls_connection_options is None, then the connection will be attempted over plain-text.
         on_connection_shutdown will be invoked if the connection shuts-down while you still hold a reference to it.
         on_connection_shutdown takes a single argument of int type, to specify the shutdown reason.
 
+        initial_window_size is the number of response body bytes the connection will accept before its flow-control
+        window has to be opened again. None means unlimited. Set this together with make_request(manual_window=True)
+        to put an upper bound on how much of a response is buffered ahead of the application.
+
         returns a future where the result is a new instance to HttpClientConnection, once the connection has completed
         and is ready for use.
         """
@@ -53,15 +104,18 @@ class HttpClientConnection(object):
         assert port is not None
         assert socket_options is not None and isinstance(socket_options, SocketOptions)
 
+        assert initial_window_size is None or initial_window_size >= 0
+
         future = Future()
-        connection = HttpClientConnection(bootstrap, on_connection_shutdown, tls_connection_options)
+        connection = HttpClientConnection(bootstrap, on_connection_shutdown, tls_connection_options,
+                                          initial_window_size)
 
         def on_connection_setup_native_cb(native_handle, error_code):
             if error_code == 0:
                 connection._native_handle = native_handle
                 future.set_result(connection)
             else:
-                future.set_exception(Exception("Error during connect: err={}".format(error_code)))
+                future.set_exception(CrtError(error_code, "Error during connect: err={}".format(error_code)))
 
         try:
             if tls_connection_options is not None:
@@ -75,7 +129,8 @@ class HttpClientConnection(object):
                                                                  host_name,
                                                                  port,
                                                                  socket_options,
-                                                                 internal_conn_options_handle)
+                                                                 internal_conn_options_handle,
+                                                                 initial_window_size)
 
         except Exception as e:
             future.set_exception(e)
@@ -99,7 +154,32 @@ class HttpClientConnection(object):
 
         return False
 
-    def make_request(self, method, uri_str, outgoing_headers, on_outgoing_body, on_incoming_body):
+    def version(self):
+        """
+        Returns the HttpVersion the connection speaks. Only HTTP/1.x connections are supported by the CRT version
+        these bindings are built against, so if ALPN is used, offer 'http/1.1' rather than 'h2'.
+        """
+        if self._native_handle is not None:
+            return HttpVersion(_aws_crt_python.aws_py_http_client_connection_get_version(self._native_handle))
+
+        return HttpVersion.Unknown
+
+    def metrics(self):
+        """
+        Returns an HttpConnectionMetrics snapshot of how the connection was set up and what it has carried so far.
+        Every timing is None and every total 0 if the connection was never established.
+        """
+        if self._native_handle is not None:
+            return HttpConnectionMetrics(
+                _aws_crt_python.aws_py_http_client_connection_get_metrics(self._native_handle))
+
+        return HttpConnectionMetrics((0, 0, 0, 0, 0, 0, 0))
+
+    def make_request(self, method, uri_str, outgoing_headers, on_outgoing_body, on_incoming_body,
+                     incoming_body_delivery=None, incoming_body_buffer=None, incoming_body_sink=None,
+                     manual_window=False, incoming_body_min_chunk_size=None, incoming_body_max_delay_ms=None,
+                     incoming_body_stream_capacity=None, decode_content=False, compress_outgoing_body=False,
+                     first_byte_timeout_ms=None, total_timeout_ms=None):
         """
         path_and_query is the path and query portion
         of a URL. method is the http method (GET, PUT, etc...). outgoing_headers are the headers to send as part
@@ -109,8 +189,48 @@ class HttpClientConnection(object):
         (it's writable), and you signal the end of the stream by returning OutgoingHttpBodyState.Done for the first tuple
         argument. If you aren't done sending the body, the first tuple argument should be OutgoingHttpBodyState.InProgress
         The second tuple argument is the size of the data written to the memoryview.
+        Instead of a callback, on_outgoing_body may also be an OutgoingBodySource, a bytes-like object or a file object.
+        Those are streamed natively without calling into python, and a content-length header is added if missing.
+
+        on_incoming_body is invoked as the response body is received. By default it takes a single argument of
+        type bytes, incoming_body_delivery (see IncomingBodyDelivery) selects how the body is handed over instead.
+        incoming_body_buffer is the writable buffer (bytearray, memoryview, mmap...) to fill when using
+        IncomingBodyDelivery.Buffer.
+
+        incoming_body_sink is an IncomingBodySink the response body is written to natively, without calling into
+        python at all. Pass None for on_incoming_body when using a sink.
 
-        on_incoming_body is invoked as the response body is received. It takes a single argument of type bytes.
+        If manual_window is True, receiving body data does not re-open the flow-control window. The application must
+        call request.update_window(n) after it has consumed n bytes, or the server will stop sending once
+        initial_window_size bytes (see new_connection()) are outstanding.
+
+        incoming_body_min_chunk_size and incoming_body_max_delay_ms coalesce the body before it reaches
+        on_incoming_body. Data is collected natively and delivered once at least incoming_body_min_chunk_size bytes
+        are buffered, or once the oldest buffered byte is incoming_body_max_delay_ms old, whichever comes first.
+        Anything left is delivered before the request completes. Either may be None to disable that trigger.
+        This trades a little latency for far fewer trips into python when the body arrives in small pieces.
+        With manual_window, keep incoming_body_min_chunk_size below the window or set a delay as well.
+
+        If incoming_body_stream_capacity is set, the body is pulled rather than pushed: it is kept natively in a
+        buffer of that many bytes and read with request.read() or request.iter_body(), from any thread and at any
+        pace. The flow-control window is only reopened as data is read, which is what keeps the buffer within its
+        capacity, so the connection must have been made with an initial_window_size no larger than it. The buffer
+        never grows: should more arrive than fits, the request fails. Pass None for
+        on_incoming_body when using this. It can't be combined with decode_content: reads reopen the window by the
+        bytes they take, and decoded bytes aren't the bytes that came off the wire.
+
+        If decode_content is True, 'accept-encoding: gzip, deflate' is sent unless outgoing_headers already has an
+        accept-encoding, and a gzip or deflate encoded response body is decompressed natively as it arrives, before
+        it reaches on_incoming_body, a sink or a stream. response_headers are left as received, so content-length
+        describes the encoded body. Flow-control windows still count bytes as they came off the wire.
+        If compress_outgoing_body is True, the body from an OutgoingBodySource is gzipped natively before the request
+        is sent and 'content-encoding: gzip' is added. The compressed body is held in memory so its length is known.
+        Both need is_content_encoding_available().
+
+        first_byte_timeout_ms and total_timeout_ms are deadlines, counted from now, for the response to start
+        arriving and for the whole request to complete. They are enforced by timers on the connection's event loop
+        group: a request that misses one fails with AWS_IO_SOCKET_TIMEOUT and its connection is closed, freeing
+        everything the request held. Either may be None for no deadline.
 
         Makes an Http request. When the headers from the response are received, the returned
         HttpRequest.response_headers_received future will have a result.
@@ -118,19 +238,62 @@ class HttpClientConnection(object):
         After this future completes, you can get the result of request.response_completed,
         for the remainder of the response.
         """
-        request = HttpRequest(self, method, uri_str, outgoing_headers, on_outgoing_body, on_incoming_body)
+        outgoing_body_source = None
+        if on_outgoing_body is not None and not callable(on_outgoing_body):
+            outgoing_body_source = OutgoingBodySource._from_body(on_outgoing_body)
+            on_outgoing_body = None
+            if compress_outgoing_body:
+                # the native side fills in the length once the body is compressed
+                outgoing_headers = dict((name, value) for name, value in outgoing_headers.items()
+                                        if name.lower() not in ('content-length', 'content-encoding'))
+            else:
+                outgoing_headers = outgoing_body_source._add_content_length(outgoing_headers)
+
+        assert not compress_outgoing_body or outgoing_body_source is not None, \
+            "compress_outgoing_body needs a body that isn't a callback"
+
+        if decode_content and not any(name.lower() == 'accept-encoding' for name in outgoing_headers):
+            outgoing_headers = dict(outgoing_headers)
+            outgoing_headers['accept-encoding'] = 'gzip, deflate'
+
+        request = HttpRequest(self, method, uri_str, outgoing_headers, on_outgoing_body, on_incoming_body,
+                              incoming_body_delivery, incoming_body_buffer, incoming_body_sink, outgoing_body_source,
+                              manual_window, incoming_body_min_chunk_size, incoming_body_max_delay_ms,
+                              incoming_body_stream_capacity, decode_content, compress_outgoing_body,
+                              first_byte_timeout_ms, total_timeout_ms)
+        return self._start_request(request)
+
+    def _start_request(self, request, on_complete=None):
+        """
+        Starts the native stream for request. Progress is reported through the request's futures, or if on_complete
+        is given, by calling on_complete(request, error_code) once the request is done and no futures are made.
+        In that case a request that fails to start raises instead.
+        """
+        incoming_body_sink = request._incoming_body_sink
+        outgoing_body_source = request._outgoing_body_source
+        if on_complete is None:
+            request.response_completed = Future()
+            request.response_headers_received = Future()
 
         def on_stream_completed(error_code):
-            if error_code == 0:
+            if incoming_body_sink is not None:
+                incoming_body_sink._close()
+            if outgoing_body_source is not None:
+                outgoing_body_source._close()
+
+            if on_complete is not None:
+                on_complete(request, error_code)
+            elif error_code == 0:
                 request.response_completed.set_result(error_code)
             else:
-                request.response_completed.set_exception(Exception(error_code))
+                request.response_completed.set_exception(CrtError(error_code))
 
         def on_incoming_headers_received(headers, response_code, has_body):
-            request.response_headers = headers
+            request.response_headers = HttpHeaders(headers)
             request.response_code = response_code
             request.has_response_body = has_body
-            request.response_headers_received.set_result(response_code)
+            if on_complete is None:
+                request.response_headers_received.set_result(response_code)
 
         try:
             request._stream = _aws_crt_python.aws_py_http_client_connection_make_request(self._native_handle,
@@ -139,16 +302,781 @@ class HttpClientConnection(object):
                                                                                          on_incoming_headers_received)
 
         except Exception as e:
+            if incoming_body_sink is not None:
+                incoming_body_sink._close()
+            if outgoing_body_source is not None:
+                outgoing_body_source._close()
+            if on_complete is not None:
+                raise
             request.response_headers_received.set_exception(e)
+            request.response_completed.set_exception(e)
 
         return request
 
 
+class HttpClientConnectionManager(object):
+    """
+    Keeps a bounded pool of open HttpClientConnections per (host_name, port, tls_connection_options) so that
+    requests to the same endpoint can skip the DNS + TCP + TLS handshake. Everything in this class is non-blocking.
+
+    max_connections_per_endpoint bounds the number of connections (leased, idle and connecting) held per endpoint.
+    Once the bound is hit, acquire_connection() queues until a connection is released.
+    Connections that have sat idle for longer than max_idle_secs are closed and dropped from the pool.
+    acquire_connection() can be given a deadline, enforced by a timer on the bootstrap's event loop group.
+    With a retry_strategy, connection attempts that fail with a retryable error are retried after a backoff, and
+    it is the default for make_request().
+    """
+    __slots__ = ('_bootstrap', '_socket_options', 'max_connections_per_endpoint', 'max_idle_secs', 'retry_strategy',
+                 '_pools', '_lock', '_closed')
+
+    def __init__(self, bootstrap, socket_options, max_connections_per_endpoint=8, max_idle_secs=60.0,
+                 retry_strategy=None):
+        assert isinstance(bootstrap, ClientBootstrap)
+        assert socket_options is not None and isinstance(socket_options, SocketOptions)
+        assert max_connections_per_endpoint > 0
+        assert retry_strategy is None or isinstance(retry_strategy, RetryStrategy)
+
+        self._bootstrap = bootstrap
+        self._socket_options = socket_options
+        self.max_connections_per_endpoint = max_connections_per_endpoint
+        self.max_idle_secs = max_idle_secs
+        self.retry_strategy = retry_strategy
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire_connection(self, host_name, port, tls_connection_options=None, timeout_ms=None):
+        """
+        Returns a future where the result is an open HttpClientConnection to host_name and port.
+        An idle pooled connection is handed out if one is available, otherwise a new connection is made if the
+        endpoint is below max_connections_per_endpoint, otherwise the future completes once another caller
+        releases a connection for this endpoint.
+
+        If no connection has been handed out within timeout_ms, the future fails with TimeoutError and the caller
+        gives up its place in the queue. A connection that finishes connecting afterwards goes into the pool.
+
+        Pass the connection back with release_connection() when you are done with it. Do not close it yourself
+        unless it is unusable.
+        """
+        assert tls_connection_options is None or isinstance(tls_connection_options, TlsConnectionOptions)
+        assert host_name is not None
+        assert port is not None
+        assert timeout_ms is None or timeout_ms >= 0
+
+        key = (host_name, port, tls_connection_options)
+        with self._lock:
+            if self._closed:
+                future = Future()
+                future.set_exception(Exception("HttpClientConnectionManager is closed"))
+                return future
+
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _HttpConnectionPool(self, host_name, port, tls_connection_options)
+                self._pools[key] = pool
+
+        return pool.acquire(timeout_ms)
+
+    def make_request(self, host_name, port, method, path_and_query, outgoing_headers, body=None,
+                     tls_connection_options=None, retry_strategy=None, total_timeout_ms=None):
+        """
+        Sends a request on a pooled connection and returns a future whose result is an HttpResponse with the whole
+        body, tag is None. body is None or bytes-like, so that it can be sent again. total_timeout_ms is per attempt.
+
+        With a retry_strategy, by default the manager's, a request that fails with a retryable error or gets a
+        retryable status is sent again after a backoff, without any thread waiting. A retry_strategy other than the
+        manager's, which the pool already retries connecting with, also retries failures to get a connection.
+        The future completes with the last response, or fails with the last error (a CrtError for errors from the
+        CRT).
+        """
+        assert retry_strategy is None or isinstance(retry_strategy, RetryStrategy)
+
+        if retry_strategy is None:
+            retry_strategy = self.retry_strategy
+        future = Future()
+
+        def send(attempt):
+            def retry():
+                send(attempt + 1)
+
+            def on_connection(connection_future):
+                exception = connection_future.exception()
+                if exception is not None:
+                    # the pool has already retried connecting with the manager's strategy, but not with this one
+                    if retry_strategy is not None and retry_strategy is not self.retry_strategy:
+                        if retry_strategy.schedule_retry(attempt, retry, exception):
+                            return
+                    future.set_exception(exception)
+                    return
+
+                connection = connection_future.result()
+                chunks = []
+                try:
+                    request = connection.make_request(method, path_and_query, outgoing_headers, body, chunks.append,
+                                                      total_timeout_ms=total_timeout_ms)
+                except Exception as e:
+                    self.release_connection(connection)
+                    future.set_exception(e)
+                    return
+
+                def on_completed(completed):
+                    self.release_connection(connection)
+                    exception = completed.exception()
+                    response_code = None if exception is not None else request.response_code
+
+                    if retry_strategy is not None:
+                        if retry_strategy.schedule_retry(attempt, retry, exception, response_code):
+                            return
+                        if exception is None and not retry_strategy.is_retryable(response_code=response_code):
+                            retry_strategy.record_success()
+
+                    if exception is not None:
+                        future.set_exception(exception)
+                    else:
+                        future.set_result(HttpResponse((None, 0, response_code, request.response_headers._native,
+                                                        b''.join(chunks))))
+
+                request.response_completed.add_done_callback(on_completed)
+
+            self.acquire_connection(host_name, port, tls_connection_options).add_done_callback(on_connection)
+
+        send(0)
+        return future
+
+    def release_connection(self, connection):
+        """
+        Returns a connection obtained from acquire_connection() to its pool. Closed connections are dropped.
+        """
+        assert isinstance(connection, HttpClientConnection)
+        assert connection._pool is not None, "connection was not acquired from a HttpClientConnectionManager"
+
+        connection._pool.release(connection)
+
+    def reap_idle_connections(self):
+        """
+        Closes every pooled connection that has been idle for longer than max_idle_secs, or that is no longer open.
+        This also happens lazily on every acquire and release.
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+
+        for pool in pools:
+            pool.reap()
+
+    def close(self):
+        """
+        Closes all idle connections and fails all pending acquisitions. Connections that are currently leased are
+        closed when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            pools = list(self._pools.values())
+            self._pools.clear()
+
+        for pool in pools:
+            pool.close()
+
+
+class _HttpConnectionPool(object):
+    """
+    Connections for a single (host_name, port, tls_connection_options) endpoint of a HttpClientConnectionManager.
+    Futures are always completed outside of the lock, so callbacks are free to call back into the pool.
+    Once a future could have timed out, whoever completes it must win _claim_future() first.
+    """
+    __slots__ = ('_manager', '_host_name', '_port', '_tls_connection_options', '_idle', '_waiters',
+                 '_connection_count', '_lock', '_closed')
+
+    def __init__(self, manager, host_name, port, tls_connection_options):
+        self._manager = manager
+        self._host_name = host_name
+        self._port = port
+        self._tls_connection_options = tls_connection_options
+        # (connection, idle_since) pairs, most recently released last
+        self._idle = deque()
+        self._waiters = deque()
+        # leased + idle + connecting
+        self._connection_count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout_ms=None):
+        future = Future()
+        connection = None
+        should_connect = False
+        to_close = []
+
+        with self._lock:
+            if self._closed:
+                future.set_exception(Exception("HttpClientConnectionManager is closed"))
+                return future
+
+            to_close = self._reap_locked()
+
+            # reuse the warmest connection first
+            while self._idle:
+                candidate, _ = self._idle.pop()
+                if candidate.is_open():
+                    connection = candidate
+                    break
+                to_close.append(candidate)
+                self._connection_count -= 1
+
+            if connection is None:
+                if self._connection_count < self._manager.max_connections_per_endpoint:
+                    self._connection_count += 1
+                    should_connect = True
+                else:
+                    self._waiters.append(future)
+
+        for dead in to_close:
+            dead.close()
+
+        if connection is not None:
+            future.set_result(connection)
+            return future
+
+        if timeout_ms is not None:
+            def on_timeout():
+                self._on_acquire_timeout(future)
+
+            self._manager._bootstrap.elg.schedule(timeout_ms, on_timeout)
+
+        if should_connect:
+            self._connect(future)
+
+        return future
+
+    def release(self, connection):
+        waiter = None
+        should_connect = False
+        to_close = []
+
+        with self._lock:
+            if self._closed or not connection.is_open():
+                to_close.append(connection)
+                self._connection_count -= 1
+                # a slot just opened up, use it for whoever is waiting
+                if self._waiters and not self._closed:
+                    waiter = self._waiters.popleft()
+                    self._connection_count += 1
+                    should_connect = True
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+            else:
+                self._idle.append((connection, _monotonic()))
+                connection = None
+
+            to_close.extend(self._reap_locked())
+
+        for dead in to_close:
+            dead.close()
+
+        if should_connect:
+            self._connect(waiter)
+        elif waiter is not None:
+            if _claim_future(waiter):
+                waiter.set_result(connection)
+            else:
+                # the waiter gave up in the meantime, pass the connection on
+                self.release(connection)
+
+    def reap(self):
+        with self._lock:
+            to_close = self._reap_locked()
+
+        for dead in to_close:
+            dead.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            to_close = [connection for connection, _ in self._idle]
+            self._connection_count -= len(self._idle)
+            self._idle.clear()
+            waiters = list(self._waiters)
+            self._waiters.clear()
+
+        for dead in to_close:
+            dead.close()
+
+        for waiter in waiters:
+            if _claim_future(waiter):
+                waiter.set_exception(Exception("HttpClientConnectionManager is closed"))
+
+    def _on_acquire_timeout(self, future):
+        with self._lock:
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+
+        if _claim_future(future):
+            future.set_exception(TimeoutError("Timed out acquiring a connection to {}:{}".format(
+                self._host_name, self._port)))
+
+    def _reap_locked(self):
+        """
+        Removes idle connections that expired or died, returns them so they can be closed outside the lock.
+        """
+        reaped = []
+        max_idle_secs = self._manager.max_idle_secs
+        now = _monotonic()
+        kept = deque()
+        for connection, idle_since in self._idle:
+            if not connection.is_open() or (max_idle_secs is not None and now - idle_since > max_idle_secs):
+                reaped.append(connection)
+            else:
+                kept.append((connection, idle_since))
+
+        self._connection_count -= len(reaped)
+        self._idle = kept
+        return reaped
+
+    def _release_slot(self):
+        """
+        Gives up the slot of a connection that never came to be. If anyone is queued, the slot goes to the next
+        waiter that hasn't given up and a connection is made for it, so waiters fail one by one when the endpoint
+        is unreachable rather than waiting forever.
+        """
+        waiter = None
+        with self._lock:
+            self._connection_count -= 1
+            while self._waiters and not self._closed:
+                candidate = self._waiters.popleft()
+                if not candidate.done():
+                    waiter = candidate
+                    self._connection_count += 1
+                    break
+
+        if waiter is not None:
+            self._connect(waiter)
+
+    def _connect(self, future, attempt=0):
+        retry_strategy = self._manager.retry_strategy
+
+        def on_connection_setup(connection_future):
+            exception = connection_future.exception()
+            if exception is None:
+                connection = connection_future.result()
+                connection._pool = self
+                if retry_strategy is not None:
+                    retry_strategy.record_success()
+                if _claim_future(future):
+                    future.set_result(connection)
+                else:
+                    # nobody is waiting on it anymore, keep it for the next caller
+                    self.release(connection)
+                return
+
+            # the slot stays reserved while waiting to retry
+            if retry_strategy is not None and not future.done():
+                def retry():
+                    with self._lock:
+                        closed = self._closed
+                    if closed or future.done():
+                        self._release_slot()
+                        if _claim_future(future):
+                            future.set_exception(Exception("HttpClientConnectionManager is closed"))
+                        return
+                    self._connect(future, attempt + 1)
+
+                if retry_strategy.schedule_retry(attempt, retry, exception):
+                    return
+
+            self._release_slot()
+            if _claim_future(future):
+                future.set_exception(exception)
+
+        manager = self._manager
+        connect_future = HttpClientConnection.new_connection(manager._bootstrap, self._host_name, self._port,
+                                                             manager._socket_options,
+                                                             tls_connection_options=self._tls_connection_options)
+        connect_future.add_done_callback(on_connection_setup)
+
+
+class RetryStrategy(object):
+    """
+    Decides whether a failed connection or request is retried, and schedules the retry on elg (an EventLoopGroup)
+    so no thread sleeps. Share one strategy between everything calling the same service, so its token bucket bounds
+    the combined retry rate when the service is throttling or down.
+
+    Retries happen for CRT errors that mean the connection failed or went away, see RETRYABLE_ERROR_NAMES, and for
+    responses with a status in retryable_status_codes, up to max_retries times. Retry n, from 0, waits a random time
+    between 0 and min(max_backoff_ms, base_backoff_ms * 2**n) ("full jitter"), so clients that failed together
+    don't retry together.
+
+    Each retry takes retry_cost tokens from a bucket of max_tokens, or timeout_retry_cost for timeouts. Each success
+    puts success_refill tokens back. Once the bucket runs dry, failures go straight back to the caller.
+    """
+    __slots__ = ('_elg', 'max_retries', 'base_backoff_ms', 'max_backoff_ms', 'max_tokens', 'retry_cost',
+                 'timeout_retry_cost', 'success_refill', 'retryable_status_codes', '_tokens', '_lock', '_random')
+
+    RETRYABLE_ERROR_NAMES = frozenset([
+        'AWS_IO_SOCKET_TIMEOUT',
+        'AWS_IO_SOCKET_CONNECTION_REFUSED',
+        'AWS_IO_SOCKET_CLOSED',
+        'AWS_IO_SOCKET_NOT_CONNECTED',
+        'AWS_IO_SOCKET_NETWORK_DOWN',
+        'AWS_IO_SOCKET_NO_ROUTE_TO_HOST',
+        'AWS_IO_BROKEN_PIPE',
+        'AWS_IO_DNS_QUERY_FAILED',
+        'AWS_IO_DNS_NO_ADDRESS_FOR_HOST',
+        'AWS_ERROR_HTTP_CONNECTION_CLOSED',
+        'AWS_ERROR_HTTP_SERVER_CLOSED',
+    ])
+    TIMEOUT_ERROR_NAMES = frozenset(['AWS_IO_SOCKET_TIMEOUT'])
+
+    def __init__(self, elg, max_retries=3, base_backoff_ms=25, max_backoff_ms=20000, max_tokens=500, retry_cost=5,
+                 timeout_retry_cost=10, success_refill=1, retryable_status_codes=(429, 500, 502, 503, 504)):
+        assert max_retries >= 0
+        assert base_backoff_ms >= 0 and max_backoff_ms >= 0
+        assert max_tokens >= 0 and retry_cost >= 0 and timeout_retry_cost >= 0 and success_refill >= 0
+
+        self._elg = elg
+        self.max_retries = max_retries
+        self.base_backoff_ms = base_backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.max_tokens = max_tokens
+        self.retry_cost = retry_cost
+        self.timeout_retry_cost = timeout_retry_cost
+        self.success_refill = success_refill
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def is_retryable(self, exception=None, response_code=None):
+        """
+        Returns True if exception, or else response_code, is worth retrying.
+        """
+        if exception is not None:
+            return isinstance(exception, CrtError) and exception.error_name() in self.RETRYABLE_ERROR_NAMES
+        return response_code in self.retryable_status_codes
+
+    def backoff_ms(self, attempt):
+        """
+        Returns a random delay before retry number attempt, from 0.
+        """
+        ceiling = min(self.max_backoff_ms, self.base_backoff_ms * (2 ** min(attempt, 62)))
+        return int(self._random.uniform(0, ceiling))
+
+    def available_tokens(self):
+        """
+        Returns how many tokens are left in the bucket.
+        """
+        return self._tokens
+
+    def record_success(self):
+        """
+        Puts success_refill tokens back into the bucket.
+        """
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.success_refill)
+
+    def schedule_retry(self, attempt, callback, exception=None, response_code=None):
+        """
+        If the failure of retry number attempt, from 0, described by exception or else response_code, should be
+        retried and the token bucket allows it, schedules callback, with no arguments, after the backoff and returns
+        True. Otherwise returns False and the caller should give up.
+        """
+        if attempt >= self.max_retries or not self.is_retryable(exception, response_code):
+            return False
+
+        cost = self.retry_cost
+        if exception is not None and exception.error_name() in self.TIMEOUT_ERROR_NAMES:
+            cost = self.timeout_retry_cost
+
+        with self._lock:
+            if self._tokens < cost:
+                return False
+            self._tokens -= cost
+
+        self._elg.schedule(self.backoff_ms(attempt), callback)
+        return True
+
+
+class HttpVersion(IntEnum):
+    Unknown = 0
+    Http1_0 = 1
+    Http1_1 = 2
+    Http2 = 3
+
+
 class OutgoingHttpBodyState(IntEnum):
     InProgress = 0
     Done = 1
 
 
+class IncomingBodyDelivery(IntEnum):
+    """
+    How on_incoming_body receives each chunk of the response body.
+
+    Bytes: on_incoming_body(bytes) with a copy of the chunk.
+    MemoryView: on_incoming_body(memoryview) with a read-only view of a copy of the chunk. The view is released as
+        soon as the callback returns, so copy anything you need to keep.
+    Buffer: the chunk is copied into the caller's incoming_body_buffer and on_incoming_body(int) is told how many
+        bytes, starting at offset 0, are valid. Chunks larger than the buffer are delivered over several calls.
+    """
+    Bytes = 0
+    MemoryView = 1
+    Buffer = 2
+
+
+class OutgoingBodySource(object):
+    """
+    A request body that native code streams from directly, without calling into python for each chunk.
+    Pass one to HttpClientConnection.make_request() as on_outgoing_body. length is the number of bytes that will be
+    sent, and is used as the request's content-length unless one is already set.
+    Any error reading from the source fails the request's response_completed future.
+    """
+    __slots__ = ('_fd', '_offset', '_buffer', '_owns_fd', 'length')
+
+    # don't call me, use one of the static factories
+    def __init__(self, length, fd=None, offset=None, buffer=None, owns_fd=False):
+        self.length = length
+        self._fd = fd
+        self._offset = offset
+        self._buffer = buffer
+        self._owns_fd = owns_fd
+
+    @staticmethod
+    def from_buffer(buffer, offset=0, length=None):
+        """
+        Sends the contents of a bytes-like object (bytes, bytearray, memoryview, mmap...), from offset for length
+        bytes, or to the end if length is None. The buffer must not be resized while the request is in flight.
+        """
+        if length is None:
+            view = memoryview(buffer)
+            length = getattr(view, 'nbytes', len(view)) - offset
+        return OutgoingBodySource(length, buffer=buffer, offset=offset)
+
+    @staticmethod
+    def from_file(path, offset=0, length=None):
+        """
+        Sends the file at path, from offset for length bytes, or to the end of the file if length is None.
+        The file is closed when the request completes.
+        """
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            if length is None:
+                length = os.fstat(fd).st_size - offset
+        except Exception:
+            os.close(fd)
+            raise
+        return OutgoingBodySource(length, fd=fd, offset=offset, owns_fd=True)
+
+    @staticmethod
+    def from_fd(fd, offset=None, length=None):
+        """
+        Sends from an already open file descriptor, or anything with a fileno() method. If offset is None, data is read
+        from the current file position, otherwise from offset without moving the file position. If length is None
+        everything up to the end of the file is sent. The caller keeps ownership of fd.
+        """
+        if not isinstance(fd, int):
+            fd = fd.fileno()
+        if length is None:
+            start = offset if offset is not None else os.lseek(fd, 0, os.SEEK_CUR)
+            length = os.fstat(fd).st_size - start
+        return OutgoingBodySource(length, fd=fd, offset=offset)
+
+    @staticmethod
+    def _from_body(body):
+        if isinstance(body, OutgoingBodySource):
+            return body
+        if hasattr(body, 'fileno'):
+            return OutgoingBodySource.from_fd(body)
+        return OutgoingBodySource.from_buffer(body)
+
+    def _add_content_length(self, headers):
+        for name in headers:
+            if name.lower() == 'content-length':
+                return headers
+
+        headers = dict(headers)
+        headers['content-length'] = str(self.length)
+        return headers
+
+    def _close(self):
+        if self._owns_fd and self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class IncomingBodySink(object):
+    """
+    A destination that the response body is written to by native code as it arrives, without taking the GIL or
+    calling into python. Pass one to HttpClientConnection.make_request() as incoming_body_sink.
+    Any error writing to the sink fails the request's response_completed future.
+
+    If statuses is given, the body is only written when the response status is one of them. The body of any other
+    response, such as an error page, is read and discarded so it can't overwrite what is already at the destination.
+    """
+    __slots__ = ('_fd', '_offset', '_buffer', '_owns_fd', '_statuses')
+
+    # don't call me, use one of the static factories
+    def __init__(self, fd=None, offset=None, buffer=None, owns_fd=False, statuses=None):
+        assert statuses is None or all(0 <= status < 600 for status in statuses)
+
+        self._fd = fd
+        self._offset = offset
+        self._buffer = buffer
+        self._owns_fd = owns_fd
+        self._statuses = tuple(statuses) if statuses is not None else None
+
+    @staticmethod
+    def from_file(path, offset=None, statuses=None):
+        """
+        Writes the body to the file at path. If offset is None the file is created or truncated and written from the
+        start, otherwise the existing file is written in place starting at offset.
+        The file is closed when the request completes.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if offset is None:
+            flags |= os.O_TRUNC
+        fd = os.open(path, flags, 0o644)
+        return IncomingBodySink(fd=fd, offset=offset, owns_fd=True, statuses=statuses)
+
+    @staticmethod
+    def from_fd(fd, offset=None, statuses=None):
+        """
+        Writes the body to an already open file descriptor, or anything with a fileno() method. If offset is None,
+        data is written at the current file position, otherwise at offset without moving the file position.
+        The caller keeps ownership of fd. Flush any python-level buffering on file objects before the request starts.
+        """
+        if not isinstance(fd, int):
+            fd = fd.fileno()
+        return IncomingBodySink(fd=fd, offset=offset, statuses=statuses)
+
+    @staticmethod
+    def from_buffer(buffer, offset=0, statuses=None):
+        """
+        Writes the body into a writable object supporting the buffer protocol (bytearray, mmap, memoryview...),
+        starting at offset. The request fails if the body doesn't fit.
+        """
+        return IncomingBodySink(buffer=buffer, offset=offset, statuses=statuses)
+
+    def _close(self):
+        if self._owns_fd and self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class HttpHeaders(object):
+    """
+    Read-only view of a block of headers, such as those of a response. The headers are kept natively in one packed
+    buffer; names and values are only turned into python strings when looked at. Lookups by name are
+    case-insensitive and a name may appear more than once. Iterating yields (name, value) tuples in the order they
+    were received.
+    """
+    __slots__ = ('_native')
+
+    def __init__(self, native):
+        self._native = native
+
+    @staticmethod
+    def from_dict(headers):
+        """
+        Returns an HttpHeaders holding a native copy of a dict of header names to values.
+        """
+        return HttpHeaders(_aws_crt_python.aws_py_http_headers_new_from_dict(headers))
+
+    def __len__(self):
+        return _aws_crt_python.aws_py_http_headers_len(self._native)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _aws_crt_python.aws_py_http_headers_get_index(self._native, i)
+
+    def __getitem__(self, name):
+        values = self.get_values(name)
+        if not values:
+            raise KeyError(name)
+        return values[0]
+
+    def __contains__(self, name):
+        return len(self.get_values(name)) > 0
+
+    def get(self, name, default=None):
+        """
+        Returns the first value for name, or default if there isn't one.
+        """
+        values = self.get_values(name)
+        return values[0] if values else default
+
+    def get_values(self, name):
+        """
+        Returns a list of every value for name, in the order they were received.
+        """
+        return _aws_crt_python.aws_py_http_headers_get_values(self._native, name)
+
+    def items(self):
+        """
+        Returns a list of every (name, value) tuple, including repeated names.
+        """
+        return list(self)
+
+    def keys(self):
+        """
+        Returns a list of every header name in the order received, with repeated names appearing more than once.
+        """
+        return [name for name, _ in self]
+
+
+def _metrics_time(ns):
+    return ns if ns else None
+
+
+class HttpConnectionMetrics(object):
+    """
+    Timings for an HttpClientConnection, in nanoseconds on the CRT's monotonic clock. They are only meaningful relative
+    to each other and to the HttpRequestMetrics of the connection's requests. Each is None until it has happened.
+
+    connect_start: new_connection() was called.
+    tls_negotiated: the TLS handshake finished, None for plain-text connections. DNS resolution, the TCP connect and
+        the handshake are not reported separately by the CRT, tls_negotiated - connect_start covers all three.
+    established: the connection was ready for requests.
+    closed: the connection shut down.
+    request_count, bytes_sent and bytes_received: totals over the completed requests, counting body bytes only.
+    """
+    __slots__ = ('connect_start', 'tls_negotiated', 'established', 'closed', 'request_count', 'bytes_sent',
+                 'bytes_received')
+
+    def __init__(self, native_metrics):
+        (connect_start, tls_negotiated, established, closed,
+         self.request_count, self.bytes_sent, self.bytes_received) = native_metrics
+        self.connect_start = _metrics_time(connect_start)
+        self.tls_negotiated = _metrics_time(tls_negotiated)
+        self.established = _metrics_time(established)
+        self.closed = _metrics_time(closed)
+
+
+class HttpRequestMetrics(object):
+    """
+    Timings for an HttpRequest, in nanoseconds on the same clock as HttpConnectionMetrics. Each is None until it has
+    happened.
+
+    request_made: make_request() was called.
+    request_sent: the last of the body was handed to the connection, request_made for requests without a body.
+    first_byte: the response started arriving. first_byte - request_sent is mostly network plus server time.
+    headers_done: the response headers were complete.
+    completed: the whole response was received, or the request failed.
+    bytes_sent: request body bytes. bytes_received: response body bytes as received, before any decoding.
+    python_time: total time spent in, and waiting for the GIL to run, python callbacks for this request. Compare it
+        with completed - first_byte to see what the application costs the transfer.
+    """
+    __slots__ = ('request_made', 'request_sent', 'first_byte', 'headers_done', 'completed', 'bytes_sent',
+                 'bytes_received', 'python_time')
+
+    def __init__(self, native_metrics):
+        (request_made, request_sent, first_byte, headers_done, completed,
+         self.bytes_sent, self.bytes_received, self.python_time) = native_metrics
+        self.request_made = _metrics_time(request_made)
+        self.request_sent = _metrics_time(request_sent)
+        self.first_byte = _metrics_time(first_byte)
+        self.headers_done = _metrics_time(headers_done)
+        self.completed = _metrics_time(completed)
+
+
 class HttpRequest(object):
     """
     Represents an HttpRequest to pass to HttpClientConnection.make_request(). path_and_query is the path and query portion
@@ -160,17 +1088,46 @@ class HttpRequest(object):
     argument. If you aren't done sending the body, the first tuple argument should be OutgoingHttpBodyState.InProgress
     The second tuple argument is the size of the data written to the memoryview.
 
-    on_incoming_body is invoked as the response body is received. It takes a single argument of type bytes.
+    on_incoming_body is invoked as the response body is received. By default it takes a single argument of type bytes,
+    see IncomingBodyDelivery for the alternatives.
     """
     __slots__ = ('_connection', 'path_and_query', 'method', 'outgoing_headers', '_on_read_body', '_on_incoming_body', '_stream',
                  'response_headers', 'response_code', 'has_response_body', 'response_headers_received',
-                 'response_completed')
+                 'response_completed', '_incoming_body_delivery', '_incoming_body_buffer', '_incoming_body_sink',
+                 '_outgoing_body_source', '_manual_window', '_incoming_body_min_chunk_size',
+                 '_incoming_body_max_delay_ms', '_incoming_body_stream_capacity', '_on_incoming_body_available',
+                 '_decode_content', '_compress_outgoing_body', '_first_byte_timeout_ms', '_total_timeout_ms',
+                 '_prepared_headers')
 
-    def __init__(self, connection, method, path_and_query, outgoing_headers, on_read_body, on_incoming_body):
+    def __init__(self, connection, method, path_and_query, outgoing_headers, on_read_body, on_incoming_body,
+                 incoming_body_delivery=None, incoming_body_buffer=None, incoming_body_sink=None,
+                 outgoing_body_source=None, manual_window=False, incoming_body_min_chunk_size=None,
+                 incoming_body_max_delay_ms=None, incoming_body_stream_capacity=None, decode_content=False,
+                 compress_outgoing_body=False, first_byte_timeout_ms=None, total_timeout_ms=None,
+                 prepared_headers=None):
         assert method is not None
         assert outgoing_headers is not None
         assert connection is not None and isinstance(connection, HttpClientConnection)
 
+        if incoming_body_delivery is None:
+            incoming_body_delivery = IncomingBodyDelivery.Bytes
+        assert isinstance(incoming_body_delivery, IncomingBodyDelivery)
+        assert incoming_body_delivery != IncomingBodyDelivery.Buffer or incoming_body_buffer is not None
+        assert incoming_body_sink is None or isinstance(incoming_body_sink, IncomingBodySink)
+        assert incoming_body_sink is None or on_incoming_body is None
+        assert incoming_body_min_chunk_size is None or incoming_body_min_chunk_size >= 0
+        assert incoming_body_max_delay_ms is None or incoming_body_max_delay_ms >= 0
+        assert incoming_body_stream_capacity is None or incoming_body_stream_capacity > 0
+        assert incoming_body_stream_capacity is None or (on_incoming_body is None and incoming_body_sink is None)
+        assert incoming_body_stream_capacity is None or not decode_content, \
+            "decode_content can't be used with incoming_body_stream_capacity"
+        assert incoming_body_stream_capacity is None or (
+            connection.initial_window_size is not None and
+            connection.initial_window_size <= incoming_body_stream_capacity), \
+            "incoming_body_stream_capacity needs a connection with an initial_window_size no larger than it"
+        assert first_byte_timeout_ms is None or first_byte_timeout_ms >= 0
+        assert total_timeout_ms is None or total_timeout_ms >= 0
+
         self.path_and_query = path_and_query
 
         if path_and_query is None:
@@ -181,9 +1138,326 @@ class HttpRequest(object):
         self.outgoing_headers = outgoing_headers
         self._on_read_body = on_read_body
         self._on_incoming_body = on_incoming_body
-        self.response_completed = Future()
-        self.response_headers_received = Future()
+        self._incoming_body_delivery = incoming_body_delivery
+        self._incoming_body_buffer = incoming_body_buffer
+        self._incoming_body_sink = incoming_body_sink
+        self._outgoing_body_source = outgoing_body_source
+        self._manual_window = manual_window
+        self._incoming_body_min_chunk_size = incoming_body_min_chunk_size
+        self._incoming_body_max_delay_ms = incoming_body_max_delay_ms
+        self._incoming_body_stream_capacity = incoming_body_stream_capacity
+        self._decode_content = decode_content
+        self._compress_outgoing_body = compress_outgoing_body
+        self._first_byte_timeout_ms = first_byte_timeout_ms
+        self._total_timeout_ms = total_timeout_ms
+        # native block of headers from a PreparedRequest, sent along with outgoing_headers, which override it by name
+        self._prepared_headers = prepared_headers
+        # set by awscrt.aio to hear about data arriving after a non-blocking read came up empty
+        self._on_incoming_body_available = None
+        # completion futures are attached by whoever issues the request
+        self.response_completed = None
+        self.response_headers_received = None
         self._stream = None
         self.response_headers = None
         self.response_code = None
         self.has_response_body = False
+
+    def update_window(self, increment_size):
+        """
+        Opens the flow-control window by increment_size bytes, allowing that much more of the response body to be
+        received. Only needed when the request was made with manual_window=True.
+        """
+        if self._stream is not None:
+            _aws_crt_python.aws_py_http_client_stream_update_window(self._stream, increment_size)
+
+    def metrics(self):
+        """
+        Returns an HttpRequestMetrics snapshot of the request's progress so far, or None if it never started.
+        """
+        if self._stream is None:
+            return None
+
+        return HttpRequestMetrics(_aws_crt_python.aws_py_http_client_stream_get_metrics(self._stream))
+
+    def read(self, max_size=64 * 1024):
+        """
+        Returns up to max_size bytes of the response body, blocking until some is available, or b'' once all of it
+        has been read. Raises if the request failed. Only for requests made with incoming_body_stream_capacity.
+        The GIL is released while waiting, and reading reopens the flow-control window by what was read.
+        """
+        if self._stream is None:
+            # the request never started, this raises why
+            self.response_completed.result()
+
+        return _aws_crt_python.aws_py_http_client_stream_read(self._stream, max_size, True)
+
+    def iter_body(self, chunk_size=64 * 1024):
+        """
+        Generator over the response body in pieces of up to chunk_size bytes, see read().
+        """
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class PreparedRequest(object):
+    """
+    The parts of a request that stay the same across many sends: the method, the common headers and the response
+    handling options. The headers are encoded natively once, here, instead of on every make_request().
+
+    Each make_request() only supplies what changes: the path, a small dict of outgoing_headers that are added to,
+    or replace by name, the prepared ones, and the body. If on_complete is given, it is called as
+    on_complete(request, error_code) when the request is done and the request gets no futures, which is the
+    cheapest way to send. Otherwise the request is the same as one from HttpClientConnection.make_request().
+    See HttpClientConnection.make_request() for the options.
+    """
+    __slots__ = ('method', 'outgoing_headers', '_prepared_headers', '_on_incoming_body', '_incoming_body_delivery',
+                 '_manual_window', '_incoming_body_min_chunk_size', '_incoming_body_max_delay_ms', '_decode_content',
+                 '_first_byte_timeout_ms', '_total_timeout_ms')
+
+    def __init__(self, method, outgoing_headers, on_incoming_body=None, incoming_body_delivery=None,
+                 manual_window=False, incoming_body_min_chunk_size=None, incoming_body_max_delay_ms=None,
+                 decode_content=False, first_byte_timeout_ms=None, total_timeout_ms=None):
+        assert method is not None
+        assert outgoing_headers is not None
+        assert incoming_body_delivery is None or isinstance(incoming_body_delivery, IncomingBodyDelivery)
+        assert incoming_body_delivery != IncomingBodyDelivery.Buffer, "the buffer can't be shared between requests"
+        assert incoming_body_min_chunk_size is None or incoming_body_min_chunk_size >= 0
+        assert incoming_body_max_delay_ms is None or incoming_body_max_delay_ms >= 0
+        assert first_byte_timeout_ms is None or first_byte_timeout_ms >= 0
+        assert total_timeout_ms is None or total_timeout_ms >= 0
+
+        if decode_content and not any(name.lower() == 'accept-encoding' for name in outgoing_headers):
+            outgoing_headers = dict(outgoing_headers)
+            outgoing_headers['accept-encoding'] = 'gzip, deflate'
+
+        self.method = method
+        self.outgoing_headers = HttpHeaders.from_dict(dict(outgoing_headers))
+        self._prepared_headers = self.outgoing_headers._native
+        self._on_incoming_body = on_incoming_body
+        self._incoming_body_delivery = incoming_body_delivery or IncomingBodyDelivery.Bytes
+        self._manual_window = manual_window
+        self._incoming_body_min_chunk_size = incoming_body_min_chunk_size
+        self._incoming_body_max_delay_ms = incoming_body_max_delay_ms
+        self._decode_content = decode_content
+        self._first_byte_timeout_ms = first_byte_timeout_ms
+        self._total_timeout_ms = total_timeout_ms
+
+    def make_requests(self, connections, requests, completion_queue=None):
+        """
+        Sends every request in requests in one native call, spread round-robin over connections (an
+        HttpClientConnection or a list of them). Each request is a path_and_query string, or a
+        (path_and_query, outgoing_headers, body) tuple where outgoing_headers and body may be left off or None.
+        outgoing_headers work as in make_request() and body must be bytes-like.
+
+        Nothing runs in python while these are in flight. Each response, with its headers and whole body, is
+        collected natively, so on_incoming_body does not apply. With a completion_queue, the responses go there,
+        tagged in order starting from the tag that is returned. Without one, a future is returned whose result is
+        the list of HttpResponses in the same order as requests.
+        """
+        if isinstance(connections, HttpClientConnection):
+            connections = [connections]
+        native_connections = [connection._native_handle for connection in connections]
+        if not isinstance(requests, list):
+            requests = list(requests)
+
+        if completion_queue is not None:
+            return _aws_crt_python.aws_py_http_client_connection_make_requests(native_connections, self, requests,
+                                                                              completion_queue._native)
+
+        batch = _BatchResult()
+        batch.queue = HttpCompletionQueue(batch.on_idle)
+        try:
+            _aws_crt_python.aws_py_http_client_connection_make_requests(native_connections, self, requests,
+                                                                       batch.queue._native)
+        except Exception as e:
+            batch.queue = None
+            if _claim_future(batch.future):
+                batch.future.set_exception(e)
+
+        return batch.future
+
+    def make_request(self, connection, path_and_query, outgoing_headers=None, on_outgoing_body=None,
+                     on_incoming_body=None, incoming_body_sink=None, on_complete=None):
+        """
+        Sends the prepared request on connection. on_incoming_body, if given, replaces the prepared one for this
+        request, and incoming_body_sink replaces both. Returns the HttpRequest.
+        """
+        if outgoing_headers is None:
+            outgoing_headers = {}
+
+        outgoing_body_source = None
+        if on_outgoing_body is not None and not callable(on_outgoing_body):
+            outgoing_body_source = OutgoingBodySource._from_body(on_outgoing_body)
+            on_outgoing_body = None
+            outgoing_headers = outgoing_body_source._add_content_length(outgoing_headers)
+
+        if incoming_body_sink is None and on_incoming_body is None:
+            on_incoming_body = self._on_incoming_body
+
+        request = HttpRequest(connection, self.method, path_and_query, outgoing_headers, on_outgoing_body,
+                              on_incoming_body, self._incoming_body_delivery, None, incoming_body_sink,
+                              outgoing_body_source, self._manual_window, self._incoming_body_min_chunk_size,
+                              self._incoming_body_max_delay_ms, None, self._decode_content, False,
+                              self._first_byte_timeout_ms, self._total_timeout_ms, self._prepared_headers)
+        return connection._start_request(request, on_complete)
+
+
+class HttpResponse(object):
+    """
+    A response collected natively for a request sent with PreparedRequest.make_requests(), or by
+    HttpClientConnectionManager.make_request(). tag identifies the request, see make_requests(). If error_code isn't
+    0 the request failed, headers is None and the rest is whatever had arrived. headers is an HttpHeaders and body is
+    bytes.
+    """
+    __slots__ = ('tag', 'error_code', 'response_code', 'headers', 'body')
+
+    def __init__(self, native_response):
+        self.tag, self.error_code, self.response_code, headers, self.body = native_response
+        self.headers = HttpHeaders(headers) if headers is not None else None
+
+
+class HttpCompletionQueue(object):
+    """
+    Collects the responses to requests sent with PreparedRequest.make_requests() natively, to be taken out in
+    batches with get(), from any thread. A queue can take any number of make_requests() calls.
+    on_idle, if given, is called with no arguments from a CRT thread whenever nothing is left in flight.
+    """
+    __slots__ = ('_native')
+
+    def __init__(self, on_idle=None):
+        self._native = _aws_crt_python.aws_py_http_completion_queue_new(on_idle)
+
+    def get(self, max_count=None, timeout=None):
+        """
+        Returns up to max_count (default all) HttpResponses, in the order they completed. Waits up to timeout
+        seconds, or indefinitely if it is None, for at least one unless nothing is in flight. The GIL is released
+        while waiting. Returns an empty list if nothing is available.
+        """
+        timeout_ms = -1 if timeout is None else int(timeout * 1000)
+        return [HttpResponse(response) for response in
+                _aws_crt_python.aws_py_http_completion_queue_get(self._native, max_count or 0, timeout_ms)]
+
+
+class _BatchResult(object):
+    """
+    Turns the HttpCompletionQueue behind a make_requests() call without one of its own into a future for the list of
+    HttpResponses. The queue's native side holds on_idle, and so this, so queue is dropped once the responses are out
+    or the queue would stay alive forever. on_idle may be called more than once and only the first call does anything.
+    """
+    __slots__ = ('queue', 'future', '_lock')
+
+    def __init__(self):
+        self.queue = None
+        self.future = Future()
+        self._lock = threading.Lock()
+
+    def on_idle(self):
+        with self._lock:
+            queue, self.queue = self.queue, None
+        if queue is None:
+            return
+
+        responses = queue.get(timeout=0)
+        responses.sort(key=lambda response: response.tag)
+        if _claim_future(self.future):
+            self.future.set_result(responses)
+
+
+class HttpServerRequest(object):
+    """
+    A whole request received by an HttpServer. body is a read-only memoryview that is released when the
+    on_incoming_request call returns, copy it with bytes(body) to keep it.
+    """
+    __slots__ = ('method', 'path_and_query', 'headers', 'body')
+
+    def __init__(self, method, path_and_query, headers, body):
+        self.method = method
+        self.path_and_query = path_and_query
+        self.headers = headers
+        self.body = body
+
+
+class HttpServer(object):
+    """
+    An HTTP/1.1 server listening on host_name and port. bootstrap is a ServerBootstrap, or a ClientBootstrap to share
+    its event-loop group with the clients. tls_connection_options, from a ServerTlsContext, turns on TLS.
+    Everything in this class is non-blocking.
+
+    By default every request gets the same response, response_status with response_headers (a dict or HttpHeaders)
+    and response_body, and python is never involved. With echo=True every request gets a 200 with its own body
+    instead, also without python. With on_incoming_request, it is called from a CRT thread with an HttpServerRequest
+    once each whole request has arrived and returns a (status, headers, body) tuple, where headers and body may be
+    None. content-length is always set by the server. If on_incoming_request raises, the connection is closed.
+
+    The server runs until close() is called. shutdown_future completes once it and all its connections are gone.
+    """
+    __slots__ = ('_bootstrap', '_tls_connection_options', '_native_handle', 'shutdown_future')
+
+    def __init__(self, bootstrap, host_name, port, socket_options, on_incoming_request=None, response_status=200,
+                 response_headers=None, response_body=None, echo=False, initial_window_size=None,
+                 tls_connection_options=None):
+        assert isinstance(bootstrap, (ServerBootstrap, ClientBootstrap))
+        assert host_name is not None
+        assert port is not None
+        assert socket_options is not None and isinstance(socket_options, SocketOptions)
+        assert tls_connection_options is None or isinstance(tls_connection_options, TlsConnectionOptions)
+        assert on_incoming_request is None or callable(on_incoming_request)
+        assert not (echo and on_incoming_request is not None)
+        assert initial_window_size is None or initial_window_size >= 0
+
+        if isinstance(bootstrap, ClientBootstrap):
+            bootstrap = ServerBootstrap(bootstrap.elg)
+        if response_headers is not None and not isinstance(response_headers, HttpHeaders):
+            response_headers = HttpHeaders.from_dict(response_headers)
+
+        native_on_incoming_request = None
+        if on_incoming_request is not None:
+            def native_on_incoming_request(method, path_and_query, headers, body):
+                status, headers, body = on_incoming_request(
+                    HttpServerRequest(method, path_and_query, HttpHeaders(headers), body))
+                if headers is not None and not isinstance(headers, HttpHeaders):
+                    headers = HttpHeaders.from_dict(headers)
+                return status, headers._native if headers is not None else None, body
+
+        future = Future()
+
+        def on_shutdown():
+            future.set_result(None)
+
+        if tls_connection_options is not None:
+            internal_conn_options_handle = tls_connection_options._internal_tls_conn_options
+        else:
+            internal_conn_options_handle = None
+
+        self._bootstrap = bootstrap
+        self._tls_connection_options = tls_connection_options
+        self.shutdown_future = future
+        self._native_handle = _aws_crt_python.aws_py_http_server_create(
+            bootstrap._internal_bootstrap,
+            host_name,
+            port,
+            socket_options,
+            internal_conn_options_handle,
+            initial_window_size,
+            native_on_incoming_request,
+            echo,
+            response_status,
+            response_headers._native if response_headers is not None else None,
+            response_body,
+            on_shutdown)
+
+    def close(self):
+        """
+        Stops listening and closes every connection. Returns shutdown_future.
+        """
+        _aws_crt_python.aws_py_http_server_close(self._native_handle)
+        return self.shutdown_future
+
+    def request_count(self):
+        """
+        Returns the number of requests the server has finished with, including ones that failed.
+        """
+        return _aws_crt_python.aws_py_http_server_get_request_count(self._native_handle)
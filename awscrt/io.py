@@ -12,7 +12,13 @@
 # permissions and limitations under the License.
 
 import _aws_crt_python
+from concurrent.futures import Future
 from enum import IntEnum
+import atexit
+import hashlib
+import logging
+import threading
+import weakref
 
 
 class LogLevel(IntEnum):
@@ -24,15 +30,105 @@ class LogLevel(IntEnum):
     Debug = 5
     Trace = 6
 
-def init_logging(log_level, file_name):
+
+_logging_shutdown_registered = False
+
+
+def _register_logging_shutdown():
+    # the writer thread can't call into python once the interpreter is finalizing, so it's stopped at exit.
+    # Only the first logger is ever installed, one registration covers every init call.
+    global _logging_shutdown_registered
+    if not _logging_shutdown_registered:
+        _logging_shutdown_registered = True
+        atexit.register(shutdown_logging)
+
+
+def init_logging(log_level, file_name, background=False, queue_size=4096):
     """
     initialize a logger. log_level is type LogLevel, and file_name is of type str.
     To write to stdout, or stderr, simply pass 'stdout' or 'stderr' as strings. Otherwise, a file path is assumed.
+
+    With background=True, logging never blocks the thread that logs, e.g. an event loop thread: records go into a
+    queue of queue_size and are written by a dedicated thread. Records logged while the queue is full are dropped and
+    counted, see logging_stats().
     """
     assert log_level is not None
     assert file_name is not None
 
-    _aws_crt_python.aws_py_io_init_logging(log_level, file_name)
+    if background:
+        assert queue_size > 0
+        _aws_crt_python.aws_py_io_init_background_logging(log_level, file_name, None, queue_size, 256)
+        _register_logging_shutdown()
+    else:
+        _aws_crt_python.aws_py_io_init_logging(log_level, file_name)
+
+
+# python logging levels for LogLevel, python has nothing finer than DEBUG so Trace gets its own
+_LOGGING_LEVELS = {
+    LogLevel.Fatal: logging.CRITICAL,
+    LogLevel.Error: logging.ERROR,
+    LogLevel.Warn: logging.WARNING,
+    LogLevel.Info: logging.INFO,
+    LogLevel.Debug: logging.DEBUG,
+    LogLevel.Trace: logging.DEBUG - 5,
+}
+
+
+def init_logging_to_python(log_level, logger=None, queue_size=4096, batch_size=256):
+    """
+    initialize a logger that forwards the CRT's records to python's logging module, through logger or the 'awscrt'
+    logger if None. Like init_logging() with background=True, records are queued without blocking, and the
+    dedicated thread hands them over in batches of up to batch_size so that it takes the GIL once per batch.
+    Each record keeps the time it was logged at, and has the CRT's log subject and thread id as its
+    crt_subject and crt_thread_id attributes.
+    """
+    assert log_level is not None
+    assert queue_size > 0
+    assert batch_size > 0
+
+    if logger is None:
+        logger = logging.getLogger('awscrt')
+
+    def on_batch(batch):
+        for level, subject, thread_id, timestamp, message in batch:
+            py_level = _LOGGING_LEVELS.get(level, logging.NOTSET)
+            if not logger.isEnabledFor(py_level):
+                continue
+            record = logger.makeRecord(logger.name, py_level, subject, 0, message, None, None,
+                                       extra={'crt_subject': subject, 'crt_thread_id': thread_id})
+            record.created = timestamp
+            record.msecs = (timestamp - int(timestamp)) * 1000
+            logger.handle(record)
+
+    _aws_crt_python.aws_py_io_init_background_logging(log_level, None, on_batch, queue_size, batch_size)
+    _register_logging_shutdown()
+
+
+class LoggingStats(object):
+    """
+    Counters of the background logger: records written out and records dropped because the queue was full.
+    """
+    __slots__ = ('written', 'dropped')
+
+    def __init__(self, written, dropped):
+        self.written = written
+        self.dropped = dropped
+
+
+def logging_stats():
+    """
+    Returns a LoggingStats for the background logger, all zero when it isn't the logger in use.
+    """
+    written, dropped = _aws_crt_python.aws_py_io_get_logging_stats()
+    return LoggingStats(written, dropped)
+
+
+def shutdown_logging():
+    """
+    Stops the background logger once everything already logged is written out. Records logged afterwards are dropped.
+    Called at exit, and a no-op when the background logger isn't in use or is already stopped.
+    """
+    _aws_crt_python.aws_py_io_shutdown_background_logging()
 
 
 def is_alpn_available():
@@ -45,6 +141,13 @@ class EventLoopGroup(object):
     def __init__(self, num_threads):
         self._internal_elg = _aws_crt_python.aws_py_io_event_loop_group_new(num_threads)
 
+    def schedule(self, delay_ms, callback):
+        """
+        Invokes callback, with no arguments, on one of the group's threads once delay_ms milliseconds have passed.
+        """
+        assert delay_ms >= 0
+        _aws_crt_python.aws_py_io_event_loop_group_schedule(self._internal_elg, delay_ms, callback)
+
 
 class HostResolver(object):
     __slots__ = ('elg', '_internal_host_resolver')
@@ -53,12 +156,104 @@ class HostResolver(object):
         self.elg = elg
 
 
+class HostResolverStats(object):
+    """
+    Counters for a DefaultHostResolver. A hit is a successful resolve answered from the cache, a miss is one that had
+    to wait on a lookup, failed resolves are neither. dns_queries counts the lookups themselves, including failed ones
+    and the background refreshes of cached hosts.
+    """
+    __slots__ = ('hits', 'misses', 'dns_queries')
+
+    def __init__(self, hits, misses, dns_queries):
+        self.hits = hits
+        self.misses = misses
+        self.dns_queries = dns_queries
+
+
 class DefaultHostResolver(HostResolver):
+    """
+    Caches up to max_hosts host names, each address for max_ttl_secs seconds. Connections made through a
+    ClientBootstrap using this resolver share the cache, so resolving or prewarming a host ahead of time takes the
+    DNS lookup off its first connection.
+    """
     __slots__ = ('elg', '_internal_host_resolver')
 
-    def __init__(self, elg, max_hosts=16):
+    def __init__(self, elg, max_hosts=16, max_ttl_secs=30):
+        assert isinstance(elg, EventLoopGroup)
+        assert max_hosts > 0
+        assert max_ttl_secs > 0
+
         super(DefaultHostResolver, self).__init__(elg)
-        self._internal_host_resolver = _aws_crt_python.aws_py_io_host_resolver_new_default(max_hosts, elg._internal_elg)
+        self._internal_host_resolver = _aws_crt_python.aws_py_io_host_resolver_new_default(
+            max_hosts, elg._internal_elg, max_ttl_secs)
+
+    def resolve(self, host_name):
+        """
+        Returns a Future whose result is the list of address strings for host_name. A cached host completes with its
+        cached addresses without a DNS query, which is also how to look at what the cache holds for a host.
+        """
+        future = Future()
+
+        def on_resolved(error_code, addresses):
+            if error_code:
+                future.set_exception(Exception("Failed to resolve {}, error {}".format(host_name, error_code)))
+            else:
+                future.set_result(addresses)
+
+        try:
+            _aws_crt_python.aws_py_io_host_resolver_resolve(self._internal_host_resolver, host_name, on_resolved)
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def prewarm(self, host_names):
+        """
+        Resolves every host in host_names at once, to fill the cache before traffic starts. Returns a Future whose
+        result is a dict of host name to its addresses. This is best effort: hosts that fail to resolve are left out
+        rather than failing the Future.
+        """
+        host_names = list(host_names)
+        future = Future()
+        results = {}
+        lock = threading.Lock()
+        remaining = [len(host_names)]
+
+        if not host_names:
+            future.set_result(results)
+            return future
+
+        def on_resolved(host_name, resolve_future):
+            with lock:
+                if resolve_future.exception() is None:
+                    results[host_name] = resolve_future.result()
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                future.set_result(results)
+
+        for host_name in host_names:
+            self.resolve(host_name).add_done_callback(
+                lambda resolve_future, host_name=host_name: on_resolved(host_name, resolve_future))
+
+        return future
+
+    def purge_cache(self):
+        """
+        Drops every cached address, so the next resolve of any host goes to DNS.
+        """
+        _aws_crt_python.aws_py_io_host_resolver_purge_cache(self._internal_host_resolver)
+
+    def stats(self):
+        """
+        Returns a HostResolverStats with the counters since the resolver was created.
+
+        hits and misses are a heuristic: the resolver doesn't say where an answer came from, so one delivered before
+        resolve() returns counts as a hit and one delivered later, from the resolver's thread, as a miss. Use them
+        for trends rather than exact accounting. dns_queries is exact.
+        """
+        hits, misses, dns_queries = _aws_crt_python.aws_py_io_host_resolver_get_stats(self._internal_host_resolver)
+        return HostResolverStats(hits, misses, dns_queries)
 
 
 class ClientBootstrap(object):
@@ -76,6 +271,16 @@ class ClientBootstrap(object):
         self._internal_bootstrap = _aws_crt_python.aws_py_io_client_bootstrap_new(self.elg._internal_elg, host_resolver._internal_host_resolver)
 
 
+class ServerBootstrap(object):
+    __slots__ = ('elg', '_internal_bootstrap')
+
+    def __init__(self, elg):
+        assert isinstance(elg, EventLoopGroup)
+
+        self.elg = elg
+        self._internal_bootstrap = _aws_crt_python.aws_py_io_server_bootstrap_new(self.elg._internal_elg)
+
+
 def byte_buf_from_file(filepath):
     with open(filepath, mode='rb') as fh:
         contents = fh.read()
@@ -135,6 +340,26 @@ class TlsContextOptions(object):
         self.min_tls_ver = TlsVersion.DEFAULT
         self.verify_peer = True
 
+    def _cache_key(self):
+        """
+        Digest of every option, equal for options that would make identical native contexts. Buffers are hashed by
+        content. Returns None, meaning don't share, if a trust store directory or a PKCS#12 file is given by path:
+        those are read by the native context itself, so a rotated file under the same name must give a new context.
+        """
+        if self.ca_path is not None or self.pkcs12_path is not None:
+            return None
+
+        digest = hashlib.sha256()
+        for slot in self.__slots__:
+            value = getattr(self, slot)
+            if value is None:
+                digest.update(b'N')
+                continue
+            if not isinstance(value, bytes):
+                value = str(int(value) if isinstance(value, (bool, IntEnum)) else value).encode('utf-8')
+            digest.update(b'V' + str(len(value)).encode('ascii') + b':' + value)
+        return digest.hexdigest()
+
     def override_default_trust_store_from_path(self, ca_path, ca_file):
 
         assert isinstance(ca_path, str) or ca_path is None
@@ -196,7 +421,7 @@ class TlsContextOptions(object):
         cert_buffer = byte_buf_from_file(cert_path)
         key_buffer = byte_buf_from_file(pk_path)
         
-        return TlsContextOptions.create_server_with_mtls(cert_buffer, key_buffer)
+        return TlsContextOptions.create_server(cert_buffer, key_buffer)
 
     @staticmethod
     def create_server(cert_buffer, key_buffer):
@@ -222,22 +447,103 @@ class TlsContextOptions(object):
         return opt
 
 
+class _SharedTlsContext(object):
+    """
+    Owns a native TLS context capsule on behalf of every ClientTlsContext or ServerTlsContext made from equal options.
+    """
+    __slots__ = ('capsule', '__weakref__')
+
+    def __init__(self, capsule):
+        self.capsule = capsule
+
+
+# Native TLS contexts by options digest. Parsing certificates, keys and trust stores is expensive and each context
+# holds its own copy, so equal options share one context. Entries go away with the last context object using them.
+_tls_ctx_cache = weakref.WeakValueDictionary()
+_tls_ctx_cache_lock = threading.Lock()
+
+
+def _shared_tls_ctx(kind, options_key, new_capsule):
+    """
+    Returns the shared kind ('client' or 'server') context for options_key, from TlsContextOptions._cache_key(),
+    making one with new_capsule() if there is none. A None options_key is never shared.
+    """
+    if options_key is None:
+        return _SharedTlsContext(new_capsule())
+
+    key = (kind, options_key)
+
+    with _tls_ctx_cache_lock:
+        shared = _tls_ctx_cache.get(key)
+    if shared is not None:
+        return shared
+
+    # built outside the lock so that contexts for other options aren't held up by the parsing. Threads racing on the
+    # same options may each build one, the first stored wins and the others are dropped.
+    candidate = _SharedTlsContext(new_capsule())
+    with _tls_ctx_cache_lock:
+        return _tls_ctx_cache.setdefault(key, candidate)
+
+
+def tls_context_cache_size():
+    """
+    Returns the number of shared native TLS contexts currently alive, not counting those made from options with a
+    ca_path or pkcs12_path, which are never shared.
+    """
+    with _tls_ctx_cache_lock:
+        return len(_tls_ctx_cache)
+
+
 class ClientTlsContext(object):
+    """
+    TLS context for clients. Contexts made from equal TlsContextOptions share one native context, so the certificates
+    and trust store are only parsed and held in memory once however many are made. Options with a ca_path or a
+    pkcs12_path are the exception: the files behind those paths are read natively and may change, so every context
+    made from them is its own.
+
+    Every connection does a full handshake: the underlying TLS implementation does not offer session ID or session
+    ticket resumption to its users. Keeping connections open, e.g. through an HttpClientConnectionManager, is how to
+    avoid paying for the handshake on every request.
+    """
+
+    def __init__(self, options):
+        assert isinstance(options, TlsContextOptions)
+
+        self._shared_tls_ctx = _shared_tls_ctx('client', options._cache_key(), lambda: (
+            _aws_crt_python.aws_py_io_client_tls_ctx_new(
+                options.min_tls_ver.value,
+                options.ca_path,
+                options.ca_buffer,
+                options.alpn_list,
+                options.certificate_buffer,
+                options.private_key_buffer,
+                options.pkcs12_path,
+                options.pkcs12_password,
+                options.verify_peer
+            )))
+        self._internal_tls_ctx = self._shared_tls_ctx.capsule
+
+    def new_connection_options(self):
+        return TlsConnectionOptions(self)
+
+
+class ServerTlsContext(object):
+    """
+    TLS context for servers, from TlsContextOptions made with create_server() or create_server_from_path().
+    """
 
     def __init__(self, options):
         assert isinstance(options, TlsContextOptions)
+        assert options.certificate_buffer is not None and options.private_key_buffer is not None
 
-        self._internal_tls_ctx = _aws_crt_python.aws_py_io_client_tls_ctx_new(
-            options.min_tls_ver.value,
-            options.ca_path,
-            options.ca_buffer,
-            options.alpn_list,
-            options.certificate_buffer,
-            options.private_key_buffer,
-            options.pkcs12_path,
-            options.pkcs12_password,
-            options.verify_peer
-        )
+        self._shared_tls_ctx = _shared_tls_ctx('server', options._cache_key(), lambda: (
+            _aws_crt_python.aws_py_io_server_tls_ctx_new(
+                options.min_tls_ver.value,
+                options.certificate_buffer,
+                options.private_key_buffer,
+                options.alpn_list
+            )))
+        self._internal_tls_ctx = self._shared_tls_ctx.capsule
 
     def new_connection_options(self):
         return TlsConnectionOptions(self)
@@ -247,7 +553,7 @@ class TlsConnectionOptions(object):
     __slots__ = ('tls_ctx', '_internal_tls_conn_options')
 
     def __init__(self, tls_ctx):
-        assert isinstance(tls_ctx, ClientTlsContext)
+        assert isinstance(tls_ctx, (ClientTlsContext, ServerTlsContext))
 
         self.tls_ctx = tls_ctx
         self._internal_tls_conn_options = _aws_crt_python.aws_py_io_tls_connections_options_new_from_ctx(tls_ctx._internal_tls_ctx)
@@ -0,0 +1,68 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Native memory accounting. The allocator mode is picked once, when _aws_crt_python is first imported, from the
+AWS_CRT_PYTHON_ALLOCATOR environment variable:
+
+    default   - the CRT's default allocator, nothing is counted. Used when the variable is unset or unknown.
+    tracking  - every allocation is counted against the subsystem (io, http, mqtt, crypto or common) it was made for.
+    pooled    - tracking, and small blocks are recycled through per size free lists instead of going back to malloc.
+"""
+
+import _aws_crt_python
+from enum import IntEnum
+
+
+class AllocatorMode(IntEnum):
+    Default = 0
+    Tracking = 1
+    Pooled = 2
+
+
+class MemoryStats(object):
+    """
+    Native memory held for one subsystem. Bytes are as requested by the CRT, not counting allocator overhead.
+    """
+    __slots__ = ('subsystem', 'live_bytes', 'peak_bytes', 'allocations', 'live_allocations')
+
+    def __init__(self, subsystem, live_bytes, peak_bytes, allocations, live_allocations):
+        self.subsystem = subsystem
+        self.live_bytes = live_bytes
+        self.peak_bytes = peak_bytes
+        self.allocations = allocations
+        self.live_allocations = live_allocations
+
+
+def allocator_mode():
+    """
+    Returns the AllocatorMode the native allocators were set up with, from the AWS_CRT_PYTHON_ALLOCATOR environment
+    variable when _aws_crt_python was first imported. It can't change after that.
+    """
+    return AllocatorMode(_aws_crt_python.aws_py_allocator_get_mode())
+
+
+def stats():
+    """
+    Returns a dict of subsystem name to MemoryStats. Empty in the default mode, which doesn't count.
+    """
+    return {entry[0]: MemoryStats(*entry) for entry in _aws_crt_python.aws_py_allocator_get_stats()}
+
+
+def live_bytes():
+    """
+    Returns the bytes held across all subsystems, or None in the default mode.
+    """
+    if allocator_mode() == AllocatorMode.Default:
+        return None
+    return sum(entry.live_bytes for entry in stats().values())
@@ -92,32 +92,40 @@ class Connection(object):
                 future.set_exception(Exception("Error during connect: err={} rc={}".format(error_code, return_code)))
 
         try:
-            assert will is None or isinstance(will, Will)
-            assert use_websocket == False
-
-            tls_ctx_cap = None
-            if self.client.tls_ctx:
-                tls_ctx_cap = self.client.tls_ctx._internal_tls_ctx
-
-            _aws_crt_python.aws_py_mqtt_client_connection_connect(
-                self._internal_connection,
-                client_id,
-                host_name,
-                port,
-                tls_ctx_cap,
-                keep_alive,
-                ping_timeout,
-                will,
-                username,
-                password,
-                on_connect,
-                )
-
+            self._native_connect(client_id, host_name, port, use_websocket, keep_alive, ping_timeout, will, username,
+                                 password, on_connect)
         except Exception as e:
             future.set_exception(e)
 
         return future
 
+    def _native_connect(self, client_id, host_name, port, use_websocket, keep_alive, ping_timeout, will, username,
+                        password, on_connect):
+        """
+        Starts connecting, on_connect(error_code, return_code, session_present) is called from a CRT thread.
+        Shared with awscrt.aio, which completes its own futures from the callbacks.
+        """
+        assert will is None or isinstance(will, Will)
+        assert use_websocket == False
+
+        tls_ctx_cap = None
+        if self.client.tls_ctx:
+            tls_ctx_cap = self.client.tls_ctx._internal_tls_ctx
+
+        _aws_crt_python.aws_py_mqtt_client_connection_connect(
+            self._internal_connection,
+            client_id,
+            host_name,
+            port,
+            tls_ctx_cap,
+            keep_alive,
+            ping_timeout,
+            will,
+            username,
+            password,
+            on_connect,
+            )
+
     def reconnect(self):
         future = Future()
 
@@ -163,12 +171,19 @@ class Connection(object):
             ))
 
         try:
-            packet_id = _aws_crt_python.aws_py_mqtt_client_connection_subscribe(self._internal_connection, topic, qos.value, callback, suback)
+            packet_id = self._native_subscribe(topic, qos, callback, suback)
         except Exception as e:
             future.set_exception(e)
 
         return future, packet_id
 
+    def _native_subscribe(self, topic, qos, callback, suback):
+        """
+        Sends a subscribe and returns its packet id, suback(packet_id, topic, qos) is called from a CRT thread.
+        """
+        return _aws_crt_python.aws_py_mqtt_client_connection_subscribe(
+            self._internal_connection, topic, qos.value, callback, suback)
+
     def unsubscribe(self, topic):
         future = Future()
         packet_id = 0
@@ -179,13 +194,19 @@ class Connection(object):
             ))
 
         try:
-            packet_id = _aws_crt_python.aws_py_mqtt_client_connection_unsubscribe(self._internal_connection, topic, unsuback)
+            packet_id = self._native_unsubscribe(topic, unsuback)
 
         except Exception as e:
             future.set_exception(e)
 
         return future, packet_id
 
+    def _native_unsubscribe(self, topic, unsuback):
+        """
+        Sends an unsubscribe and returns its packet id, unsuback(packet_id) is called from a CRT thread.
+        """
+        return _aws_crt_python.aws_py_mqtt_client_connection_unsubscribe(self._internal_connection, topic, unsuback)
+
     def publish(self, topic, payload, qos, retain=False):
         future = Future()
         packet_id = 0
@@ -196,11 +217,18 @@ class Connection(object):
             ))
 
         try:
-            packet_id = _aws_crt_python.aws_py_mqtt_client_connection_publish(self._internal_connection, topic, payload, qos.value, retain, puback)
+            packet_id = self._native_publish(topic, payload, qos, retain, puback)
         except Exception as e:
             future.set_exception(e)
 
         return future, packet_id
 
+    def _native_publish(self, topic, payload, qos, retain, puback):
+        """
+        Sends a publish and returns its packet id, puback(packet_id) is called from a CRT thread.
+        """
+        return _aws_crt_python.aws_py_mqtt_client_connection_publish(
+            self._internal_connection, topic, payload, qos.value, retain, puback)
+
     def ping(self):
         _aws_crt_python.aws_py_mqtt_client_connection_ping(self._internal_connection)
@@ -0,0 +1,448 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+from collections import deque
+from concurrent.futures import Future
+import os
+import threading
+from awscrt.http import HttpClientConnectionManager, IncomingBodySink, OutgoingBodySource
+from awscrt.io import TlsConnectionOptions
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+_string_types = (str, type(u''))
+
+
+def _parse_content_range(content_range):
+    """
+    Parses a 'bytes first-last/total' content-range header value into a (first, total) tuple.
+    total is None if the server sent '*'. Returns None if the value can't be parsed.
+    """
+    if content_range is None:
+        return None
+
+    try:
+        unit, _, rest = content_range.strip().partition(' ')
+        byte_range, _, total = rest.partition('/')
+        first, _, _ = byte_range.partition('-')
+        if unit.lower() != 'bytes':
+            return None
+        return int(first), None if total == '*' else int(total)
+    except ValueError:
+        return None
+
+
+def _with_host_header(outgoing_headers, host_name):
+    headers = dict(outgoing_headers) if outgoing_headers else {}
+    for name in headers:
+        if name.lower() == 'host':
+            return headers
+
+    headers['host'] = host_name
+    return headers
+
+
+class _ParallelTransfer(object):
+    """
+    Settings shared by ParallelDownloader and ParallelUploader.
+    """
+    __slots__ = ('_connection_manager', 'host_name', 'port', '_tls_connection_options', 'part_size', 'max_parallel',
+                 'max_retries')
+
+    def __init__(self, connection_manager, host_name, port, tls_connection_options, part_size, max_parallel,
+                 max_retries):
+        assert isinstance(connection_manager, HttpClientConnectionManager)
+        assert tls_connection_options is None or isinstance(tls_connection_options, TlsConnectionOptions)
+        assert host_name is not None
+        assert port is not None
+        assert part_size > 0
+        assert max_parallel > 0
+        assert max_retries >= 0
+
+        self._connection_manager = connection_manager
+        self.host_name = host_name
+        self.port = port
+        self._tls_connection_options = tls_connection_options
+        self.part_size = part_size
+        self.max_parallel = max_parallel
+        self.max_retries = max_retries
+
+
+class ParallelDownloader(_ParallelTransfer):
+    """
+    Downloads a single object as byte ranges fetched over several pooled connections at once, with each part written
+    natively to its own offset of the destination. A single TCP stream rarely fills the pipe, several side by side do.
+
+    Connections come from connection_manager, which also bounds how many are opened to the endpoint.
+    At most max_parallel parts are in flight at a time, each covering part_size bytes.
+    A part that fails with a connection error or a 5xx response is retried up to max_retries times before the whole
+    download fails.
+    """
+    __slots__ = ()
+
+    def __init__(self, connection_manager, host_name, port, tls_connection_options=None, part_size=DEFAULT_PART_SIZE,
+                 max_parallel=8, max_retries=3):
+        super(ParallelDownloader, self).__init__(connection_manager, host_name, port, tls_connection_options,
+                                                 part_size, max_parallel, max_retries)
+
+    def download(self, path_and_query, destination, outgoing_headers=None):
+        """
+        Downloads path_and_query into destination, and returns a future whose result is the size of the object.
+
+        destination is either a file path, which is created or truncated, an open file (anything with a fileno()
+        method) that is written at absolute offsets, or a writable buffer (bytearray, mmap...) large enough for
+        the whole object.
+
+        The first part doubles as the size probe: the object size is taken from the content-range header of its
+        response, so no separate HEAD request is needed. If the server ignores range requests, the whole object
+        arrives in that first response and nothing else is fetched.
+        """
+        download = _Download(self, path_and_query, destination, _with_host_header(outgoing_headers, self.host_name))
+        download.start()
+        return download.future
+
+
+class ParallelUploader(_ParallelTransfer):
+    """
+    Uploads a single file or buffer as several part_size requests sent over pooled connections at once.
+    Each part's body is read natively from the source at its offset (pread for files, straight out of the buffer
+    for bytes and mmaps), so python never copies the data and at most max_parallel parts are in flight.
+
+    Connections come from connection_manager, which also bounds how many are opened to the endpoint.
+    A part that fails with a connection error or a 5xx response is retried up to max_retries times before the whole
+    upload fails.
+    """
+    __slots__ = ()
+
+    def __init__(self, connection_manager, host_name, port, tls_connection_options=None, part_size=DEFAULT_PART_SIZE,
+                 max_parallel=8, max_retries=3):
+        super(ParallelUploader, self).__init__(connection_manager, host_name, port, tls_connection_options,
+                                               part_size, max_parallel, max_retries)
+
+    def upload(self, method, path_and_query, source, outgoing_headers=None, part_request=None):
+        """
+        Uploads source and returns a future whose result is the list of response headers (HttpHeaders) of every
+        part, in part order.
+
+        source is a file path, an open file (anything with a fileno() method) that is read at absolute offsets,
+        or a bytes-like object such as an mmap.
+
+        By default every part is sent as method path_and_query with a 'content-range: bytes first-last/total' header.
+        Services with their own multipart scheme can pass part_request, which is called with
+        (part_number, first, last, total) and returns the (method, path_and_query, outgoing_headers) for that part.
+        part_number starts at 1. The content-length header is always filled in.
+        """
+        upload = _Upload(self, method, path_and_query, source, _with_host_header(outgoing_headers, self.host_name),
+                         part_request)
+        upload.start()
+        return upload.future
+
+
+class _PartTransfer(object):
+    """
+    Schedules the parts of a single download or upload. Part completions arrive on CRT threads, so all state is
+    guarded by a lock, and requests are only issued and futures only completed outside of it.
+    Subclasses build the request for a part and judge its response.
+    """
+    __slots__ = ('_owner', 'future', '_lock', '_pending', '_in_flight', '_done')
+
+    def __init__(self, owner):
+        self._owner = owner
+        self.future = Future()
+        self._lock = threading.Lock()
+        # (index, first, last, attempt) parts waiting for a free slot, retries go to the front
+        self._pending = deque()
+        self._in_flight = 0
+        self._done = False
+
+    def _make_part_request(self, connection, part):
+        """
+        Starts the request for part, an (index, first, last, attempt) tuple, on connection and returns the
+        HttpRequest. Called without the lock held. Raising fails the part without a retry and the connection is
+        released for it.
+        """
+        raise NotImplementedError()
+
+    def _on_part_response(self, request, part):
+        """
+        Called from a CRT thread, without the lock held, once part's request has completed with a status below 500.
+        The connection has already been released. Must settle the part with _on_part_succeeded(), _on_part_failed()
+        or _fail(), or end the whole transfer early with _finish().
+        """
+        raise NotImplementedError()
+
+    def _result(self):
+        """
+        Returns the result of the future, called once the last part has succeeded.
+        """
+        raise NotImplementedError()
+
+    def _fetch(self, part):
+        owner = self._owner
+        connection_future = owner._connection_manager.acquire_connection(
+            owner.host_name, owner.port, owner._tls_connection_options)
+
+        def on_connection(future):
+            try:
+                connection = future.result()
+            except Exception as e:
+                self._on_part_failed(part, e, True)
+                return
+
+            self._request(connection, part)
+
+        connection_future.add_done_callback(on_connection)
+
+    def _request(self, connection, part):
+        try:
+            request = self._make_part_request(connection, part)
+        except Exception as e:
+            self._owner._connection_manager.release_connection(connection)
+            self._on_part_failed(part, e, False)
+            return
+
+        def on_completed(future):
+            self._owner._connection_manager.release_connection(connection)
+            try:
+                future.result()
+            except Exception as e:
+                self._on_part_failed(part, e, True)
+                return
+
+            if request.response_code >= 500:
+                self._on_part_failed(part, Exception('part failed with status {}'.format(request.response_code)),
+                                     True)
+                return
+
+            self._on_part_response(request, part)
+
+        request.response_completed.add_done_callback(on_completed)
+
+    def _on_part_succeeded(self):
+        with self._lock:
+            self._in_flight -= 1
+            finished = self._in_flight == 0 and not self._pending
+
+        if finished:
+            self._finish(self._result())
+        else:
+            self._dispatch()
+
+    def _on_part_failed(self, part, error, retryable):
+        index, first, last, attempt = part
+        if not retryable or attempt >= self._owner.max_retries:
+            self._fail(error)
+            return
+
+        with self._lock:
+            self._in_flight -= 1
+            self._pending.appendleft((index, first, last, attempt + 1))
+
+        self._dispatch()
+
+    def _dispatch(self):
+        to_fetch = []
+        with self._lock:
+            while not self._done and self._pending and self._in_flight < self._owner.max_parallel:
+                to_fetch.append(self._pending.popleft())
+                self._in_flight += 1
+
+        for part in to_fetch:
+            self._fetch(part)
+
+    def _finish(self, result):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+
+        self.future.set_result(result)
+
+    def _fail(self, error):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            self._pending.clear()
+
+        self.future.set_exception(error)
+
+
+class _Download(_PartTransfer):
+    __slots__ = ('_path_and_query', '_destination', '_headers', '_size')
+
+    def __init__(self, downloader, path_and_query, destination, headers):
+        super(_Download, self).__init__(downloader)
+        self._path_and_query = path_and_query
+        self._destination = destination
+        self._headers = headers
+        self._size = None
+
+    def start(self):
+        try:
+            if isinstance(self._destination, _string_types):
+                flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+                os.close(os.open(self._destination, flags, 0o644))
+        except Exception as e:
+            self.future.set_exception(e)
+            return
+
+        # until the size is known, only the first part is in flight
+        with self._lock:
+            self._in_flight = 1
+        self._fetch((0, 0, self._owner.part_size - 1, 0))
+
+    def _new_sink(self, offset, statuses):
+        if isinstance(self._destination, _string_types):
+            return IncomingBodySink.from_file(self._destination, offset, statuses)
+        if hasattr(self._destination, 'fileno'):
+            return IncomingBodySink.from_fd(self._destination, offset, statuses)
+        return IncomingBodySink.from_buffer(self._destination, offset, statuses)
+
+    def _make_part_request(self, connection, part):
+        index, first, last, _ = part
+        headers = dict(self._headers)
+        headers['range'] = 'bytes={}-{}'.format(first, last)
+        # only a body that is the requested data may reach the destination, error pages and the like are dropped.
+        # The probe may also get the whole object back from a server that ignores ranges.
+        statuses = (200, 206) if index == 0 else (206,)
+        return connection.make_request('GET', self._path_and_query, headers, None, None,
+                                       incoming_body_sink=self._new_sink(first, statuses))
+
+    def _on_part_response(self, request, part):
+        code = request.response_code
+        content_range = _parse_content_range(request.response_headers.get('content-range'))
+
+        if part[0] == 0 and self._size is None:
+            self._on_probe_response(request, code, content_range)
+            return
+
+        if code != 206 or content_range is None or content_range[0] != part[1]:
+            self._fail(Exception('unexpected response to range request, status {}'.format(code)))
+            return
+
+        self._on_part_succeeded()
+
+    def _on_probe_response(self, request, code, content_range):
+        if code == 200:
+            # the server ignored the range and sent everything
+            content_length = request.response_headers.get('content-length')
+            self._finish(int(content_length) if content_length is not None else None)
+            return
+
+        if code == 416:
+            # nothing to fetch, the object is empty
+            self._finish(0)
+            return
+
+        if code != 206 or content_range is None or content_range[1] is None:
+            self._fail(Exception('could not determine object size, status {}'.format(code)))
+            return
+
+        size = content_range[1]
+        part_size = self._owner.part_size
+        if isinstance(self._destination, _string_types) and size > part_size:
+            # grow the file once up front rather than on every out-of-order write
+            try:
+                fd = os.open(self._destination, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+                try:
+                    os.ftruncate(fd, size)
+                finally:
+                    os.close(fd)
+            except Exception as e:
+                self._fail(e)
+                return
+
+        with self._lock:
+            self._size = size
+            for index, first in enumerate(range(part_size, size, part_size), 1):
+                self._pending.append((index, first, min(first + part_size, size) - 1, 0))
+
+        self._on_part_succeeded()
+
+    def _result(self):
+        return self._size
+
+
+class _Upload(_PartTransfer):
+    __slots__ = ('_method', '_path_and_query', '_source', '_headers', '_part_request', '_size', '_responses')
+
+    def __init__(self, uploader, method, path_and_query, source, headers, part_request):
+        super(_Upload, self).__init__(uploader)
+        self._method = method
+        self._path_and_query = path_and_query
+        self._source = source
+        self._headers = headers
+        self._part_request = part_request
+        self._size = None
+        self._responses = None
+
+    def start(self):
+        try:
+            if isinstance(self._source, _string_types):
+                self._size = os.stat(self._source).st_size
+            elif hasattr(self._source, 'fileno'):
+                self._size = os.fstat(self._source.fileno()).st_size
+            else:
+                view = memoryview(self._source)
+                self._size = getattr(view, 'nbytes', len(view))
+        except Exception as e:
+            self.future.set_exception(e)
+            return
+
+        part_size = self._owner.part_size
+        with self._lock:
+            if self._size == 0:
+                # still one request, so the object exists on the other side
+                self._pending.append((0, 0, -1, 0))
+            for index, first in enumerate(range(0, self._size, part_size)):
+                self._pending.append((index, first, min(first + part_size, self._size) - 1, 0))
+            self._responses = [None] * len(self._pending)
+
+        self._dispatch()
+
+    def _new_source(self, offset, length):
+        if isinstance(self._source, _string_types):
+            return OutgoingBodySource.from_file(self._source, offset, length)
+        if hasattr(self._source, 'fileno'):
+            return OutgoingBodySource.from_fd(self._source, offset, length)
+        return OutgoingBodySource.from_buffer(self._source, offset, length)
+
+    def _make_part_request(self, connection, part):
+        index, first, last, _ = part
+        if self._part_request is not None:
+            method, path_and_query, headers = self._part_request(index + 1, first, last, self._size)
+            headers = _with_host_header(headers, self._owner.host_name)
+        else:
+            method, path_and_query, headers = self._method, self._path_and_query, dict(self._headers)
+            if self._size == 0:
+                headers['content-range'] = 'bytes */0'
+            else:
+                headers['content-range'] = 'bytes {}-{}/{}'.format(first, last, self._size)
+
+        return connection.make_request(method, path_and_query, headers, self._new_source(first, last - first + 1),
+                                       None)
+
+    def _on_part_response(self, request, part):
+        code = request.response_code
+        if code < 200 or code >= 300:
+            self._fail(Exception('part {} failed with status {}'.format(part[0] + 1, code)))
+            return
+
+        with self._lock:
+            self._responses[part[0]] = request.response_headers
+
+        self._on_part_succeeded()
+
+    def _result(self):
+        return self._responses
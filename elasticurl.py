@@ -11,9 +11,10 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 import argparse
-import sys
 import os
-from awscrt import io, http
+import sys
+import time
+from awscrt import io, http, transfer
 try:
     from urllib.parse import urlparse
 except ImportError:
@@ -45,13 +46,28 @@ parser.add_argument('-o', '--output', required=False, help='FILE: dumps content-
 parser.add_argument('-t', '--trace', required=False, help='FILE: dumps logs to FILE instead of stderr.')
 parser.add_argument('-p', '--alpn_list', required=False, help='STRING: List of protocols for ALPN, semi-colon delimited')
 parser.add_argument('-v', '--verbose', required=False, help='ERROR|INFO|DEBUG|TRACE: log level to configure. Default is none.')
+parser.add_argument('--timeout', required=False, type=int, help='INT: time in milliseconds for the whole request to complete.', default=10000)
+parser.add_argument('--metrics', required=False, help='Prints where the time went to stderr', action='store_true', default=False)
+parser.add_argument('--compressed', required=False, help='Requests a gzip/deflate encoded response and decodes it', action='store_true', default=False)
+parser.add_argument('--parallel', required=False, type=int, help='INT: transfer with this many parts in flight at once. Downloads with ranged GETs to -o, or uploads --data_file in parts.')
+parser.add_argument('--part_size', required=False, type=int, help='INT: size in bytes of each part of a --parallel transfer.', default=transfer.DEFAULT_PART_SIZE)
 
 args = parser.parse_args()
 
+if args.parallel and not args.output and not args.data_file:
+    print('--parallel requires -o or --data_file')
+    exit(-1)
+
 output = getattr(sys.stdout, 'buffer', sys.stdout)
+body_sink = None
 
-if args.output:
-    output = open(args.output, mode='wb')
+if args.parallel and args.output:
+    # each part is written to the file by the downloader
+    output = None
+elif args.output:
+    # the body is written to the file natively, without going through python
+    body_sink = http.IncomingBodySink.from_file(args.output)
+    output = None
 
 # setup the logger if user request logging
 
@@ -145,59 +161,22 @@ def on_incoming_body(body_data):
     output.write(body_data)
 
 
-written = 0
-data_len = 0
-data_file = None
+# the request body is streamed natively, and the content-length header is filled in from it
+outgoing_body = None
 
 if args.data:
-    data_bytes = args.data.encode(encoding='utf-8')
-    data_len = len(data_bytes)
-elif args.data_file:
-    data_len = os.stat(args.data_file).st_size
-    data_file = open(args.data_file, 'rb')
-
-
-# invoked by the http request call as the request body has a buffer that can be written to
-def on_outgoing_body(request_body_mv):
-    global written
-    global data_len
-
-    actually_written = 0
-
-    if written < data_len:
-        mv_len = len(request_body_mv)
-        cpy_len = data_len - written
-        if data_len > mv_len:
-            cpy_len = mv_len
-
-        if args.data is not None:
-            request_body_mv[0:cpy_len] = data_bytes[written:written + cpy_len]
-            actually_written = cpy_len
-
-        elif data_file is not None:
-            actually_written = data_file.readinto(request_body_mv[0:cpy_len])
-
-        written += actually_written
-
-    if written == data_len:
-        return http.OutgoingHttpBodyState.Done, actually_written
-
-    return http.OutgoingHttpBodyState.InProgress, actually_written
+    outgoing_body = http.OutgoingBodySource.from_buffer(args.data.encode(encoding='utf-8'))
+elif args.data_file and not args.parallel:
+    outgoing_body = http.OutgoingBodySource.from_file(args.data_file)
 
 
 socket_options = io.SocketOptions()
 socket_options.connect_timeout_ms = args.connect_timeout
 
 hostname = url.hostname
-connect_future = http.HttpClientConnection.new_connection(client_bootstrap, hostname, port, socket_options,
-                                                          on_connection_shutdown, tls_connection_options)
-connection = connect_future.result()
 
 outgoing_headers = {'host': hostname, 'user-agent': 'elasticurl.py 1.0, Powered by the AWS Common Runtime.'}
 
-if data_len != 0:
-    outgoing_headers['content-length'] = str(data_len)
-
 if args.header:
     for i in args.header:
         name_value_tuple = i[0].split(':')
@@ -211,6 +190,32 @@ if uri_str is None or uri_str == '':
 if url.query is not None:
     uri_str += url.query
 
+if args.parallel:
+    connection_manager = http.HttpClientConnectionManager(client_bootstrap, socket_options,
+                                                          max_connections_per_endpoint=args.parallel)
+    start = time.time()
+    if args.data_file:
+        uploader = transfer.ParallelUploader(connection_manager, hostname, port, tls_connection_options,
+                                             part_size=args.part_size, max_parallel=args.parallel)
+        uploader.upload(method, uri_str, args.data_file, outgoing_headers).result()
+        size = os.stat(args.data_file).st_size
+        verb = 'uploaded'
+    else:
+        downloader = transfer.ParallelDownloader(connection_manager, hostname, port, tls_connection_options,
+                                                 part_size=args.part_size, max_parallel=args.parallel)
+        size = downloader.download(uri_str, args.output, outgoing_headers).result()
+        verb = 'downloaded'
+    elapsed = time.time() - start
+    connection_manager.close()
+    if size is not None:
+        sys.stderr.write('{} {} bytes in {:.3f}s ({:.1f} MB/s)\n'.format(
+            verb, size, elapsed, size / elapsed / 1000000 if elapsed > 0 else 0))
+    exit(0)
+
+connect_future = http.HttpClientConnection.new_connection(client_bootstrap, hostname, port, socket_options,
+                                                          on_connection_shutdown, tls_connection_options)
+connection = connect_future.result()
+
 
 # invoked as soon as the response headers are received
 def response_received_cb(ftr):
@@ -220,17 +225,37 @@ def response_received_cb(ftr):
 
 
 # make the request
-request = connection.make_request(method, uri_str, outgoing_headers, on_outgoing_body, on_incoming_body)
+request = connection.make_request(method, uri_str, outgoing_headers, outgoing_body,
+                                  on_incoming_body if body_sink is None else None,
+                                  incoming_body_sink=body_sink, decode_content=args.compressed,
+                                  total_timeout_ms=args.timeout)
 request.response_headers_received.add_done_callback(response_received_cb)
 
-# wait for response headers
-response_start = request.response_headers_received.result(timeout=10)
+# wait for response headers, the request fails natively once --timeout is up
+response_start = request.response_headers_received.result()
 
 # wait until the full response is finished
-response_finished = request.response_completed.result(timeout=10)
+response_finished = request.response_completed.result()
+
+if args.metrics:
+    connection_metrics = connection.metrics()
+    request_metrics = request.metrics()
+
+    def print_interval(name, start, end):
+        if start is not None and end is not None:
+            sys.stderr.write('{}: {:.3f}ms\n'.format(name, (end - start) / 1000000.0))
+
+    print_interval('connect', connection_metrics.connect_start, connection_metrics.established)
+    print_interval('tls handshake done after', connection_metrics.connect_start, connection_metrics.tls_negotiated)
+    print_interval('send request', request_metrics.request_made, request_metrics.request_sent)
+    print_interval('wait for first byte', request_metrics.request_sent, request_metrics.first_byte)
+    print_interval('receive headers', request_metrics.first_byte, request_metrics.headers_done)
+    print_interval('receive body', request_metrics.headers_done, request_metrics.completed)
+    sys.stderr.write('python callbacks: {:.3f}ms\n'.format(request_metrics.python_time / 1000000.0))
+    sys.stderr.write('sent {} bytes, received {} bytes\n'.format(request_metrics.bytes_sent,
+                                                                   request_metrics.bytes_received))
 request = None
 connection = None
 
-if data_file is not None:
-    data_file.close()
-output.close()
+if output is not None:
+    output.close()
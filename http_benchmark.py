@@ -0,0 +1,285 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+# Benchmarks the http client against an in-process HttpServer on loopback, so there is no network in the numbers.
+# Measures connections/sec and requests/sec with p50/p99 latencies for every combination of concurrency, response body
+# size and TLS on/off, and writes the results as JSON. Responses are read through on_incoming_body callbacks, so the
+# GIL-bound paths of the client are what is being measured.
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from awscrt import io, http
+
+# time.monotonic() doesn't exist in python 2
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--concurrency', required=False, type=int_list, help='INTS: comma separated numbers of connections/requests in flight at once.', default=[1, 8, 32])
+parser.add_argument('--body_sizes', required=False, type=int_list, help='INTS: comma separated response body sizes in bytes.', default=[0, 1024, 65536, 1048576])
+parser.add_argument('--duration', required=False, type=float, help='FLOAT: seconds to run each case for.', default=2.0)
+parser.add_argument('--tls', required=False, choices=['off', 'on', 'both'], help='run without TLS, with TLS using a self-signed certificate, or both.', default='both')
+parser.add_argument('--threads', required=False, type=int, help='INT: event loop threads, shared by the client and the server.', default=2)
+parser.add_argument('--scenarios', required=False, help='STRING: comma separated, out of connect and request.', default='connect,request')
+parser.add_argument('-o', '--output', required=False, help='FILE: write the JSON results to FILE instead of stdout.')
+
+args = parser.parse_args()
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def format_ms(value):
+    return '-' if value is None else '{:.3f}'.format(value)
+
+
+class Case(object):
+    """
+    Runs `concurrency` workers that each start the next operation from the completion of the last, until the
+    duration is up. A worker that hits an error stops, so a broken build can't spin.
+    """
+
+    def __init__(self, concurrency, duration):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.active = concurrency
+        self.done = threading.Event()
+        self.local = threading.local()
+        self.start_operation = None
+        self.deadline = None
+        self.started = None
+        self.finished = None
+
+    def run(self, start_operation):
+        self.start_operation = start_operation
+        self.started = _monotonic()
+        self.deadline = self.started + self.duration
+        for worker in range(self.concurrency):
+            self.next(worker)
+        # generous, in case an operation hangs
+        if not self.done.wait(self.duration * 10 + 30):
+            raise RuntimeError('timed out waiting for the benchmark workers')
+
+    def next(self, worker):
+        # an operation can complete before its callback is even attached, which runs the callback right here and
+        # would recurse, so those are queued for the outermost call on this thread to start
+        pending = getattr(self.local, 'pending', None)
+        if pending is not None:
+            pending.append(worker)
+            return
+
+        self.local.pending = pending = [worker]
+        try:
+            while pending:
+                worker = pending.pop()
+                if _monotonic() >= self.deadline:
+                    self.stop()
+                    continue
+                try:
+                    self.start_operation(worker, _monotonic())
+                except Exception:
+                    self.record(None)
+                    self.stop()
+        finally:
+            self.local.pending = None
+
+    def record(self, latency):
+        with self.lock:
+            if latency is None:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+
+    def stop(self):
+        with self.lock:
+            self.active -= 1
+            if self.active == 0:
+                self.finished = _monotonic()
+                self.done.set()
+
+    def results(self):
+        elapsed = self.finished - self.started
+        latencies = sorted(self.latencies)
+        return {
+            'count': len(latencies),
+            'errors': self.errors,
+            'elapsed_secs': elapsed,
+            'per_sec': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+            'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        }
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def make_self_signed_certificate(directory):
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                           '-subj', '/CN=localhost', '-keyout', key_path, '-out', cert_path],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return cert_path, key_path
+
+
+def bench_connect(client_bootstrap, port, socket_options, tls_connection_options, concurrency):
+    case = Case(concurrency, args.duration)
+
+    def start_connect(worker, started):
+        future = http.HttpClientConnection.new_connection(client_bootstrap, '127.0.0.1', port, socket_options,
+                                                          tls_connection_options=tls_connection_options)
+
+        def on_connected(future):
+            if future.exception() is not None:
+                case.record(None)
+                case.stop()
+                return
+            case.record(_monotonic() - started)
+            future.result().close()
+            case.next(worker)
+
+        future.add_done_callback(on_connected)
+
+    case.run(start_connect)
+    return case.results()
+
+
+def bench_request(client_bootstrap, port, socket_options, tls_connection_options, concurrency, body_size):
+    connections = [http.HttpClientConnection.new_connection(client_bootstrap, '127.0.0.1', port, socket_options,
+                                                            tls_connection_options=tls_connection_options)
+                   for _ in range(concurrency)]
+    connections = [future.result(30) for future in connections]
+    headers = {'host': 'localhost'}
+    case = Case(concurrency, args.duration)
+    received = [0] * concurrency
+
+    def start_request(worker, started):
+        def on_body(chunk):
+            received[worker] += len(chunk)
+
+        request = connections[worker].make_request('GET', '/', headers, None, on_body)
+
+        def on_completed(future):
+            if future.exception() is not None or request.response_code != 200:
+                case.record(None)
+                case.stop()
+                return
+            case.record(_monotonic() - started)
+            case.next(worker)
+
+        request.response_completed.add_done_callback(on_completed)
+
+    case.run(start_request)
+    for connection in connections:
+        connection.close()
+
+    results = case.results()
+    results['bytes_received'] = sum(received)
+    return results
+
+
+def main():
+    scenarios = args.scenarios.split(',')
+    tls_modes = {'off': [False], 'on': [True], 'both': [False, True]}[args.tls]
+
+    event_loop_group = io.EventLoopGroup(args.threads)
+    client_bootstrap = io.ClientBootstrap(event_loop_group)
+    server_bootstrap = io.ServerBootstrap(event_loop_group)
+    socket_options = io.SocketOptions()
+    socket_options.domain = io.SocketDomain.IPv4
+
+    cert_dir = tempfile.mkdtemp()
+    results = []
+    try:
+        for use_tls in tls_modes:
+            client_tls_options = None
+            server_tls_options = None
+            if use_tls:
+                cert_path, key_path = make_self_signed_certificate(cert_dir)
+                server_tls_ctx = io.ServerTlsContext(io.TlsContextOptions.create_server_from_path(cert_path, key_path))
+                server_tls_options = server_tls_ctx.new_connection_options()
+                # the handshake is measured, not certificate validation
+                client_ctx_options = io.TlsContextOptions()
+                client_ctx_options.verify_peer = False
+                client_tls_options = io.ClientTlsContext(client_ctx_options).new_connection_options()
+                client_tls_options.set_server_name('localhost')
+
+            for body_size in args.body_sizes:
+                port = free_port()
+                server = http.HttpServer(server_bootstrap, '127.0.0.1', port, socket_options,
+                                         response_body=b'x' * body_size, tls_connection_options=server_tls_options)
+                try:
+                    for concurrency in args.concurrency:
+                        case_results = []
+                        # a connection doesn't depend on the body size, so connect is only run once per server
+                        if 'connect' in scenarios and body_size == args.body_sizes[0]:
+                            case_results.append(('connect', bench_connect(
+                                client_bootstrap, port, socket_options, client_tls_options, concurrency)))
+                        if 'request' in scenarios:
+                            case_results.append(('request', bench_request(
+                                client_bootstrap, port, socket_options, client_tls_options, concurrency, body_size)))
+
+                        for scenario, result in case_results:
+                            result.update({'scenario': scenario, 'tls': use_tls, 'concurrency': concurrency,
+                                           'body_size': body_size if scenario == 'request' else None})
+                            results.append(result)
+                            sys.stderr.write('{scenario:8} tls={tls!s:5} concurrency={concurrency:<4} '
+                                             'body_size={body_size!s:8} {per_sec:10.1f}/s  p50={p50}ms  '
+                                             'p99={p99}ms  errors={errors}\n'.format(
+                                                 p50=format_ms(result['p50_ms']), p99=format_ms(result['p99_ms']),
+                                                 **result))
+                finally:
+                    server.close().result(30)
+    finally:
+        shutil.rmtree(cert_dir, ignore_errors=True)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'threads': args.threads,
+        'duration_secs': args.duration,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+main()
@@ -163,6 +163,10 @@ include_dirs = [path.join(dep_install_path, 'include')]
 libraries = list(aws_c_libs)
 library_dirs = [path.join(dep_install_path, lib_dir)]
 extra_objects = []
+define_macros = [
+    ('MAJOR_VERSION', '1'),
+    ('MINOR_VERSION', '0'),
+]
 
 if compiler_type == 'msvc':
      #if this is old python, we need to statically link in the VS2015 CRT, the invoking script
@@ -189,25 +193,32 @@ else:
     libraries += ['s2n', 'crypto', 'rt']
     aws_c_libs += ['s2n']
 
+if sys.platform != 'win32':
+    # zlib ships with the OS everywhere but windows, it backs gzip/deflate content-encoding for http
+    libraries += ['z']
+    define_macros += [('AWS_CRT_PYTHON_HAVE_ZLIB', '1')]
+
 # ensure that the child linker process gets our flags
 os.environ['LDFLAGS'] = ' '.join(ldflags)
 
 _aws_crt_python = setuptools.Extension(
     '_aws_crt_python',
     language='c',
-    define_macros=[
-        ('MAJOR_VERSION', '1'),
-        ('MINOR_VERSION', '0'),
-    ],
+    define_macros=define_macros,
     include_dirs=['/usr/local/include', dep_install_path + '/include'],
     library_dirs=['/usr/local/' + lib_dir, dep_install_path + '/' + lib_dir],
     libraries=libraries,
     sources=[
         'source/module.c',
+        'source/allocator.c',
         'source/io.c',
+        'source/logging.c',
         'source/mqtt_client.c',
         'source/mqtt_client_connection.c',
         'source/http_client_connection.c',
+        'source/http_content_encoding.c',
+        'source/http_headers.c',
+        'source/http_server.c',
         'source/crypto.c',
     ],
     extra_objects=extra_objects,
@@ -221,7 +232,7 @@ setuptools.setup(
     author_email="aws-sdk-common-runtime@amazon.com",
     description="A common runtime for AWS Python projects",
     url="https://github.com/awslabs/aws-crt-python",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['test', 'test.*']),
     classifiers=[
         "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 3",
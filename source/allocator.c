@@ -0,0 +1,237 @@
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "allocator.h"
+
+#include <aws/common/atomics.h>
+#include <aws/common/mutex.h>
+
+#include <stdlib.h>
+#include <string.h>
+
+static const char *s_subsystem_names[AWS_PY_SUBSYSTEM_COUNT] = {"common", "io", "http", "mqtt", "crypto"};
+
+/* Block sizes, header included, that the pooled mode keeps free lists of. Bigger allocations aren't pooled. The two
+ * largest are there for the bindings' own per-request state, struct py_http_stream is a little over 1KB. */
+static const size_t s_size_classes[] = {64, 128, 256, 512, 1024, 2048};
+#define SIZE_CLASS_COUNT (sizeof(s_size_classes) / sizeof(s_size_classes[0]))
+#define NO_SIZE_CLASS SIZE_CLASS_COUNT
+
+/* Free blocks kept per size class, past that they go back to the default allocator so a burst isn't held forever */
+static const size_t s_max_free_blocks = 4096;
+
+/* Prefixes every allocation outside of the default mode. The union keeps what follows it aligned like malloc. */
+union py_allocation_header {
+    struct {
+        size_t size;
+        uint32_t subsystem;
+        uint32_t size_class;
+    } info;
+    /* only while the block sits in a free list */
+    union py_allocation_header *next;
+    long double align;
+};
+
+struct py_size_class_pool {
+    struct aws_mutex lock;
+    union py_allocation_header *free_list;
+    size_t free_count;
+};
+
+struct py_subsystem_stats {
+    struct aws_atomic_var live_bytes;
+    struct aws_atomic_var peak_bytes;
+    struct aws_atomic_var allocations;
+    struct aws_atomic_var live_allocations;
+};
+
+static enum aws_py_allocator_mode s_mode = AWS_PY_ALLOCATOR_DEFAULT;
+static struct aws_allocator s_subsystem_allocators[AWS_PY_SUBSYSTEM_COUNT];
+static struct py_subsystem_stats s_subsystem_stats[AWS_PY_SUBSYSTEM_COUNT];
+static struct py_size_class_pool s_pools[SIZE_CLASS_COUNT];
+
+static void s_record_acquire(struct py_subsystem_stats *stats, size_t size) {
+    size_t live_bytes = aws_atomic_fetch_add(&stats->live_bytes, size) + size;
+    aws_atomic_fetch_add(&stats->allocations, 1);
+    aws_atomic_fetch_add(&stats->live_allocations, 1);
+
+    size_t peak_bytes = aws_atomic_load_int(&stats->peak_bytes);
+    while (live_bytes > peak_bytes && !aws_atomic_compare_exchange_int(&stats->peak_bytes, &peak_bytes, live_bytes)) {
+        /* peak_bytes now holds the value another thread stored, try again if we're still above it */
+    }
+}
+
+static void s_record_release(struct py_subsystem_stats *stats, size_t size) {
+    aws_atomic_fetch_sub(&stats->live_bytes, size);
+    aws_atomic_fetch_sub(&stats->live_allocations, 1);
+}
+
+static size_t s_size_class_for(size_t block_size) {
+    for (size_t i = 0; i < SIZE_CLASS_COUNT; ++i) {
+        if (block_size <= s_size_classes[i]) {
+            return i;
+        }
+    }
+    return NO_SIZE_CLASS;
+}
+
+static void *s_mem_acquire(struct aws_allocator *allocator, size_t size) {
+    size_t block_size = size + sizeof(union py_allocation_header);
+    if (block_size < size) {
+        return NULL;
+    }
+
+    size_t size_class = NO_SIZE_CLASS;
+    if (s_mode == AWS_PY_ALLOCATOR_POOLED) {
+        size_class = s_size_class_for(block_size);
+    }
+
+    union py_allocation_header *header = NULL;
+    if (size_class != NO_SIZE_CLASS) {
+        struct py_size_class_pool *pool = &s_pools[size_class];
+        aws_mutex_lock(&pool->lock);
+        header = pool->free_list;
+        if (header) {
+            pool->free_list = header->next;
+            pool->free_count--;
+        }
+        aws_mutex_unlock(&pool->lock);
+
+        block_size = s_size_classes[size_class];
+    }
+    if (!header) {
+        header = aws_mem_acquire(aws_default_allocator(), block_size);
+        if (!header) {
+            return NULL;
+        }
+    }
+
+    uint32_t subsystem = (uint32_t)(uintptr_t)allocator->impl;
+    header->info.size = size;
+    header->info.subsystem = subsystem;
+    header->info.size_class = (uint32_t)size_class;
+    s_record_acquire(&s_subsystem_stats[subsystem], size);
+
+    return header + 1;
+}
+
+static void s_mem_release(struct aws_allocator *allocator, void *ptr) {
+    (void)allocator;
+
+    if (!ptr) {
+        return;
+    }
+
+    /* the header says who acquired the block, which is who it's counted against, whichever allocator releases it */
+    union py_allocation_header *header = (union py_allocation_header *)ptr - 1;
+    size_t size_class = header->info.size_class;
+    s_record_release(&s_subsystem_stats[header->info.subsystem], header->info.size);
+
+    if (size_class != NO_SIZE_CLASS) {
+        struct py_size_class_pool *pool = &s_pools[size_class];
+        aws_mutex_lock(&pool->lock);
+        if (pool->free_count < s_max_free_blocks) {
+            header->next = pool->free_list;
+            pool->free_list = header;
+            pool->free_count++;
+            header = NULL;
+        }
+        aws_mutex_unlock(&pool->lock);
+    }
+
+    if (header) {
+        aws_mem_release(aws_default_allocator(), header);
+    }
+}
+
+void aws_py_allocator_init(void) {
+    const char *mode = getenv("AWS_CRT_PYTHON_ALLOCATOR");
+    if (mode && strcmp(mode, "tracking") == 0) {
+        s_mode = AWS_PY_ALLOCATOR_TRACKING;
+    } else if (mode && strcmp(mode, "pooled") == 0) {
+        s_mode = AWS_PY_ALLOCATOR_POOLED;
+    } else {
+        s_mode = AWS_PY_ALLOCATOR_DEFAULT;
+        return;
+    }
+
+    for (size_t i = 0; i < AWS_PY_SUBSYSTEM_COUNT; ++i) {
+        struct aws_allocator *allocator = &s_subsystem_allocators[i];
+        AWS_ZERO_STRUCT(*allocator);
+        allocator->mem_acquire = s_mem_acquire;
+        allocator->mem_release = s_mem_release;
+        /* mem_realloc is left NULL, aws_mem_realloc() then acquires, copies and releases */
+        allocator->impl = (void *)(uintptr_t)i;
+
+        struct py_subsystem_stats *stats = &s_subsystem_stats[i];
+        aws_atomic_init_int(&stats->live_bytes, 0);
+        aws_atomic_init_int(&stats->peak_bytes, 0);
+        aws_atomic_init_int(&stats->allocations, 0);
+        aws_atomic_init_int(&stats->live_allocations, 0);
+    }
+
+    for (size_t i = 0; i < SIZE_CLASS_COUNT; ++i) {
+        aws_mutex_init(&s_pools[i].lock);
+        s_pools[i].free_list = NULL;
+        s_pools[i].free_count = 0;
+    }
+}
+
+struct aws_allocator *aws_py_get_allocator(enum aws_py_subsystem subsystem) {
+    assert(subsystem < AWS_PY_SUBSYSTEM_COUNT);
+
+    if (s_mode == AWS_PY_ALLOCATOR_DEFAULT) {
+        return aws_default_allocator();
+    }
+    return &s_subsystem_allocators[subsystem];
+}
+
+PyObject *aws_py_allocator_get_mode(PyObject *self, PyObject *args) {
+    (void)self;
+    (void)args;
+
+    return PyLong_FromLong(s_mode);
+}
+
+PyObject *aws_py_allocator_get_stats(PyObject *self, PyObject *args) {
+    (void)self;
+    (void)args;
+
+    if (s_mode == AWS_PY_ALLOCATOR_DEFAULT) {
+        return PyTuple_New(0);
+    }
+
+    PyObject *stats_tuple = PyTuple_New(AWS_PY_SUBSYSTEM_COUNT);
+    if (!stats_tuple) {
+        return NULL;
+    }
+
+    for (size_t i = 0; i < AWS_PY_SUBSYSTEM_COUNT; ++i) {
+        struct py_subsystem_stats *stats = &s_subsystem_stats[i];
+        PyObject *entry = Py_BuildValue(
+            "(sKKKK)",
+            s_subsystem_names[i],
+            (unsigned long long)aws_atomic_load_int(&stats->live_bytes),
+            (unsigned long long)aws_atomic_load_int(&stats->peak_bytes),
+            (unsigned long long)aws_atomic_load_int(&stats->allocations),
+            (unsigned long long)aws_atomic_load_int(&stats->live_allocations));
+        if (!entry) {
+            Py_DECREF(stats_tuple);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(stats_tuple, i, entry);
+    }
+
+    return stats_tuple;
+}
@@ -0,0 +1,60 @@
+#ifndef AWS_CRT_PYTHON_ALLOCATOR_H
+#define AWS_CRT_PYTHON_ALLOCATOR_H
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "module.h"
+
+/* Must match awscrt.memory.AllocatorMode */
+enum aws_py_allocator_mode {
+    AWS_PY_ALLOCATOR_DEFAULT,
+    AWS_PY_ALLOCATOR_TRACKING,
+    AWS_PY_ALLOCATOR_POOLED,
+};
+
+/* Parts of the bindings that memory is attributed to, must match the names in allocator.c */
+enum aws_py_subsystem {
+    AWS_PY_SUBSYSTEM_COMMON,
+    AWS_PY_SUBSYSTEM_IO,
+    AWS_PY_SUBSYSTEM_HTTP,
+    AWS_PY_SUBSYSTEM_MQTT,
+    AWS_PY_SUBSYSTEM_CRYPTO,
+    AWS_PY_SUBSYSTEM_COUNT,
+};
+
+/**
+ * Picks the allocator mode from the AWS_CRT_PYTHON_ALLOCATOR environment variable: "default", "tracking" or "pooled".
+ * Must be called once, before any allocator is handed out, since memory has to be released by the mode that
+ * acquired it.
+ */
+void aws_py_allocator_init(void);
+
+/**
+ * Returns the allocator that a subsystem's native objects are allocated with. In the default mode this is
+ * aws_default_allocator() for every subsystem.
+ */
+struct aws_allocator *aws_py_get_allocator(enum aws_py_subsystem subsystem);
+
+/**
+ * Returns the allocator mode as an int.
+ */
+PyObject *aws_py_allocator_get_mode(PyObject *self, PyObject *args);
+
+/**
+ * Returns a tuple of (subsystem, live_bytes, peak_bytes, allocations, live_allocations) for every subsystem,
+ * or an empty tuple in the default mode, which doesn't keep count.
+ */
+PyObject *aws_py_allocator_get_stats(PyObject *self, PyObject *args);
+
+#endif /* AWS_CRT_PYTHON_ALLOCATOR_H */
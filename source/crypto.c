@@ -14,6 +14,7 @@
  */
 
 #include "crypto.h"
+#include "allocator.h"
 
 #include "aws/cal/hash.h"
 #include "aws/cal/hmac.h"
@@ -43,7 +44,7 @@ PyObject *aws_py_sha256_new(PyObject *self, PyObject *args) {
     (void)self;
     (void)args;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_CRYPTO);
 
     struct aws_hash *sha256 = aws_sha256_new(allocator);
 
@@ -58,7 +59,7 @@ PyObject *aws_py_md5_new(PyObject *self, PyObject *args) {
     (void)self;
     (void)args;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_CRYPTO);
 
     struct aws_hash *md5 = aws_md5_new(allocator);
 
@@ -124,7 +125,7 @@ PyObject *aws_py_hash_digest(PyObject *self, PyObject *args) {
 PyObject *aws_py_sha256_hmac_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_CRYPTO);
 
     const char *secret_ptr;
     Py_ssize_t secret_len;
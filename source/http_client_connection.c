@@ -13,15 +13,36 @@
  * permissions and limitations under the License.
  */
 #include "http_client_connection.h"
+#include "allocator.h"
 
+#include "http_content_encoding.h"
+#include "http_headers.h"
 #include "io.h"
 
 #include <aws/common/array_list.h>
+#include <aws/common/atomics.h>
+#include <aws/common/byte_buf.h>
+#include <aws/common/clock.h>
+#include <aws/common/condition_variable.h>
+#include <aws/common/linked_list.h>
+#include <aws/common/mutex.h>
 #include <aws/http/request_response.h>
+#include <aws/io/channel_bootstrap.h>
+#include <aws/io/event_loop.h>
 #include <aws/io/socket.h>
+#include <aws/io/tls_channel_handler.h>
+
+#include <errno.h>
+
+#ifdef _WIN32
+#    include <io.h>
+#else
+#    include <unistd.h>
+#endif /* _WIN32 */
 
 const char *s_capsule_name_http_client_connection = "aws_http_client_connection";
 const char *s_capsule_name_http_client_stream = "aws_http_client_stream";
+const char *s_capsule_name_http_completion_queue = "aws_http_completion_queue";
 
 struct py_http_connection {
     struct aws_allocator *allocator;
@@ -29,8 +50,23 @@ struct py_http_connection {
     PyObject *capsule;
     PyObject *on_connection_setup;
     PyObject *on_connection_shutdown;
+    /* from the bootstrap, the python connection keeps the bootstrap alive */
+    struct aws_event_loop_group *event_loop_group;
     bool destructor_called;
     bool shutdown_called;
+
+    /* aws_high_res_clock_get_ticks() times, 0 until reached. Written from the connection's event loop thread and
+     * read by aws_py_http_client_connection_get_metrics() without a lock. */
+    struct {
+        uint64_t connect_start_ns;
+        uint64_t tls_negotiated_ns;
+        uint64_t established_ns;
+        uint64_t closed_ns;
+        /* totals across every request completed on the connection */
+        uint64_t request_count;
+        uint64_t bytes_sent;
+        uint64_t bytes_received;
+    } metrics;
 };
 
 static void s_http_client_connection_destructor(PyObject *http_connection_capsule) {
@@ -56,6 +92,8 @@ static void s_http_client_connection_destructor(PyObject *http_connection_capsul
 static void s_on_client_connection_setup(struct aws_http_connection *connection, int error_code, void *user_data) {
 
     struct py_http_connection *py_connection = user_data;
+    aws_high_res_clock_get_ticks(&py_connection->metrics.established_ns);
+
     PyGILState_STATE state = PyGILState_Ensure();
     PyObject *result = NULL;
     PyObject *capsule = NULL;
@@ -82,6 +120,7 @@ static void s_on_client_connection_setup(struct aws_http_connection *connection,
 static void s_on_client_connection_shutdown(struct aws_http_connection *connection, int error_code, void *user_data) {
     (void)connection;
     struct py_http_connection *py_connection = user_data;
+    aws_high_res_clock_get_ticks(&py_connection->metrics.closed_ns);
     py_connection->shutdown_called = true;
     PyObject *on_conn_shutdown_cb = py_connection->on_connection_shutdown;
 
@@ -97,11 +136,30 @@ static void s_on_client_connection_shutdown(struct aws_http_connection *connecti
     Py_XDECREF(on_conn_shutdown_cb);
 }
 
+static void s_on_tls_negotiated(
+    struct aws_channel_handler *handler,
+    struct aws_channel_slot *slot,
+    int error_code,
+    void *user_data) {
+    (void)handler;
+    (void)slot;
+
+    struct py_http_connection *py_connection = user_data;
+    if (!error_code) {
+        aws_high_res_clock_get_ticks(&py_connection->metrics.tls_negotiated_ns);
+    }
+}
+
 PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
     (void)self;
 
     struct py_http_connection *py_connection = NULL;
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP);
+
+    /* a copy of the python options, so the handshake can be timed without touching options shared by others */
+    struct aws_tls_connection_options timed_tls_options;
+    AWS_ZERO_STRUCT(timed_tls_options);
+    bool has_timed_tls_options = false;
 
     PyObject *bootstrap_capsule = NULL;
     PyObject *on_connection_shutdown = NULL;
@@ -112,10 +170,11 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
     Py_ssize_t initial_window_size = PY_SSIZE_T_MAX;
     PyObject *py_socket_options = NULL;
     PyObject *tls_conn_options_capsule = NULL;
+    PyObject *py_initial_window_size = NULL;
 
     if (!PyArg_ParseTuple(
             args,
-            "OOOs#HOO",
+            "OOOs#HOO|O",
             &bootstrap_capsule,
             &on_connection_setup,
             &on_connection_shutdown,
@@ -123,11 +182,22 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
             &host_name_len,
             &port_number,
             &py_socket_options,
-            &tls_conn_options_capsule)) {
+            &tls_conn_options_capsule,
+            &py_initial_window_size)) {
         PyErr_SetNone(PyExc_ValueError);
         goto error;
     }
 
+    if (py_initial_window_size && py_initial_window_size != Py_None) {
+        initial_window_size = PyNumber_AsSsize_t(py_initial_window_size, PyExc_OverflowError);
+        if (initial_window_size < 0) {
+            if (!PyErr_Occurred()) {
+                PyErr_SetString(PyExc_ValueError, "initial_window_size must not be negative");
+            }
+            goto error;
+        }
+    }
+
     if (!bootstrap_capsule || !PyCapsule_CheckExact(bootstrap_capsule)) {
         PyErr_SetString(PyExc_ValueError, "bootstrap is invalid");
         goto error;
@@ -174,42 +244,7 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
     AWS_ZERO_STRUCT(*py_connection);
 
     struct aws_socket_options socket_options;
-    AWS_ZERO_STRUCT(socket_options);
-
-    PyObject *sock_domain = PyObject_GetAttrString(py_socket_options, "domain");
-    if (sock_domain) {
-        socket_options.domain = (enum aws_socket_domain)PyIntEnum_AsLong(sock_domain);
-    }
-
-    PyObject *sock_type = PyObject_GetAttrString(py_socket_options, "type");
-    if (sock_type) {
-        socket_options.type = (enum aws_socket_type)PyIntEnum_AsLong(sock_type);
-    }
-
-    PyObject *connect_timeout_ms = PyObject_GetAttrString(py_socket_options, "connect_timeout_ms");
-    if (connect_timeout_ms) {
-        socket_options.connect_timeout_ms = (uint32_t)PyLong_AsLong(connect_timeout_ms);
-    }
-
-    PyObject *keep_alive = PyObject_GetAttrString(py_socket_options, "keep_alive");
-    if (keep_alive) {
-        socket_options.keepalive = (bool)PyObject_IsTrue(keep_alive);
-    }
-
-    PyObject *keep_alive_interval = PyObject_GetAttrString(py_socket_options, "keep_alive_interval_secs");
-    if (keep_alive_interval) {
-        socket_options.keep_alive_interval_sec = (uint16_t)PyLong_AsLong(keep_alive_interval);
-    }
-
-    PyObject *keep_alive_timeout = PyObject_GetAttrString(py_socket_options, "keep_alive_timeout_secs");
-    if (keep_alive_timeout) {
-        socket_options.keep_alive_timeout_sec = (uint16_t)PyLong_AsLong(keep_alive_timeout);
-    }
-
-    PyObject *keep_alive_max_probes = PyObject_GetAttrString(py_socket_options, "keep_alive_max_probes");
-    if (keep_alive_timeout) {
-        socket_options.keep_alive_max_failed_probes = (uint16_t)PyLong_AsLong(keep_alive_max_probes);
-    }
+    aws_py_socket_options_init(&socket_options, py_socket_options);
 
     if (!PyCallable_Check(on_connection_setup)) {
         PyErr_SetString(PyExc_TypeError, "on_connection_setup is invalid");
@@ -218,6 +253,7 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
 
     Py_XINCREF(on_connection_setup);
     py_connection->on_connection_setup = on_connection_setup;
+    py_connection->event_loop_group = bootstrap->event_loop_group;
 
     py_connection->on_connection_shutdown = NULL;
     if (on_connection_shutdown && on_connection_shutdown != Py_None) {
@@ -231,6 +267,16 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
 
     py_connection->allocator = allocator;
 
+    if (connection_options) {
+        if (aws_tls_connection_options_copy(&timed_tls_options, connection_options)) {
+            PyErr_SetAwsLastError();
+            goto error;
+        }
+        has_timed_tls_options = true;
+        aws_tls_connection_options_set_callbacks(&timed_tls_options, s_on_tls_negotiated, NULL, NULL, py_connection);
+        connection_options = &timed_tls_options;
+    }
+
     struct aws_http_client_connection_options options;
     AWS_ZERO_STRUCT(options);
     options.self_size = sizeof(options);
@@ -245,19 +291,28 @@ PyObject *aws_py_http_client_connection_create(PyObject *self, PyObject *args) {
     options.on_setup = s_on_client_connection_setup;
     options.on_shutdown = s_on_client_connection_shutdown;
 
+    aws_high_res_clock_get_ticks(&py_connection->metrics.connect_start_ns);
     if (aws_http_client_connect(&options)) {
         PyErr_SetAwsLastError();
         goto error;
     }
 
+    /* the bootstrap keeps its own copy */
+    if (has_timed_tls_options) {
+        aws_tls_connection_options_clean_up(&timed_tls_options);
+    }
+
     Py_RETURN_NONE;
 
 error:
+    if (has_timed_tls_options) {
+        aws_tls_connection_options_clean_up(&timed_tls_options);
+    }
     if (py_connection) {
         aws_mem_release(allocator, py_connection);
     }
 
-    Py_RETURN_NONE;
+    return NULL;
 }
 
 PyObject *aws_py_http_client_connection_close(PyObject *self, PyObject *args) {
@@ -299,6 +354,78 @@ PyObject *aws_py_http_client_connection_is_open(PyObject *self, PyObject *args)
     Py_RETURN_FALSE;
 }
 
+PyObject *aws_py_http_client_connection_get_version(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *http_impl = NULL;
+    if (!PyArg_ParseTuple(args, "O", &http_impl)) {
+        return NULL;
+    }
+
+    struct py_http_connection *http_connection =
+        PyCapsule_GetPointer(http_impl, s_capsule_name_http_client_connection);
+    if (!http_connection) {
+        return NULL;
+    }
+
+    enum aws_http_version version = AWS_HTTP_VERSION_UNKNOWN;
+    if (http_connection->connection) {
+        version = aws_http_connection_get_version(http_connection->connection);
+    }
+
+    return PyLong_FromLong((long)version);
+}
+
+PyObject *aws_py_http_client_connection_get_metrics(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *http_impl = NULL;
+    if (!PyArg_ParseTuple(args, "O", &http_impl)) {
+        return NULL;
+    }
+
+    struct py_http_connection *http_connection =
+        PyCapsule_GetPointer(http_impl, s_capsule_name_http_client_connection);
+    if (!http_connection) {
+        return NULL;
+    }
+
+    return Py_BuildValue(
+        "(KKKKKKK)",
+        (unsigned long long)http_connection->metrics.connect_start_ns,
+        (unsigned long long)http_connection->metrics.tls_negotiated_ns,
+        (unsigned long long)http_connection->metrics.established_ns,
+        (unsigned long long)http_connection->metrics.closed_ns,
+        (unsigned long long)http_connection->metrics.request_count,
+        (unsigned long long)http_connection->metrics.bytes_sent,
+        (unsigned long long)http_connection->metrics.bytes_received);
+}
+
+struct py_http_body_source {
+    int fd;
+    /* when set, reads come from fd at offset instead of the current file position */
+    bool positioned;
+    Py_buffer buffer;
+    bool has_buffer;
+    uint64_t offset;
+    uint64_t remaining;
+    /* first error encountered while reading, reported in place of success when the stream completes */
+    int error_code;
+    /* the gzipped body, read from instead of fd or buffer when the request asked for it to be compressed */
+    struct aws_byte_buf compressed;
+    bool has_compressed;
+};
+
+/* Must match awscrt.http.IncomingBodyDelivery */
+enum py_http_incoming_body_delivery {
+    PY_HTTP_INCOMING_BODY_DELIVERY_BYTES,
+    PY_HTTP_INCOMING_BODY_DELIVERY_MEMORY_VIEW,
+    PY_HTTP_INCOMING_BODY_DELIVERY_BUFFER,
+};
+
+/* statuses an IncomingBodySink can be limited to are below this */
+#define PY_HTTP_MAX_STATUS 600
+
 struct py_http_stream {
     struct aws_allocator *allocator;
     struct aws_http_stream *stream;
@@ -307,9 +434,447 @@ struct py_http_stream {
     PyObject *on_incoming_headers_received;
     PyObject *on_read_body;
     PyObject *on_incoming_body;
-    PyObject *received_headers;
+    /* filled in natively as headers arrive, handed to python as a capsule once the header block is done */
+    struct py_http_headers *received_headers;
+    enum py_http_incoming_body_delivery incoming_body_delivery;
+    /* caller supplied buffer that incoming body is copied into for PY_HTTP_INCOMING_BODY_DELIVERY_BUFFER */
+    Py_buffer incoming_body_buffer;
+    bool has_incoming_body_buffer;
+
+    /* native destination for the response body, used instead of on_incoming_body. */
+    struct {
+        int fd;
+        /* when set, writes go to fd at offset instead of the current file position */
+        bool positioned;
+        Py_buffer buffer;
+        bool has_buffer;
+        uint64_t offset;
+        /* first error encountered while writing, reported in place of success when the stream completes */
+        int error_code;
+        /* when has_status_filter is set, only the body of a response whose status has its bit set is written */
+        bool has_status_filter;
+        uint8_t accepted_statuses[PY_HTTP_MAX_STATUS / 8];
+        /* set once the headers show a status that isn't accepted, the body is then dropped */
+        bool discarding;
+    } sink;
+
+    /* native source of the request body, used instead of on_read_body. */
+    struct py_http_body_source source;
+
+    /* when set, the window is only opened by explicit update_window() calls */
+    bool manual_window;
+
+    /* when set, a gzip or deflate content-encoding is undone before the body goes anywhere else */
+    bool decode_content;
+    struct py_http_content_decoder *decoder;
+    int decode_error_code;
+
+    /* small body chunks are collected here and handed to on_incoming_body in larger batches */
+    struct {
+        bool enabled;
+        /* deliver as soon as this much is buffered, 0 to only deliver on the timer */
+        size_t min_size;
+        /* deliver once the oldest buffered byte is this old, 0 to only deliver on size */
+        uint64_t max_delay_ns;
+        struct aws_byte_buf buffer;
+        /* event loop clock time that the oldest buffered byte arrived */
+        uint64_t first_arrival_ns;
+        /* the flush timer runs on a different event loop than the body callbacks */
+        struct aws_mutex lock;
+        struct aws_event_loop *event_loop;
+        struct aws_task flush_task;
+        bool flush_scheduled;
+        /* set once the remaining data has been delivered, a late flush task must not deliver anything */
+        bool complete;
+        int error_code;
+    } coalesce;
+
+    /* bounded buffer the body is pulled from by aws_py_http_client_stream_read(), instead of being pushed to
+     * on_incoming_body. The window is only reopened as data is read out of it. */
+    struct {
+        bool enabled;
+        uint8_t *data;
+        size_t capacity;
+        /* read position */
+        size_t head;
+        size_t len;
+        struct aws_mutex lock;
+        struct aws_condition_variable signal;
+        /* called with no arguments when data or completion arrives after a non-blocking read came up empty */
+        PyObject *on_available;
+        bool reader_waiting;
+        bool complete;
+        int error_code;
+    } ring;
+
+    /* the stream is failed with AWS_IO_SOCKET_TIMEOUT, and its connection closed, if the response hasn't started
+     * arriving by first_byte_ns or hasn't finished by total_ns after the request was made. */
+    struct {
+        bool enabled;
+        /* event loop clock times, 0 for no deadline */
+        uint64_t first_byte_ns;
+        uint64_t total_ns;
+        /* the timer runs on a different event loop than the stream callbacks */
+        struct aws_mutex lock;
+        struct aws_event_loop *event_loop;
+        struct aws_task task;
+        bool first_byte_received;
+        /* set once the stream completes, a late timer must not touch the stream */
+        bool complete;
+        int error_code;
+    } deadline;
+
+    /* the connection outlives its streams, they add to its totals as they complete */
+    struct py_http_connection *connection;
+
+    /* set for requests from aws_py_http_client_connection_make_requests(). These never call into python while in
+     * flight: the response is collected here and the completed stream handed to python through the queue. */
+    struct {
+        struct py_http_completion_queue *queue;
+        uint64_t tag;
+        struct aws_byte_buf body;
+        int response_code;
+        int error_code;
+        struct aws_linked_list_node node;
+    } batch;
+
+    /* aws_high_res_clock_get_ticks() times, 0 until reached, read by aws_py_http_client_stream_get_metrics() */
+    struct {
+        uint64_t request_made_ns;
+        /* once the body has been handed to the connection, or request_made_ns if there's no body */
+        uint64_t request_sent_ns;
+        uint64_t first_byte_ns;
+        uint64_t headers_done_ns;
+        uint64_t completed_ns;
+        uint64_t bytes_sent;
+        /* as they came off the wire, before any content-encoding was undone */
+        uint64_t bytes_received;
+        /* spent waiting for the GIL and running python callbacks. Only touched while holding the GIL. */
+        uint64_t python_ns;
+    } metrics;
+
+    /* one reference for the python capsule, plus one while a flush or deadline task is scheduled */
+    struct aws_atomic_var ref_count;
+};
+
+static void s_stream_release(struct py_http_stream *stream) {
+    if (aws_atomic_fetch_sub(&stream->ref_count, 1) != 1) {
+        return;
+    }
+
+    if (stream->coalesce.enabled) {
+        aws_mutex_clean_up(&stream->coalesce.lock);
+    }
+    aws_byte_buf_clean_up(&stream->coalesce.buffer);
+    aws_byte_buf_clean_up(&stream->source.compressed);
+    aws_byte_buf_clean_up(&stream->batch.body);
+    aws_py_http_content_decoder_destroy(stream->decoder);
+
+    if (stream->ring.enabled) {
+        aws_mutex_clean_up(&stream->ring.lock);
+        aws_condition_variable_clean_up(&stream->ring.signal);
+    }
+    if (stream->ring.data) {
+        aws_mem_release(stream->allocator, stream->ring.data);
+    }
+
+    if (stream->deadline.enabled) {
+        aws_mutex_clean_up(&stream->deadline.lock);
+    }
+    aws_mem_release(stream->allocator, stream);
+}
+
+/* Collects completed batch streams until python takes them with aws_py_http_completion_queue_get(). lock is never
+ * held while waiting for the GIL. */
+struct py_http_completion_queue {
+    struct aws_allocator *allocator;
+    struct aws_mutex lock;
+    struct aws_condition_variable signal;
+    /* completed streams, oldest first */
+    struct aws_linked_list completed;
+    /* submitted and not yet completed */
+    size_t pending;
+    uint64_t next_tag;
+    /* called with no arguments whenever pending drops to zero */
+    PyObject *on_idle;
+    /* one for the python capsule, plus one for each pending stream */
+    struct aws_atomic_var ref_count;
 };
 
+/* Closes the connection a stream was made on. Stream callbacks can fire before aws_http_stream_new_client_request()
+ * returns, while stream->stream is still NULL, so this goes through the connection captured when the request was made.
+ */
+static void s_close_stream_connection(struct py_http_stream *stream) {
+    if (stream->connection && stream->connection->connection) {
+        aws_http_connection_close(stream->connection->connection);
+    }
+}
+
+/* Frees a batch stream once it has completed. Does not require the GIL. */
+static void s_batch_stream_destroy(struct py_http_stream *stream) {
+    if (stream->stream) {
+        aws_http_stream_release(stream->stream);
+    }
+    aws_py_http_headers_destroy(stream->received_headers);
+    stream->received_headers = NULL;
+    /* python has its copy, a deadline task may hold the stream a while longer but has no use for the body */
+    aws_byte_buf_clean_up(&stream->batch.body);
+    s_stream_release(stream);
+}
+
+static void s_completion_queue_release(struct py_http_completion_queue *queue) {
+    if (aws_atomic_fetch_sub(&queue->ref_count, 1) != 1) {
+        return;
+    }
+
+    /* nobody is left to take these */
+    while (!aws_linked_list_empty(&queue->completed)) {
+        struct aws_linked_list_node *node = aws_linked_list_pop_front(&queue->completed);
+        s_batch_stream_destroy(AWS_CONTAINER_OF(node, struct py_http_stream, batch.node));
+    }
+
+    aws_condition_variable_clean_up(&queue->signal);
+    aws_mutex_clean_up(&queue->lock);
+    aws_mem_release(queue->allocator, queue);
+}
+
+/* Drops one pending entry, calling on_idle if that was the last. GIL must not be held, or be held re-entrantly. */
+static void s_completion_queue_settle(struct py_http_completion_queue *queue) {
+    aws_mutex_lock(&queue->lock);
+    bool idle = --queue->pending == 0 && queue->on_idle;
+    aws_condition_variable_notify_all(&queue->signal);
+    aws_mutex_unlock(&queue->lock);
+
+    if (idle) {
+        PyGILState_STATE state = PyGILState_Ensure();
+
+        aws_mutex_lock(&queue->lock);
+        PyObject *on_idle = queue->on_idle;
+        Py_XINCREF(on_idle);
+        aws_mutex_unlock(&queue->lock);
+
+        if (on_idle) {
+            PyObject *result = PyObject_CallFunction(on_idle, "()");
+            if (!result) {
+                PyErr_WriteUnraisable(PyErr_Occurred());
+            }
+            Py_XDECREF(result);
+            Py_DECREF(on_idle);
+        }
+
+        PyGILState_Release(state);
+    }
+}
+
+/* Hands a finished batch stream to the queue, which owns it from here on */
+static void s_completion_queue_push(struct py_http_completion_queue *queue, struct py_http_stream *stream) {
+    aws_mutex_lock(&queue->lock);
+    aws_linked_list_push_back(&queue->completed, &stream->batch.node);
+    aws_mutex_unlock(&queue->lock);
+
+    s_completion_queue_settle(queue);
+    s_completion_queue_release(queue);
+}
+
+/* Records how a batch stream ended and queues it. Called instead of anything that would involve python. */
+static void s_batch_stream_complete(struct py_http_stream *stream, int error_code) {
+    stream->batch.error_code = error_code;
+    if (stream->stream) {
+        aws_http_stream_get_incoming_response_status(stream->stream, &stream->batch.response_code);
+    }
+
+    if (stream->source.has_buffer) {
+        PyGILState_STATE state = PyGILState_Ensure();
+        PyBuffer_Release(&stream->source.buffer);
+        stream->source.has_buffer = false;
+        PyGILState_Release(state);
+    }
+
+    s_completion_queue_push(stream->batch.queue, stream);
+}
+
+static int s_sink_write_fd(int fd, bool positioned, uint64_t offset, struct aws_byte_cursor data) {
+    while (data.len > 0) {
+#ifdef _WIN32
+        unsigned int to_write = data.len > INT_MAX ? INT_MAX : (unsigned int)data.len;
+        if (positioned && _lseeki64(fd, (__int64)offset, SEEK_SET) < 0) {
+            return aws_raise_error(AWS_ERROR_SYS_CALL_FAILURE);
+        }
+        int written = _write(fd, data.ptr, to_write);
+#else
+        ssize_t written = positioned ? pwrite(fd, data.ptr, data.len, (off_t)offset) : write(fd, data.ptr, data.len);
+#endif /* _WIN32 */
+        if (written < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return aws_raise_error(AWS_ERROR_SYS_CALL_FAILURE);
+        }
+
+        aws_byte_cursor_advance(&data, (size_t)written);
+        offset += (uint64_t)written;
+    }
+
+    return AWS_OP_SUCCESS;
+}
+
+/* Writes a body chunk to the stream's native sink. Doesn't touch python, so the GIL is not needed. */
+static int s_sink_write(struct py_http_stream *stream, struct aws_byte_cursor data) {
+    if (stream->sink.has_buffer) {
+        uint64_t capacity = (uint64_t)stream->sink.buffer.len;
+        if (stream->sink.offset > capacity || capacity - stream->sink.offset < data.len) {
+            return aws_raise_error(AWS_ERROR_SHORT_BUFFER);
+        }
+
+        memcpy((uint8_t *)stream->sink.buffer.buf + stream->sink.offset, data.ptr, data.len);
+    } else if (s_sink_write_fd(stream->sink.fd, stream->sink.positioned, stream->sink.offset, data)) {
+        return AWS_OP_ERR;
+    }
+
+    stream->sink.offset += data.len;
+    return AWS_OP_SUCCESS;
+}
+
+static bool s_has_sink(const struct py_http_stream *stream) {
+    return stream->sink.has_buffer || stream->sink.fd >= 0;
+}
+
+/* Decides from the response status whether the body goes to the sink. Called once the header block is done. */
+static void s_sink_on_response_status(struct py_http_stream *stream, int response_code) {
+    if (!s_has_sink(stream) || !stream->sink.has_status_filter) {
+        return;
+    }
+
+    bool accepted = response_code >= 0 && response_code < PY_HTTP_MAX_STATUS &&
+                    (stream->sink.accepted_statuses[response_code / 8] & (1u << (response_code % 8)));
+    stream->sink.discarding = !accepted;
+}
+
+/* Fills as much of buf as possible from the source. Doesn't touch python, so the GIL is not needed. */
+static int s_source_read(struct py_http_body_source *source, struct aws_byte_buf *buf) {
+    size_t space = buf->capacity - buf->len;
+    size_t to_read = source->remaining < (uint64_t)space ? (size_t)source->remaining : space;
+
+    if (source->has_buffer || source->has_compressed) {
+        const uint8_t *data = source->has_compressed ? source->compressed.buffer : source->buffer.buf;
+        memcpy(buf->buffer + buf->len, data + source->offset, to_read);
+        buf->len += to_read;
+        source->offset += to_read;
+        source->remaining -= to_read;
+        return AWS_OP_SUCCESS;
+    }
+
+    while (to_read > 0) {
+#ifdef _WIN32
+        unsigned int chunk = to_read > INT_MAX ? INT_MAX : (unsigned int)to_read;
+        if (source->positioned && _lseeki64(source->fd, (__int64)source->offset, SEEK_SET) < 0) {
+            return aws_raise_error(AWS_ERROR_SYS_CALL_FAILURE);
+        }
+        int amount_read = _read(source->fd, buf->buffer + buf->len, chunk);
+#else
+        ssize_t amount_read = source->positioned
+                                  ? pread(source->fd, buf->buffer + buf->len, to_read, (off_t)source->offset)
+                                  : read(source->fd, buf->buffer + buf->len, to_read);
+#endif /* _WIN32 */
+        if (amount_read < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return aws_raise_error(AWS_ERROR_SYS_CALL_FAILURE);
+        }
+        if (amount_read == 0) {
+            /* the file shrank since content-length was computed, the request can't be completed correctly */
+            return aws_raise_error(AWS_ERROR_HTTP_OUTGOING_STREAM_LENGTH_INCORRECT);
+        }
+
+        buf->len += (size_t)amount_read;
+        source->offset += (uint64_t)amount_read;
+        source->remaining -= (uint64_t)amount_read;
+        to_read -= (size_t)amount_read;
+    }
+
+    return AWS_OP_SUCCESS;
+}
+
+/* Replaces the rest of source with its gzipped form, held in memory so its length is known up front.
+ * Doesn't touch python, so the GIL should be released around it. */
+static int s_compress_source(struct aws_allocator *allocator, struct py_http_body_source *source) {
+    int result = AWS_OP_ERR;
+    struct aws_byte_buf chunk;
+    AWS_ZERO_STRUCT(chunk);
+
+    struct py_http_content_encoder *encoder = aws_py_http_gzip_encoder_new(allocator);
+    if (!encoder) {
+        return AWS_OP_ERR;
+    }
+
+    /* a guess at the compressed size, it grows as needed */
+    size_t initial_size = source->remaining / 4 < SIZE_MAX ? (size_t)(source->remaining / 4) + 1024 : SIZE_MAX;
+    if (aws_byte_buf_init(&source->compressed, allocator, initial_size) ||
+        aws_byte_buf_init(&chunk, allocator, 64 * 1024)) {
+        goto done;
+    }
+
+    while (source->remaining > 0) {
+        chunk.len = 0;
+        if (s_source_read(source, &chunk) ||
+            aws_py_http_content_encoder_encode(encoder, aws_byte_cursor_from_buf(&chunk), false, &source->compressed)) {
+            goto done;
+        }
+    }
+
+    struct aws_byte_cursor empty;
+    AWS_ZERO_STRUCT(empty);
+    if (aws_py_http_content_encoder_encode(encoder, empty, true, &source->compressed)) {
+        goto done;
+    }
+
+    source->has_compressed = true;
+    source->offset = 0;
+    source->remaining = source->compressed.len;
+    result = AWS_OP_SUCCESS;
+
+done:
+    aws_byte_buf_clean_up(&chunk);
+    aws_py_http_content_encoder_destroy(encoder);
+    return result;
+}
+
+/* Adds the time since started_ns to the stream's python time. GIL must be held, started_ns should be from before it
+ * was asked for. */
+static void s_metrics_add_python_time(struct py_http_stream *stream, uint64_t started_ns) {
+    uint64_t now = 0;
+    aws_high_res_clock_get_ticks(&now);
+    stream->metrics.python_ns += now - started_ns;
+}
+
+static void s_metrics_on_body_sent(struct py_http_stream *stream, size_t len, enum aws_http_outgoing_body_state state) {
+    stream->metrics.bytes_sent += len;
+    if (state == AWS_HTTP_OUTGOING_BODY_DONE) {
+        aws_high_res_clock_get_ticks(&stream->metrics.request_sent_ns);
+    }
+}
+
+static enum aws_http_outgoing_body_state s_stream_outgoing_body_from_source(
+    struct aws_http_stream *internal_stream,
+    struct aws_byte_buf *buf,
+    void *user_data) {
+
+    struct py_http_stream *stream = user_data;
+    size_t prev_len = buf->len;
+
+    if (s_source_read(&stream->source, buf)) {
+        stream->source.error_code = aws_last_error();
+        aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+        return AWS_HTTP_OUTGOING_BODY_DONE;
+    }
+
+    enum aws_http_outgoing_body_state body_state =
+        stream->source.remaining == 0 ? AWS_HTTP_OUTGOING_BODY_DONE : AWS_HTTP_OUTGOING_BODY_IN_PROGRESS;
+    s_metrics_on_body_sent(stream, buf->len - prev_len, body_state);
+    return body_state;
+}
+
 static enum aws_http_outgoing_body_state s_stream_outgoing_body(
     struct aws_http_stream *internal_stream,
     struct aws_byte_buf *buf,
@@ -318,12 +883,14 @@ static enum aws_http_outgoing_body_state s_stream_outgoing_body(
 
     struct py_http_stream *stream = user_data;
 
+    uint64_t python_started_ns = 0;
+    aws_high_res_clock_get_ticks(&python_started_ns);
     PyGILState_STATE state = PyGILState_Ensure();
 
     PyObject *mv = aws_py_memory_view_from_byte_buffer(buf, PyBUF_WRITE);
 
     if (!mv) {
-        aws_http_connection_close(aws_http_stream_get_connection(stream->stream));
+        s_close_stream_connection(stream);
         PyGILState_Release(state);
         return AWS_HTTP_OUTGOING_BODY_DONE;
     }
@@ -338,101 +905,883 @@ static enum aws_http_outgoing_body_state s_stream_outgoing_body(
     Py_XDECREF(result);
     Py_XDECREF(mv);
 
+    s_metrics_add_python_time(stream, python_started_ns);
     PyGILState_Release(state);
 
     buf->len += written;
+    s_metrics_on_body_sent(stream, (size_t)written, body_state);
 
     return body_state;
 }
 
+static void s_deadline_task(struct aws_task *task, void *arg, enum aws_task_status status);
+
+/* deadline.lock must be held */
+static void s_deadline_schedule(struct py_http_stream *stream) {
+    uint64_t run_at = stream->deadline.total_ns;
+    if (!stream->deadline.first_byte_received && stream->deadline.first_byte_ns &&
+        (!run_at || stream->deadline.first_byte_ns < run_at)) {
+        run_at = stream->deadline.first_byte_ns;
+    }
+
+    aws_atomic_fetch_add(&stream->ref_count, 1);
+    aws_task_init(&stream->deadline.task, s_deadline_task, stream);
+    aws_event_loop_schedule_task_future(stream->deadline.event_loop, &stream->deadline.task, run_at);
+}
+
+static void s_deadline_task(struct aws_task *task, void *arg, enum aws_task_status status) {
+    (void)task;
+    struct py_http_stream *stream = arg;
+
+    aws_mutex_lock(&stream->deadline.lock);
+
+    if (status == AWS_TASK_STATUS_RUN_READY && !stream->deadline.complete) {
+        uint64_t now = 0;
+        aws_event_loop_current_clock_time(stream->deadline.event_loop, &now);
+
+        bool expired = (stream->deadline.total_ns && now >= stream->deadline.total_ns) ||
+                       (stream->deadline.first_byte_ns && !stream->deadline.first_byte_received &&
+                        now >= stream->deadline.first_byte_ns);
+
+        if (expired) {
+            /* there's no way to cancel just the stream, so the connection goes with it */
+            stream->deadline.error_code = AWS_IO_SOCKET_TIMEOUT;
+            s_close_stream_connection(stream);
+        } else if (stream->deadline.total_ns) {
+            /* the first byte made it in time, wait out the total */
+            s_deadline_schedule(stream);
+        }
+    }
+
+    aws_mutex_unlock(&stream->deadline.lock);
+
+    s_stream_release(stream);
+}
+
+static void s_deadline_on_first_byte(struct py_http_stream *stream) {
+    if (!stream->deadline.first_byte_ns) {
+        return;
+    }
+
+    aws_mutex_lock(&stream->deadline.lock);
+    stream->deadline.first_byte_received = true;
+    aws_mutex_unlock(&stream->deadline.lock);
+}
+
 static void s_on_incoming_response_headers(
     struct aws_http_stream *internal_stream,
     const struct aws_http_header *header_array,
     size_t num_headers,
     void *user_data) {
-    (void)internal_stream;
     struct py_http_stream *stream = user_data;
 
-    PyGILState_STATE state = PyGILState_Ensure();
+    if (!stream->metrics.first_byte_ns) {
+        aws_high_res_clock_get_ticks(&stream->metrics.first_byte_ns);
+    }
+    s_deadline_on_first_byte(stream);
+
+    /* python isn't involved until the whole block has arrived, so no GIL needed here */
+    if (aws_py_http_headers_append(stream->received_headers, header_array, num_headers)) {
+        aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+    }
+
+    if (stream->decode_content && !stream->decoder && !stream->decode_error_code) {
+        for (size_t i = 0; i < num_headers; ++i) {
+            if (!aws_byte_cursor_eq_c_str_ignore_case(&header_array[i].name, "content-encoding")) {
+                continue;
+            }
 
-    for (size_t i = 0; i < num_headers; ++i) {
-        PyObject *key = PyString_FromStringAndSize((const char *)header_array[i].name.ptr, header_array[i].name.len);
-        PyObject *value =
-            PyString_FromStringAndSize((const char *)header_array[i].value.ptr, header_array[i].value.len);
+            const struct aws_byte_cursor *encoding = &header_array[i].value;
+            if (!aws_byte_cursor_eq_c_str_ignore_case(encoding, "gzip") &&
+                !aws_byte_cursor_eq_c_str_ignore_case(encoding, "x-gzip") &&
+                !aws_byte_cursor_eq_c_str_ignore_case(encoding, "deflate")) {
+                /* identity, or something we can't undo. The body is passed through untouched. */
+                continue;
+            }
 
-        PyDict_SetItem(stream->received_headers, key, value);
+            stream->decoder = aws_py_http_content_decoder_new(stream->allocator);
+            if (!stream->decoder) {
+                stream->decode_error_code = aws_last_error();
+                aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+            }
+            break;
+        }
     }
-    PyGILState_Release(state);
 }
 
 static void s_on_incoming_header_block_done(struct aws_http_stream *internal_stream, bool has_body, void *user_data) {
 
     struct py_http_stream *stream = user_data;
 
-    PyGILState_STATE state = PyGILState_Ensure();
+    aws_high_res_clock_get_ticks(&stream->metrics.headers_done_ns);
+    if (!stream->metrics.first_byte_ns) {
+        stream->metrics.first_byte_ns = stream->metrics.headers_done_ns;
+    }
+    s_deadline_on_first_byte(stream);
+
     int response_code = 0;
     aws_http_stream_get_incoming_response_status(internal_stream, &response_code);
+    s_sink_on_response_status(stream, response_code);
+
+    if (stream->batch.queue) {
+        /* the headers stay put until the stream is taken from the queue */
+        return;
+    }
+
+    uint64_t python_started_ns = stream->metrics.headers_done_ns;
+    PyGILState_STATE state = PyGILState_Ensure();
 
     PyObject *has_body_obj = has_body ? Py_True : Py_False;
 
-    PyObject *result = PyObject_CallFunction(
-        stream->on_incoming_headers_received, "(OiO)", stream->received_headers, response_code, has_body_obj);
+    /* the capsule takes ownership of the headers */
+    PyObject *headers_capsule = aws_py_http_headers_to_capsule(stream->received_headers);
+    stream->received_headers = NULL;
+
+    PyObject *result = NULL;
+    if (headers_capsule) {
+        result = PyObject_CallFunction(
+            stream->on_incoming_headers_received, "(OiO)", headers_capsule, response_code, has_body_obj);
+    }
+    if (!result) {
+        PyErr_WriteUnraisable(PyErr_Occurred());
+    }
     Py_XDECREF(result);
-    Py_XDECREF(stream->received_headers);
-    Py_DECREF(stream->on_incoming_headers_received);
+    Py_XDECREF(headers_capsule);
+    Py_CLEAR(stream->on_incoming_headers_received);
+    s_metrics_add_python_time(stream, python_started_ns);
     PyGILState_Release(state);
 }
 
-static void s_on_incoming_response_body(
-    struct aws_http_stream *internal_stream,
-    const struct aws_byte_cursor *data,
-    size_t *out_window_update_size,
-    void *user_data) {
-    (void)internal_stream;
-    (void)out_window_update_size;
+/* Invokes on_incoming_body with the chunk as whatever type the stream asked for. GIL must be held. */
+static void s_deliver_incoming_body(struct py_http_stream *stream, struct aws_byte_cursor data) {
+    PyObject *result = NULL;
 
-    struct py_http_stream *stream = user_data;
+    switch (stream->incoming_body_delivery) {
+        case PY_HTTP_INCOMING_BODY_DELIVERY_MEMORY_VIEW: {
+            PyObject *mv = aws_py_memory_view_from_byte_cursor(&data);
+            if (!mv) {
+                break;
+            }
+            result = PyObject_CallFunction(stream->on_incoming_body, "(O)", mv);
+            /* the view is only promised to be valid during this callback */
+            aws_py_memory_view_release(mv);
+            break;
+        }
 
-    PyGILState_STATE state = PyGILState_Ensure();
+        case PY_HTTP_INCOMING_BODY_DELIVERY_BUFFER: {
+            size_t buffer_len = (size_t)stream->incoming_body_buffer.len;
+            /* fill the caller's buffer as many times as it takes to get through the chunk */
+            while (data.len > 0) {
+                size_t fill_len = data.len < buffer_len ? data.len : buffer_len;
+                memcpy(stream->incoming_body_buffer.buf, data.ptr, fill_len);
+                aws_byte_cursor_advance(&data, fill_len);
+
+                result = PyObject_CallFunction(stream->on_incoming_body, "(n)", (Py_ssize_t)fill_len);
+                if (!result) {
+                    PyErr_WriteUnraisable(PyErr_Occurred());
+                    return;
+                }
+                Py_DECREF(result);
+            }
+            return;
+        }
+
+        default:
+            result = PyObject_CallFunction(
+                stream->on_incoming_body, "(" BYTE_BUF_FORMAT_STR ")", (const char *)data.ptr, (Py_ssize_t)data.len);
+            break;
+    }
 
-    Py_ssize_t data_len = (Py_ssize_t)data->len;
-    PyObject *result =
-        PyObject_CallFunction(stream->on_incoming_body, "(" BYTE_BUF_FORMAT_STR ")", (const char *)data->ptr, data_len);
     if (!result) {
         PyErr_WriteUnraisable(PyErr_Occurred());
     }
     Py_XDECREF(result);
-    PyGILState_Release(state);
 }
 
-static void s_on_stream_complete(struct aws_http_stream *internal_stream, int error_code, void *user_data) {
-    (void)internal_stream;
-    struct py_http_stream *stream = user_data;
+/* Hands everything collected so far to on_incoming_body. coalesce.lock must be held, the GIL must not be. */
+static void s_coalesce_flush(struct py_http_stream *stream) {
+    if (stream->coalesce.buffer.len == 0) {
+        return;
+    }
 
+    uint64_t python_started_ns = 0;
+    aws_high_res_clock_get_ticks(&python_started_ns);
     PyGILState_STATE state = PyGILState_Ensure();
-
-    PyObject *result = PyObject_CallFunction(stream->on_stream_completed, "(i)", error_code);
-    Py_XDECREF(result);
-    Py_XDECREF(stream->on_stream_completed);
-    Py_XDECREF(stream->on_incoming_body);
-    Py_XDECREF(stream->on_read_body);
-
+    s_deliver_incoming_body(stream, aws_byte_cursor_from_buf(&stream->coalesce.buffer));
+    s_metrics_add_python_time(stream, python_started_ns);
     PyGILState_Release(state);
+
+    stream->coalesce.buffer.len = 0;
 }
 
-static void s_http_client_stream_destructor(PyObject *http_stream_capsule) {
-    struct py_http_stream *stream = PyCapsule_GetPointer(http_stream_capsule, s_capsule_name_http_client_stream);
-    assert(stream);
+static void s_coalesce_flush_task(struct aws_task *task, void *arg, enum aws_task_status status);
+
+/* coalesce.lock must be held */
+static void s_coalesce_schedule_flush(struct py_http_stream *stream, uint64_t delay_ns) {
+    uint64_t now = 0;
+    aws_event_loop_current_clock_time(stream->coalesce.event_loop, &now);
+
+    stream->coalesce.flush_scheduled = true;
+    aws_atomic_fetch_add(&stream->ref_count, 1);
+    aws_task_init(&stream->coalesce.flush_task, s_coalesce_flush_task, stream);
+    aws_event_loop_schedule_task_future(stream->coalesce.event_loop, &stream->coalesce.flush_task, now + delay_ns);
+}
+
+static void s_coalesce_flush_task(struct aws_task *task, void *arg, enum aws_task_status status) {
+    (void)task;
+    struct py_http_stream *stream = arg;
+
+    aws_mutex_lock(&stream->coalesce.lock);
+    stream->coalesce.flush_scheduled = false;
+
+    if (status == AWS_TASK_STATUS_RUN_READY && !stream->coalesce.complete && stream->coalesce.buffer.len > 0) {
+        uint64_t now = 0;
+        aws_event_loop_current_clock_time(stream->coalesce.event_loop, &now);
+        uint64_t age = now - stream->coalesce.first_arrival_ns;
+
+        /* the data that armed this timer may already have gone out on size, wait for whatever is buffered now */
+        if (age >= stream->coalesce.max_delay_ns) {
+            s_coalesce_flush(stream);
+        } else {
+            s_coalesce_schedule_flush(stream, stream->coalesce.max_delay_ns - age);
+        }
+    }
+
+    aws_mutex_unlock(&stream->coalesce.lock);
+    s_stream_release(stream);
+}
+
+/* Frees what only the in-flight stream uses, once it has completed and no stream callback can run anymore. A deadline
+ * or flush task may hold a reference until its timer fires, which must not keep these allocated until then. */
+static void s_stream_free_in_flight_state(struct py_http_stream *stream) {
+    aws_py_http_content_decoder_destroy(stream->decoder);
+    stream->decoder = NULL;
+    aws_byte_buf_clean_up(&stream->source.compressed);
+}
+
+/* Collects a body chunk, delivering once enough is buffered. Takes the GIL only when delivering. */
+static void s_coalesce_incoming_body(struct py_http_stream *stream, const struct aws_byte_cursor *data) {
+    aws_mutex_lock(&stream->coalesce.lock);
+
+    if (stream->coalesce.error_code) {
+        goto done;
+    }
+
+    if (stream->coalesce.buffer.len == 0 && stream->coalesce.event_loop) {
+        aws_event_loop_current_clock_time(stream->coalesce.event_loop, &stream->coalesce.first_arrival_ns);
+    }
+
+    if (aws_byte_buf_append_dynamic(&stream->coalesce.buffer, data)) {
+        stream->coalesce.error_code = aws_last_error();
+        s_close_stream_connection(stream);
+        goto done;
+    }
+
+    if (stream->coalesce.min_size && stream->coalesce.buffer.len >= stream->coalesce.min_size) {
+        s_coalesce_flush(stream);
+    } else if (stream->coalesce.event_loop && !stream->coalesce.flush_scheduled) {
+        s_coalesce_schedule_flush(stream, stream->coalesce.max_delay_ns);
+    }
+
+done:
+    aws_mutex_unlock(&stream->coalesce.lock);
+}
+
+/* Checks that required bytes fit in the ring. The ring never grows: the window keeps the server from sending more
+ * than the reader has made room for, so running out means the window was larger than the ring, and the stream fails
+ * rather than buffering without bound. ring.lock must be held. */
+static int s_ring_reserve(struct py_http_stream *stream, size_t required) {
+    if (required > stream->ring.capacity) {
+        return aws_raise_error(AWS_ERROR_SHORT_BUFFER);
+    }
+    return AWS_OP_SUCCESS;
+}
+
+/* Copies a body chunk into the ring and wakes up any reader. Takes the GIL only if an async reader is waiting. */
+static void s_ring_write(struct py_http_stream *stream, const struct aws_byte_cursor *data) {
+    aws_mutex_lock(&stream->ring.lock);
+
+    if (stream->ring.error_code) {
+        aws_mutex_unlock(&stream->ring.lock);
+        return;
+    }
+
+    if (s_ring_reserve(stream, stream->ring.len + data->len)) {
+        stream->ring.error_code = aws_last_error();
+        aws_mutex_unlock(&stream->ring.lock);
+        s_close_stream_connection(stream);
+        return;
+    }
+
+    size_t tail = (stream->ring.head + stream->ring.len) % stream->ring.capacity;
+    size_t first_len = stream->ring.capacity - tail;
+    if (first_len > data->len) {
+        first_len = data->len;
+    }
+    memcpy(stream->ring.data + tail, data->ptr, first_len);
+    memcpy(stream->ring.data, data->ptr + first_len, data->len - first_len);
+    stream->ring.len += data->len;
+
+    bool notify = stream->ring.reader_waiting;
+    stream->ring.reader_waiting = false;
+    aws_condition_variable_notify_all(&stream->ring.signal);
+    aws_mutex_unlock(&stream->ring.lock);
+
+    if (notify && stream->ring.on_available) {
+        PyGILState_STATE state = PyGILState_Ensure();
+        PyObject *result = PyObject_CallFunction(stream->ring.on_available, "()");
+        if (!result) {
+            PyErr_WriteUnraisable(PyErr_Occurred());
+        }
+        Py_XDECREF(result);
+        PyGILState_Release(state);
+    }
+}
+
+/* Sends a piece of (decoded) body to wherever the request asked for it to go */
+static void s_route_incoming_body(struct aws_byte_cursor data, void *user_data) {
+    struct py_http_stream *stream = user_data;
+
+    if (stream->batch.queue) {
+        if (!stream->batch.error_code && aws_byte_buf_append_dynamic(&stream->batch.body, &data)) {
+            stream->batch.error_code = aws_last_error();
+            s_close_stream_connection(stream);
+        }
+        return;
+    }
+
+    if (stream->ring.enabled) {
+        s_ring_write(stream, &data);
+        return;
+    }
+
+    if (s_has_sink(stream)) {
+        if (stream->sink.discarding) {
+            return;
+        }
+        if (!stream->sink.error_code && s_sink_write(stream, data)) {
+            stream->sink.error_code = aws_last_error();
+            s_close_stream_connection(stream);
+        }
+        return;
+    }
+
+    if (stream->coalesce.enabled) {
+        s_coalesce_incoming_body(stream, &data);
+        return;
+    }
+
+    uint64_t python_started_ns = 0;
+    aws_high_res_clock_get_ticks(&python_started_ns);
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    s_deliver_incoming_body(stream, data);
+
+    s_metrics_add_python_time(stream, python_started_ns);
+    PyGILState_Release(state);
+}
+
+static void s_on_incoming_response_body(
+    struct aws_http_stream *internal_stream,
+    const struct aws_byte_cursor *data,
+    size_t *out_window_update_size,
+    void *user_data) {
+    (void)internal_stream;
+
+    struct py_http_stream *stream = user_data;
+
+    stream->metrics.bytes_received += data->len;
+
+    if (stream->manual_window) {
+        *out_window_update_size = 0;
+    }
+
+    if (stream->ring.enabled) {
+        /* reopened by reads */
+        *out_window_update_size = 0;
+    }
+
+    if (stream->decode_error_code) {
+        return;
+    }
+
+    if (stream->decoder) {
+        if (aws_py_http_content_decoder_decode(stream->decoder, *data, s_route_incoming_body, stream)) {
+            stream->decode_error_code = aws_last_error();
+            s_close_stream_connection(stream);
+        }
+        return;
+    }
+
+    s_route_incoming_body(*data, stream);
+}
+
+static void s_on_stream_complete(struct aws_http_stream *internal_stream, int error_code, void *user_data) {
+    (void)internal_stream;
+    struct py_http_stream *stream = user_data;
+
+    aws_high_res_clock_get_ticks(&stream->metrics.completed_ns);
+    stream->connection->metrics.request_count++;
+    stream->connection->metrics.bytes_sent += stream->metrics.bytes_sent;
+    stream->connection->metrics.bytes_received += stream->metrics.bytes_received;
+
+    if (stream->deadline.enabled) {
+        aws_mutex_lock(&stream->deadline.lock);
+        stream->deadline.complete = true;
+        /* the timeout is why the connection went away, report it in place of whatever that caused */
+        if (stream->deadline.error_code) {
+            error_code = stream->deadline.error_code;
+        }
+        aws_mutex_unlock(&stream->deadline.lock);
+    }
+
+    /* whatever is still buffered goes out before completion is reported */
+    if (stream->coalesce.enabled) {
+        aws_mutex_lock(&stream->coalesce.lock);
+        s_coalesce_flush(stream);
+        stream->coalesce.complete = true;
+        /* a pending flush task sees complete and leaves the buffer alone */
+        aws_byte_buf_clean_up(&stream->coalesce.buffer);
+        aws_mutex_unlock(&stream->coalesce.lock);
+
+        if (!error_code && stream->coalesce.error_code) {
+            error_code = stream->coalesce.error_code;
+        }
+    }
+
+    if (!error_code && stream->source.error_code) {
+        error_code = stream->source.error_code;
+    }
+
+    if (!error_code && stream->sink.error_code) {
+        error_code = stream->sink.error_code;
+    }
+
+    /* a body cut off partway through a gzip member or deflate stream is an error, not a shorter body */
+    if (!error_code && stream->decoder && !stream->decode_error_code &&
+        aws_py_http_content_decoder_finish(stream->decoder)) {
+        stream->decode_error_code = aws_last_error();
+    }
+
+    if (!error_code && stream->decode_error_code) {
+        error_code = stream->decode_error_code;
+    }
+
+    s_stream_free_in_flight_state(stream);
+
+    if (stream->batch.queue) {
+        if (!error_code && stream->batch.error_code) {
+            error_code = stream->batch.error_code;
+        }
+        s_batch_stream_complete(stream, error_code);
+        return;
+    }
+
+    bool notify_reader = false;
+    if (stream->ring.enabled) {
+        aws_mutex_lock(&stream->ring.lock);
+        if (!error_code && stream->ring.error_code) {
+            error_code = stream->ring.error_code;
+        }
+        stream->ring.error_code = error_code;
+        stream->ring.complete = true;
+        notify_reader = stream->ring.reader_waiting;
+        stream->ring.reader_waiting = false;
+        aws_condition_variable_notify_all(&stream->ring.signal);
+        aws_mutex_unlock(&stream->ring.lock);
+    }
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    if (notify_reader && stream->ring.on_available) {
+        PyObject *available_result = PyObject_CallFunction(stream->ring.on_available, "()");
+        if (!available_result) {
+            PyErr_WriteUnraisable(PyErr_Occurred());
+        }
+        Py_XDECREF(available_result);
+    }
+    Py_CLEAR(stream->ring.on_available);
+
+    PyObject *result = PyObject_CallFunction(stream->on_stream_completed, "(i)", error_code);
+    Py_XDECREF(result);
+    Py_XDECREF(stream->on_stream_completed);
+    Py_XDECREF(stream->on_incoming_body);
+    Py_XDECREF(stream->on_read_body);
+
+    if (stream->has_incoming_body_buffer) {
+        PyBuffer_Release(&stream->incoming_body_buffer);
+        stream->has_incoming_body_buffer = false;
+    }
+
+    if (stream->sink.has_buffer) {
+        PyBuffer_Release(&stream->sink.buffer);
+        stream->sink.has_buffer = false;
+    }
+
+    if (stream->source.has_buffer) {
+        PyBuffer_Release(&stream->source.buffer);
+        stream->source.has_buffer = false;
+    }
+
+    /* the stream failed before the header block was done */
+    Py_CLEAR(stream->on_incoming_headers_received);
+    aws_py_http_headers_destroy(stream->received_headers);
+    stream->received_headers = NULL;
+
+    PyGILState_Release(state);
+}
+
+static void s_http_client_stream_destructor(PyObject *http_stream_capsule) {
+    struct py_http_stream *stream = PyCapsule_GetPointer(http_stream_capsule, s_capsule_name_http_client_stream);
+    assert(stream);
+
+    /* nobody is left to read what the completed stream buffered, even if a deadline task keeps it around */
+    if (stream->ring.enabled) {
+        aws_mutex_lock(&stream->ring.lock);
+        if (stream->ring.complete && stream->ring.data) {
+            aws_mem_release(stream->allocator, stream->ring.data);
+            stream->ring.data = NULL;
+            stream->ring.capacity = 0;
+            stream->ring.len = 0;
+        }
+        aws_mutex_unlock(&stream->ring.lock);
+    }
 
     aws_http_stream_release(stream->stream);
-    aws_mem_release(stream->allocator, stream);
+    s_stream_release(stream);
+}
+
+/* Reads an awscrt.http.IncomingBodySink into stream->sink. Sets a python exception and returns AWS_OP_ERR on failure */
+static int s_init_sink_from_py(struct py_http_stream *stream, PyObject *py_sink) {
+    int result = AWS_OP_ERR;
+    PyObject *fd = PyObject_GetAttrString(py_sink, "_fd");
+    PyObject *buffer = PyObject_GetAttrString(py_sink, "_buffer");
+    PyObject *offset = PyObject_GetAttrString(py_sink, "_offset");
+    PyObject *statuses = PyObject_GetAttrString(py_sink, "_statuses");
+    if (!fd || !buffer || !offset || !statuses) {
+        goto done;
+    }
+
+    if (statuses != Py_None) {
+        Py_ssize_t num_statuses = PySequence_Size(statuses);
+        if (num_statuses < 0) {
+            goto done;
+        }
+        for (Py_ssize_t i = 0; i < num_statuses; ++i) {
+            PyObject *status_obj = PySequence_GetItem(statuses, i);
+            if (!status_obj) {
+                goto done;
+            }
+            long status = PyLong_AsLong(status_obj);
+            Py_DECREF(status_obj);
+            if (PyErr_Occurred()) {
+                goto done;
+            }
+            if (status < 0 || status >= PY_HTTP_MAX_STATUS) {
+                PyErr_SetString(PyExc_ValueError, "incoming body sink status out of range");
+                goto done;
+            }
+            stream->sink.accepted_statuses[status / 8] |= (uint8_t)(1u << (status % 8));
+        }
+        stream->sink.has_status_filter = true;
+    }
+
+    if (offset != Py_None) {
+        stream->sink.offset = (uint64_t)PyLong_AsUnsignedLongLong(offset);
+        if (PyErr_Occurred()) {
+            goto done;
+        }
+    }
+
+    if (buffer != Py_None) {
+        if (PyObject_GetBuffer(buffer, &stream->sink.buffer, PyBUF_WRITABLE)) {
+            goto done;
+        }
+        stream->sink.has_buffer = true;
+    } else if (fd != Py_None) {
+        stream->sink.fd = (int)PyLong_AsLong(fd);
+        if (PyErr_Occurred()) {
+            goto done;
+        }
+        stream->sink.positioned = offset != Py_None;
+    } else {
+        PyErr_SetString(PyExc_ValueError, "incoming body sink has neither a fd nor a buffer");
+        goto done;
+    }
+
+    result = AWS_OP_SUCCESS;
+
+done:
+    Py_XDECREF(fd);
+    Py_XDECREF(buffer);
+    Py_XDECREF(offset);
+    Py_XDECREF(statuses);
+    return result;
+}
+
+/* Reads an awscrt.http.OutgoingBodySource into source. Sets a python exception and returns AWS_OP_ERR on failure */
+static int s_init_source_from_py(struct py_http_body_source *source, PyObject *py_source) {
+    int result = AWS_OP_ERR;
+    PyObject *fd = PyObject_GetAttrString(py_source, "_fd");
+    PyObject *buffer = PyObject_GetAttrString(py_source, "_buffer");
+    PyObject *offset = PyObject_GetAttrString(py_source, "_offset");
+    PyObject *length = PyObject_GetAttrString(py_source, "length");
+    if (!fd || !buffer || !offset || !length) {
+        goto done;
+    }
+
+    if (offset != Py_None) {
+        source->offset = (uint64_t)PyLong_AsUnsignedLongLong(offset);
+    }
+    source->remaining = (uint64_t)PyLong_AsUnsignedLongLong(length);
+    if (PyErr_Occurred()) {
+        goto done;
+    }
+
+    if (buffer != Py_None) {
+        if (PyObject_GetBuffer(buffer, &source->buffer, PyBUF_SIMPLE)) {
+            goto done;
+        }
+        source->has_buffer = true;
+
+        uint64_t available = (uint64_t)source->buffer.len;
+        if (source->offset > available || available - source->offset < source->remaining) {
+            PyErr_SetString(PyExc_ValueError, "outgoing body source offset and length exceed the buffer");
+            goto done;
+        }
+    } else if (fd != Py_None) {
+        source->fd = (int)PyLong_AsLong(fd);
+        if (PyErr_Occurred()) {
+            goto done;
+        }
+        source->positioned = offset != Py_None;
+    } else {
+        PyErr_SetString(PyExc_ValueError, "outgoing body source has neither a fd nor a buffer");
+        goto done;
+    }
+
+    result = AWS_OP_SUCCESS;
+
+done:
+    Py_XDECREF(fd);
+    Py_XDECREF(buffer);
+    Py_XDECREF(offset);
+    Py_XDECREF(length);
+    return result;
+}
+
+/* Reads the request's coalescing settings into stream->coalesce. Sets a python exception and returns AWS_OP_ERR on
+ * failure */
+static int s_init_coalesce_from_py(
+    struct py_http_stream *stream,
+    struct py_http_connection *py_connection,
+    PyObject *py_http_request) {
+
+    PyObject *min_size = PyObject_GetAttrString(py_http_request, "_incoming_body_min_chunk_size");
+    PyObject *max_delay_ms = PyObject_GetAttrString(py_http_request, "_incoming_body_max_delay_ms");
+    int result = AWS_OP_ERR;
+    if (!min_size || !max_delay_ms) {
+        goto done;
+    }
+
+    if (min_size != Py_None) {
+        stream->coalesce.min_size = (size_t)PyLong_AsUnsignedLongLong(min_size);
+    }
+    if (max_delay_ms != Py_None) {
+        stream->coalesce.max_delay_ns = (uint64_t)PyLong_AsUnsignedLongLong(max_delay_ms) * 1000000;
+    }
+    if (PyErr_Occurred()) {
+        goto done;
+    }
+
+    result = AWS_OP_SUCCESS;
+    if (!stream->coalesce.min_size && !stream->coalesce.max_delay_ns) {
+        goto done;
+    }
+
+    /* room for a full batch, plus the chunk that tips it over */
+    size_t initial_size = stream->coalesce.min_size ? stream->coalesce.min_size * 2 : 16 * 1024;
+    if (aws_byte_buf_init(&stream->coalesce.buffer, stream->allocator, initial_size)) {
+        PyErr_SetAwsLastError();
+        result = AWS_OP_ERR;
+        goto done;
+    }
+
+    if (aws_mutex_init(&stream->coalesce.lock)) {
+        PyErr_SetAwsLastError();
+        result = AWS_OP_ERR;
+        goto done;
+    }
+    stream->coalesce.enabled = true;
+
+    if (stream->coalesce.max_delay_ns) {
+        stream->coalesce.event_loop = aws_event_loop_group_get_next_loop(py_connection->event_loop_group);
+    }
+
+done:
+    Py_XDECREF(min_size);
+    Py_XDECREF(max_delay_ms);
+    return result;
+}
+
+/* Reads the request's deadlines into stream->deadline, relative to now. Sets a python exception and returns
+ * AWS_OP_ERR on failure */
+static int s_init_deadline_from_py(
+    struct py_http_stream *stream,
+    struct py_http_connection *py_connection,
+    PyObject *py_http_request) {
+
+    PyObject *first_byte_timeout_ms = PyObject_GetAttrString(py_http_request, "_first_byte_timeout_ms");
+    PyObject *total_timeout_ms = PyObject_GetAttrString(py_http_request, "_total_timeout_ms");
+    int result = AWS_OP_ERR;
+    if (!first_byte_timeout_ms || !total_timeout_ms) {
+        goto done;
+    }
+
+    if (first_byte_timeout_ms == Py_None && total_timeout_ms == Py_None) {
+        result = AWS_OP_SUCCESS;
+        goto done;
+    }
+
+    stream->deadline.event_loop = aws_event_loop_group_get_next_loop(py_connection->event_loop_group);
+    uint64_t now = 0;
+    aws_event_loop_current_clock_time(stream->deadline.event_loop, &now);
+
+    if (first_byte_timeout_ms != Py_None) {
+        stream->deadline.first_byte_ns = now + (uint64_t)PyLong_AsUnsignedLongLong(first_byte_timeout_ms) * 1000000;
+    }
+    if (total_timeout_ms != Py_None) {
+        stream->deadline.total_ns = now + (uint64_t)PyLong_AsUnsignedLongLong(total_timeout_ms) * 1000000;
+    }
+    if (PyErr_Occurred()) {
+        goto done;
+    }
+
+    if (aws_mutex_init(&stream->deadline.lock)) {
+        PyErr_SetAwsLastError();
+        goto done;
+    }
+    stream->deadline.enabled = true;
+    result = AWS_OP_SUCCESS;
+
+done:
+    Py_XDECREF(first_byte_timeout_ms);
+    Py_XDECREF(total_timeout_ms);
+    return result;
+}
+
+/* Sets up stream->ring if the request asked to pull its body. Sets a python exception and returns AWS_OP_ERR on
+ * failure */
+static int s_init_ring_from_py(struct py_http_stream *stream, PyObject *py_http_request) {
+    PyObject *capacity = PyObject_GetAttrString(py_http_request, "_incoming_body_stream_capacity");
+    if (!capacity) {
+        return AWS_OP_ERR;
+    }
+
+    if (capacity == Py_None) {
+        Py_DECREF(capacity);
+        return AWS_OP_SUCCESS;
+    }
+
+    stream->ring.capacity = (size_t)PyLong_AsUnsignedLongLong(capacity);
+    Py_DECREF(capacity);
+    if (PyErr_Occurred()) {
+        return AWS_OP_ERR;
+    }
+
+    if (stream->ring.capacity == 0) {
+        PyErr_SetString(PyExc_ValueError, "incoming_body_stream_capacity must be positive");
+        return AWS_OP_ERR;
+    }
+
+    PyObject *on_available = PyObject_GetAttrString(py_http_request, "_on_incoming_body_available");
+    if (!on_available) {
+        return AWS_OP_ERR;
+    }
+    if (on_available != Py_None) {
+        stream->ring.on_available = on_available;
+    } else {
+        Py_DECREF(on_available);
+    }
+
+    stream->ring.data = aws_mem_acquire(stream->allocator, stream->ring.capacity);
+    if (!stream->ring.data) {
+        PyErr_SetAwsLastError();
+        return AWS_OP_ERR;
+    }
+
+    if (aws_mutex_init(&stream->ring.lock)) {
+        PyErr_SetAwsLastError();
+        return AWS_OP_ERR;
+    }
+
+    if (aws_condition_variable_init(&stream->ring.signal)) {
+        aws_mutex_clean_up(&stream->ring.lock);
+        PyErr_SetAwsLastError();
+        return AWS_OP_ERR;
+    }
+    stream->ring.enabled = true;
+
+    return AWS_OP_SUCCESS;
+}
+
+/* Fills headers, a zeroed list, with those of prepared_headers (may be NULL) that overrides (a dict, may be NULL) has
+ * no value for, followed by all of overrides. The cursors point into both, which must outlive the list. Names are
+ * compared case-insensitively. An empty result leaves the list zeroed. */
+static int s_build_request_headers(
+    struct aws_allocator *allocator,
+    const struct py_http_headers *prepared_headers,
+    PyObject *overrides,
+    struct aws_array_list *headers) {
+
+    size_t num_overrides = overrides ? (size_t)PyDict_Size(overrides) : 0;
+    size_t num_prepared_headers = prepared_headers ? aws_py_http_headers_count(prepared_headers) : 0;
+    if (num_overrides + num_prepared_headers == 0) {
+        return AWS_OP_SUCCESS;
+    }
+
+    /* one spare, for a content-length added by the caller */
+    if (aws_array_list_init_dynamic(
+            headers, allocator, num_overrides + num_prepared_headers + 1, sizeof(struct aws_http_header))) {
+        return AWS_OP_ERR;
+    }
+
+    PyObject *key, *value;
+    Py_ssize_t pos = 0;
+
+    for (size_t i = 0; i < num_prepared_headers; ++i) {
+        struct aws_http_header http_header;
+        aws_py_http_headers_at(prepared_headers, i, &http_header);
+
+        bool overridden = false;
+        pos = 0;
+        while (!overridden && num_overrides && PyDict_Next(overrides, &pos, &key, &value)) {
+            struct aws_byte_cursor override_name = aws_byte_cursor_from_pystring(key);
+            overridden = aws_byte_cursor_eq_ignore_case(&http_header.name, &override_name);
+        }
+
+        if (!overridden) {
+            aws_array_list_push_back(headers, &http_header);
+        }
+    }
+
+    pos = 0;
+    while (num_overrides && PyDict_Next(overrides, &pos, &key, &value)) {
+        struct aws_http_header http_header;
+        http_header.name = aws_byte_cursor_from_pystring(key);
+        http_header.value = aws_byte_cursor_from_pystring(value);
+
+        aws_array_list_push_back(headers, &http_header);
+    }
+
+    return AWS_OP_SUCCESS;
 }
 
 PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *args) {
     (void)self;
 
     struct py_http_connection *py_connection = NULL;
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP);
 
     struct py_http_stream *stream = aws_mem_acquire(allocator, sizeof(struct py_http_stream));
     if (!stream) {
@@ -442,11 +1791,18 @@ PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *a
 
     AWS_ZERO_STRUCT(*stream);
     stream->allocator = allocator;
+    stream->sink.fd = -1;
+    stream->source.fd = -1;
+    aws_atomic_init_int(&stream->ref_count, 1);
 
     PyObject *http_connection_capsule = NULL;
     PyObject *py_http_request = NULL;
     PyObject *on_stream_completed = NULL;
     PyObject *on_incoming_headers_received = NULL;
+    /* the request's cursors point into these until the stream has been made */
+    PyObject *method_str = NULL;
+    PyObject *uri_str = NULL;
+    PyObject *request_headers = NULL;
 
     if (!PyArg_ParseTuple(
             args,
@@ -491,7 +1847,7 @@ PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *a
     request_options.self_size = sizeof(request_options);
     request_options.client_connection = py_connection->connection;
 
-    PyObject *method_str = PyObject_GetAttrString(py_http_request, "method");
+    method_str = PyObject_GetAttrString(py_http_request, "method");
     if (!method_str) {
         PyErr_SetString(PyExc_ValueError, "http method is required");
         goto clean_up_stream;
@@ -499,7 +1855,7 @@ PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *a
 
     request_options.method = aws_byte_cursor_from_pystring(method_str);
 
-    PyObject *uri_str = PyObject_GetAttrString(py_http_request, "path_and_query");
+    uri_str = PyObject_GetAttrString(py_http_request, "path_and_query");
     if (!uri_str) {
         PyErr_SetString(PyExc_ValueError, "The URI path and query is required");
         goto clean_up_stream;
@@ -507,71 +1863,794 @@ PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *a
 
     request_options.uri = aws_byte_cursor_from_pystring(uri_str);
 
-    PyObject *request_headers = PyObject_GetAttrString(py_http_request, "outgoing_headers");
+    request_headers = PyObject_GetAttrString(py_http_request, "outgoing_headers");
     if (!request_headers) {
         PyErr_SetString(PyExc_ValueError, "outgoing headers is required");
         goto clean_up_stream;
     }
 
-    Py_ssize_t num_headers = PyDict_Size(request_headers);
     struct aws_array_list headers;
+    AWS_ZERO_STRUCT(headers);
 
-    if (num_headers > 0) {
-        if (aws_array_list_init_dynamic(&headers, allocator, (size_t)num_headers, sizeof(struct aws_http_header))) {
-            PyErr_SetAwsLastError();
+    /* headers encoded once by a PreparedRequest, outgoing_headers only holds this request's overrides */
+    PyObject *prepared_headers_capsule = PyObject_GetAttrString(py_http_request, "_prepared_headers");
+    if (!prepared_headers_capsule) {
+        goto clean_up_stream;
+    }
+    struct py_http_headers *prepared_headers = NULL;
+    if (prepared_headers_capsule != Py_None) {
+        prepared_headers = aws_py_http_headers_from_capsule(prepared_headers_capsule);
+    }
+    /* the request keeps the block alive until we're done with it */
+    Py_DECREF(prepared_headers_capsule);
+    if (PyErr_Occurred()) {
+        goto clean_up_stream;
+    }
+
+    if (s_build_request_headers(allocator, prepared_headers, request_headers, &headers)) {
+        PyErr_SetAwsLastError();
+        goto clean_up_headers;
+    }
+    request_options.header_array = headers.data;
+    request_options.num_headers = aws_array_list_length(&headers);
+
+    /* sized for the decimal length of a uint64 */
+    char compressed_length[24];
+    PyObject *body_source = PyObject_GetAttrString(py_http_request, "_outgoing_body_source");
+    if (body_source && body_source != Py_None) {
+        int source_err = s_init_source_from_py(&stream->source, body_source);
+        Py_DECREF(body_source);
+        if (source_err) {
             goto clean_up_headers;
         }
+        request_options.stream_outgoing_body = s_stream_outgoing_body_from_source;
 
-        PyObject *key, *value;
-        Py_ssize_t pos = 0;
-
-        while (PyDict_Next(request_headers, &pos, &key, &value)) {
-            struct aws_http_header http_header;
-            http_header.name = aws_byte_cursor_from_pystring(key);
-            http_header.value = aws_byte_cursor_from_pystring(value);
-
-            aws_array_list_push_back(&headers, &http_header);
+        PyObject *compress = PyObject_GetAttrString(py_http_request, "_compress_outgoing_body");
+        int should_compress = compress ? PyObject_IsTrue(compress) : -1;
+        Py_XDECREF(compress);
+        if (should_compress < 0) {
+            goto clean_up_headers;
         }
 
-        request_options.header_array = headers.data;
-        request_options.num_headers = (size_t)num_headers;
-    }
+        if (should_compress) {
+            int compress_err = 0;
+            Py_BEGIN_ALLOW_THREADS
+            compress_err = s_compress_source(allocator, &stream->source);
+            Py_END_ALLOW_THREADS
+            if (compress_err) {
+                PyErr_SetAwsLastError();
+                goto clean_up_headers;
+            }
 
-    PyObject *on_read_body = PyObject_GetAttrString(py_http_request, "_on_read_body");
-    if (on_read_body && on_read_body != Py_None) {
-        stream->on_read_body = on_read_body;
-        Py_XINCREF(on_read_body);
-        request_options.stream_outgoing_body = s_stream_outgoing_body;
+            /* python left these two out, only the compressed length is known */
+            snprintf(
+                compressed_length, sizeof(compressed_length), "%llu", (unsigned long long)stream->source.remaining);
+            struct aws_http_header encoding_headers[2] = {
+                {
+                    .name = aws_byte_cursor_from_c_str("content-length"),
+                    .value = aws_byte_cursor_from_c_str(compressed_length),
+                },
+                {
+                    .name = aws_byte_cursor_from_c_str("content-encoding"),
+                    .value = aws_byte_cursor_from_c_str("gzip"),
+                },
+            };
+
+            if (!headers.data && aws_array_list_init_dynamic(&headers, allocator, 2, sizeof(struct aws_http_header))) {
+                PyErr_SetAwsLastError();
+                goto clean_up_headers;
+            }
+            if (aws_array_list_push_back(&headers, &encoding_headers[0]) ||
+                aws_array_list_push_back(&headers, &encoding_headers[1])) {
+                PyErr_SetAwsLastError();
+                goto clean_up_headers;
+            }
+            request_options.header_array = headers.data;
+            request_options.num_headers = aws_array_list_length(&headers);
+        }
+    } else {
+        Py_XDECREF(body_source);
+
+        /* the stream keeps the new references from PyObject_GetAttrString() */
+        PyObject *on_read_body = PyObject_GetAttrString(py_http_request, "_on_read_body");
+        if (on_read_body && on_read_body != Py_None) {
+            stream->on_read_body = on_read_body;
+            request_options.stream_outgoing_body = s_stream_outgoing_body;
+        } else {
+            Py_XDECREF(on_read_body);
+        }
     }
 
     PyObject *on_incoming_body = PyObject_GetAttrString(py_http_request, "_on_incoming_body");
-    if (on_incoming_body && on_incoming_body != Py_None) {
+    if (on_incoming_body == Py_None) {
+        Py_CLEAR(on_incoming_body);
+    }
+    if (on_incoming_body) {
         stream->on_incoming_body = on_incoming_body;
-        Py_XINCREF(on_incoming_body);
         request_options.on_response_body = s_on_incoming_response_body;
+
+        PyObject *delivery = PyObject_GetAttrString(py_http_request, "_incoming_body_delivery");
+        if (delivery && delivery != Py_None) {
+            stream->incoming_body_delivery = (enum py_http_incoming_body_delivery)PyIntEnum_AsLong(delivery);
+        }
+        Py_XDECREF(delivery);
+
+        if (stream->incoming_body_delivery == PY_HTTP_INCOMING_BODY_DELIVERY_BUFFER) {
+            PyObject *buffer = PyObject_GetAttrString(py_http_request, "_incoming_body_buffer");
+            if (!buffer || buffer == Py_None) {
+                Py_XDECREF(buffer);
+                PyErr_SetString(PyExc_ValueError, "incoming_body_buffer is required for IncomingBodyDelivery.Buffer");
+                goto clean_up_headers;
+            }
+
+            /* holding the export for the life of the request also keeps bytearrays from being resized under us */
+            int buffer_err = PyObject_GetBuffer(buffer, &stream->incoming_body_buffer, PyBUF_WRITABLE);
+            Py_DECREF(buffer);
+            if (buffer_err) {
+                goto clean_up_headers;
+            }
+            stream->has_incoming_body_buffer = true;
+
+            if (stream->incoming_body_buffer.len == 0) {
+                PyErr_SetString(PyExc_ValueError, "incoming_body_buffer must not be empty");
+                goto clean_up_headers;
+            }
+        }
+
+        if (s_init_coalesce_from_py(stream, py_connection, py_http_request)) {
+            goto clean_up_headers;
+        }
+    }
+
+    PyObject *sink = PyObject_GetAttrString(py_http_request, "_incoming_body_sink");
+    if (sink && sink != Py_None) {
+        int sink_err = s_init_sink_from_py(stream, sink);
+        Py_DECREF(sink);
+        if (sink_err) {
+            goto clean_up_headers;
+        }
+        request_options.on_response_body = s_on_incoming_response_body;
+    } else {
+        Py_XDECREF(sink);
+    }
+
+    if (s_init_ring_from_py(stream, py_http_request)) {
+        goto clean_up_headers;
+    }
+    if (stream->ring.enabled) {
+        request_options.on_response_body = s_on_incoming_response_body;
+    }
+
+    PyObject *decode_content = PyObject_GetAttrString(py_http_request, "_decode_content");
+    if (!decode_content) {
+        goto clean_up_headers;
+    }
+    stream->decode_content = PyObject_IsTrue(decode_content) == 1;
+    Py_DECREF(decode_content);
+    if (stream->decode_content && stream->ring.enabled) {
+        /* reads reopen the window by what they take out of the ring, which wouldn't be wire bytes once decoded */
+        PyErr_SetString(PyExc_ValueError, "decode_content can't be used with incoming_body_stream_capacity");
+        goto clean_up_headers;
     }
 
-    stream->received_headers = PyDict_New();
+    PyObject *manual_window = PyObject_GetAttrString(py_http_request, "_manual_window");
+    if (manual_window) {
+        stream->manual_window = PyObject_IsTrue(manual_window) == 1;
+        Py_DECREF(manual_window);
+    } else {
+        PyErr_Clear();
+    }
+
+    if (s_init_deadline_from_py(stream, py_connection, py_http_request)) {
+        goto clean_up_headers;
+    }
+
+    stream->received_headers = aws_py_http_headers_new(allocator);
+    if (!stream->received_headers) {
+        PyErr_SetAwsLastError();
+        goto clean_up_headers;
+    }
     request_options.on_response_headers = s_on_incoming_response_headers;
     request_options.on_response_header_block_done = s_on_incoming_header_block_done;
     request_options.on_complete = s_on_stream_complete;
     request_options.user_data = stream;
 
+    stream->connection = py_connection;
+    aws_high_res_clock_get_ticks(&stream->metrics.request_made_ns);
+    if (!request_options.stream_outgoing_body) {
+        stream->metrics.request_sent_ns = stream->metrics.request_made_ns;
+    }
+
     struct aws_http_stream *http_stream = aws_http_stream_new_client_request(&request_options);
     aws_array_list_clean_up(&headers);
 
     if (!http_stream) {
-        goto clean_up_headers;
+        PyErr_SetAwsLastError();
+        goto clean_up_stream;
     }
 
     stream->stream = http_stream;
+    Py_DECREF(method_str);
+    Py_DECREF(uri_str);
+    Py_DECREF(request_headers);
+
+    if (stream->deadline.enabled) {
+        aws_mutex_lock(&stream->deadline.lock);
+        if (!stream->deadline.complete) {
+            s_deadline_schedule(stream);
+        }
+        aws_mutex_unlock(&stream->deadline.lock);
+    }
+
     return PyCapsule_New(stream, s_capsule_name_http_client_stream, s_http_client_stream_destructor);
 
 clean_up_headers:
     aws_array_list_clean_up(&headers);
 
 clean_up_stream:
-    aws_mem_release(allocator, stream);
+    Py_XDECREF(method_str);
+    Py_XDECREF(uri_str);
+    Py_XDECREF(request_headers);
+    Py_XDECREF(stream->on_stream_completed);
+    Py_XDECREF(stream->on_incoming_headers_received);
+    Py_XDECREF(stream->on_incoming_body);
+    Py_XDECREF(stream->on_read_body);
+    if (stream->has_incoming_body_buffer) {
+        PyBuffer_Release(&stream->incoming_body_buffer);
+    }
+    if (stream->sink.has_buffer) {
+        PyBuffer_Release(&stream->sink.buffer);
+    }
+    if (stream->source.has_buffer) {
+        PyBuffer_Release(&stream->source.buffer);
+    }
+    aws_py_http_headers_destroy(stream->received_headers);
+    Py_XDECREF(stream->ring.on_available);
+    s_stream_release(stream);
 
     return NULL;
 }
+
+PyObject *aws_py_http_client_stream_update_window(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *stream_capsule = NULL;
+    Py_ssize_t increment_size = 0;
+
+    if (!PyArg_ParseTuple(args, "On", &stream_capsule, &increment_size)) {
+        return NULL;
+    }
+
+    if (increment_size < 0) {
+        PyErr_SetString(PyExc_ValueError, "window increment must not be negative");
+        return NULL;
+    }
+
+    struct py_http_stream *stream = PyCapsule_GetPointer(stream_capsule, s_capsule_name_http_client_stream);
+    if (!stream) {
+        return NULL;
+    }
+
+    aws_http_stream_update_window(stream->stream, (size_t)increment_size);
+
+    Py_RETURN_NONE;
+}
+
+PyObject *aws_py_http_client_stream_get_metrics(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *stream_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &stream_capsule)) {
+        return NULL;
+    }
+
+    struct py_http_stream *stream = PyCapsule_GetPointer(stream_capsule, s_capsule_name_http_client_stream);
+    if (!stream) {
+        return NULL;
+    }
+
+    return Py_BuildValue(
+        "(KKKKKKKK)",
+        (unsigned long long)stream->metrics.request_made_ns,
+        (unsigned long long)stream->metrics.request_sent_ns,
+        (unsigned long long)stream->metrics.first_byte_ns,
+        (unsigned long long)stream->metrics.headers_done_ns,
+        (unsigned long long)stream->metrics.completed_ns,
+        (unsigned long long)stream->metrics.bytes_sent,
+        (unsigned long long)stream->metrics.bytes_received,
+        (unsigned long long)stream->metrics.python_ns);
+}
+
+PyObject *aws_py_http_client_stream_read(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *stream_capsule = NULL;
+    Py_ssize_t max_size = 0;
+    PyObject *block = NULL;
+
+    if (!PyArg_ParseTuple(args, "OnO", &stream_capsule, &max_size, &block)) {
+        return NULL;
+    }
+
+    if (max_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "max_size must be positive");
+        return NULL;
+    }
+
+    struct py_http_stream *stream = PyCapsule_GetPointer(stream_capsule, s_capsule_name_http_client_stream);
+    if (!stream) {
+        return NULL;
+    }
+
+    if (!stream->ring.enabled) {
+        PyErr_SetString(PyExc_ValueError, "request was not made with incoming_body_stream_capacity");
+        return NULL;
+    }
+
+    bool blocking = PyObject_IsTrue(block) == 1;
+
+    /* allocated up front so it can be filled without the GIL, nothing else can see it yet */
+    PyObject *chunk = PyBytes_FromStringAndSize(NULL, max_size);
+    if (!chunk) {
+        return NULL;
+    }
+    char *chunk_data = PyBytes_AS_STRING(chunk);
+
+    size_t read_len = 0;
+    bool complete = false;
+    int error_code = 0;
+
+    Py_BEGIN_ALLOW_THREADS
+
+    aws_mutex_lock(&stream->ring.lock);
+    while (blocking && stream->ring.len == 0 && !stream->ring.complete) {
+        aws_condition_variable_wait(&stream->ring.signal, &stream->ring.lock);
+    }
+
+    read_len = stream->ring.len < (size_t)max_size ? stream->ring.len : (size_t)max_size;
+    size_t first_len = stream->ring.capacity - stream->ring.head;
+    if (first_len > read_len) {
+        first_len = read_len;
+    }
+    memcpy(chunk_data, stream->ring.data + stream->ring.head, first_len);
+    memcpy(chunk_data + first_len, stream->ring.data, read_len - first_len);
+    stream->ring.head = (stream->ring.head + read_len) % stream->ring.capacity;
+    stream->ring.len -= read_len;
+
+    complete = stream->ring.complete;
+    error_code = stream->ring.error_code;
+    if (read_len == 0 && !complete) {
+        stream->ring.reader_waiting = true;
+    }
+    aws_mutex_unlock(&stream->ring.lock);
+
+    /* room was made, let that much more in */
+    if (read_len > 0 && !complete) {
+        aws_http_stream_update_window(stream->stream, read_len);
+    }
+
+    Py_END_ALLOW_THREADS
+
+    if (read_len > 0) {
+        if (read_len < (size_t)max_size && _PyBytes_Resize(&chunk, (Py_ssize_t)read_len)) {
+            return NULL;
+        }
+        return chunk;
+    }
+
+    Py_DECREF(chunk);
+
+    if (!complete) {
+        Py_RETURN_NONE;
+    }
+
+    if (error_code) {
+        aws_raise_error(error_code);
+        return PyErr_AwsLastError();
+    }
+
+    return PyBytes_FromStringAndSize(NULL, 0);
+}
+
+static void s_completion_queue_destructor(PyObject *queue_capsule) {
+    struct py_http_completion_queue *queue = PyCapsule_GetPointer(queue_capsule, s_capsule_name_http_completion_queue);
+    assert(queue);
+
+    aws_mutex_lock(&queue->lock);
+    PyObject *on_idle = queue->on_idle;
+    queue->on_idle = NULL;
+    aws_mutex_unlock(&queue->lock);
+
+    Py_XDECREF(on_idle);
+    s_completion_queue_release(queue);
+}
+
+PyObject *aws_py_http_completion_queue_new(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *on_idle = NULL;
+    if (!PyArg_ParseTuple(args, "O", &on_idle)) {
+        return NULL;
+    }
+
+    if (on_idle != Py_None && !PyCallable_Check(on_idle)) {
+        PyErr_SetString(PyExc_TypeError, "on_idle must be callable");
+        return NULL;
+    }
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP);
+    struct py_http_completion_queue *queue = aws_mem_acquire(allocator, sizeof(struct py_http_completion_queue));
+    if (!queue) {
+        return PyErr_AwsLastError();
+    }
+    AWS_ZERO_STRUCT(*queue);
+    queue->allocator = allocator;
+    aws_linked_list_init(&queue->completed);
+    aws_atomic_init_int(&queue->ref_count, 1);
+
+    if (aws_mutex_init(&queue->lock)) {
+        aws_mem_release(allocator, queue);
+        return PyErr_AwsLastError();
+    }
+
+    if (aws_condition_variable_init(&queue->signal)) {
+        aws_mutex_clean_up(&queue->lock);
+        aws_mem_release(allocator, queue);
+        return PyErr_AwsLastError();
+    }
+
+    PyObject *capsule = PyCapsule_New(queue, s_capsule_name_http_completion_queue, s_completion_queue_destructor);
+    if (!capsule) {
+        s_completion_queue_release(queue);
+        return NULL;
+    }
+
+    if (on_idle != Py_None) {
+        Py_INCREF(on_idle);
+        queue->on_idle = on_idle;
+    }
+
+    return capsule;
+}
+
+static bool s_completion_queue_ready(void *user_data) {
+    struct py_http_completion_queue *queue = user_data;
+    return !aws_linked_list_empty(&queue->completed) || queue->pending == 0;
+}
+
+/* (tag, error_code, response_code, headers capsule or None, body bytes) for a completed batch stream */
+static PyObject *s_batch_stream_to_py(struct py_http_stream *stream) {
+    PyObject *headers = Py_None;
+    Py_INCREF(headers);
+    if (stream->received_headers && !stream->batch.error_code) {
+        Py_DECREF(headers);
+        /* the capsule takes ownership of the headers */
+        headers = aws_py_http_headers_to_capsule(stream->received_headers);
+        stream->received_headers = NULL;
+        if (!headers) {
+            return NULL;
+        }
+    }
+
+    PyObject *result = Py_BuildValue(
+        "(KiiN" BYTE_BUF_FORMAT_STR ")",
+        (unsigned long long)stream->batch.tag,
+        stream->batch.error_code,
+        stream->batch.response_code,
+        headers,
+        (const char *)stream->batch.body.buffer,
+        (Py_ssize_t)stream->batch.body.len);
+
+    return result;
+}
+
+PyObject *aws_py_http_completion_queue_get(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *queue_capsule = NULL;
+    Py_ssize_t max_count = 0;
+    long long timeout_ms = -1;
+    if (!PyArg_ParseTuple(args, "OnL", &queue_capsule, &max_count, &timeout_ms)) {
+        return NULL;
+    }
+
+    struct py_http_completion_queue *queue = PyCapsule_GetPointer(queue_capsule, s_capsule_name_http_completion_queue);
+    if (!queue) {
+        return NULL;
+    }
+
+    struct aws_linked_list taken;
+    aws_linked_list_init(&taken);
+
+    Py_BEGIN_ALLOW_THREADS
+    aws_mutex_lock(&queue->lock);
+    if (timeout_ms < 0) {
+        aws_condition_variable_wait_pred(&queue->signal, &queue->lock, s_completion_queue_ready, queue);
+    } else if (timeout_ms > 0) {
+        /* timing out just means an empty result */
+        aws_condition_variable_wait_for_pred(
+            &queue->signal, &queue->lock, (int64_t)timeout_ms * 1000000, s_completion_queue_ready, queue);
+    }
+
+    for (Py_ssize_t count = 0; (max_count <= 0 || count < max_count) && !aws_linked_list_empty(&queue->completed);
+         ++count) {
+        aws_linked_list_push_back(&taken, aws_linked_list_pop_front(&queue->completed));
+    }
+    aws_mutex_unlock(&queue->lock);
+    Py_END_ALLOW_THREADS
+
+    PyObject *results = PyList_New(0);
+    while (!aws_linked_list_empty(&taken)) {
+        struct py_http_stream *stream =
+            AWS_CONTAINER_OF(aws_linked_list_pop_front(&taken), struct py_http_stream, batch.node);
+
+        PyObject *result = results ? s_batch_stream_to_py(stream) : NULL;
+        if (!result || PyList_Append(results, result)) {
+            Py_CLEAR(results);
+        }
+        Py_XDECREF(result);
+        s_batch_stream_destroy(stream);
+    }
+
+    return results;
+}
+
+/* Starts one batch item on py_connection, in stream, which was allocated up front so every item is either sent or
+ * reported. Failures to start are reported through the queue like any other. GIL must be held, the item must have
+ * been validated. */
+static void s_batch_submit(
+    struct py_http_completion_queue *queue,
+    struct py_http_stream *stream,
+    struct py_http_connection *py_connection,
+    PyObject *py_prepared_request,
+    struct aws_byte_cursor method,
+    const struct py_http_headers *prepared_headers,
+    bool decode_content,
+    PyObject *item,
+    uint64_t tag) {
+
+    struct aws_allocator *allocator = queue->allocator;
+    AWS_ZERO_STRUCT(*stream);
+    stream->allocator = allocator;
+    stream->sink.fd = -1;
+    stream->source.fd = -1;
+    stream->connection = py_connection;
+    stream->decode_content = decode_content;
+    stream->batch.queue = queue;
+    stream->batch.tag = tag;
+    aws_atomic_init_int(&stream->ref_count, 1);
+
+    aws_mutex_lock(&queue->lock);
+    queue->pending++;
+    aws_mutex_unlock(&queue->lock);
+    aws_atomic_fetch_add(&queue->ref_count, 1);
+
+    PyObject *path = item;
+    PyObject *overrides = NULL;
+    PyObject *body = NULL;
+    if (PyTuple_Check(item)) {
+        Py_ssize_t size = PyTuple_GET_SIZE(item);
+        path = PyTuple_GET_ITEM(item, 0);
+        overrides = size > 1 && PyTuple_GET_ITEM(item, 1) != Py_None ? PyTuple_GET_ITEM(item, 1) : NULL;
+        body = size > 2 && PyTuple_GET_ITEM(item, 2) != Py_None ? PyTuple_GET_ITEM(item, 2) : NULL;
+    }
+
+    struct aws_array_list headers;
+    AWS_ZERO_STRUCT(headers);
+    /* sized for the decimal length of a uint64 */
+    char content_length[24];
+
+    if (aws_byte_buf_init(&stream->batch.body, allocator, 256)) {
+        goto error;
+    }
+
+    stream->received_headers = aws_py_http_headers_new(allocator);
+    if (!stream->received_headers) {
+        goto error;
+    }
+
+    if (s_build_request_headers(allocator, prepared_headers, overrides, &headers)) {
+        goto error;
+    }
+
+    struct aws_http_request_options request_options;
+    AWS_ZERO_STRUCT(request_options);
+    request_options.self_size = sizeof(request_options);
+    request_options.client_connection = py_connection->connection;
+    request_options.method = method;
+    request_options.uri = aws_byte_cursor_from_pystring(path);
+
+    if (body) {
+        if (PyObject_GetBuffer(body, &stream->source.buffer, PyBUF_SIMPLE)) {
+            PyErr_Clear();
+            aws_raise_error(AWS_ERROR_INVALID_ARGUMENT);
+            goto error;
+        }
+        stream->source.has_buffer = true;
+        stream->source.remaining = (uint64_t)stream->source.buffer.len;
+        request_options.stream_outgoing_body = s_stream_outgoing_body_from_source;
+
+        bool has_content_length = false;
+        for (size_t i = 0; i < aws_array_list_length(&headers); ++i) {
+            struct aws_http_header *header = NULL;
+            aws_array_list_get_at_ptr(&headers, (void **)&header, i);
+            has_content_length |= aws_byte_cursor_eq_c_str_ignore_case(&header->name, "content-length");
+        }
+
+        if (!has_content_length) {
+            snprintf(content_length, sizeof(content_length), "%llu", (unsigned long long)stream->source.remaining);
+            struct aws_http_header length_header = {
+                .name = aws_byte_cursor_from_c_str("content-length"),
+                .value = aws_byte_cursor_from_c_str(content_length),
+            };
+            if ((!headers.data &&
+                 aws_array_list_init_dynamic(&headers, allocator, 1, sizeof(struct aws_http_header))) ||
+                aws_array_list_push_back(&headers, &length_header)) {
+                goto error;
+            }
+        }
+    }
+
+    request_options.header_array = headers.data;
+    request_options.num_headers = aws_array_list_length(&headers);
+    request_options.on_response_headers = s_on_incoming_response_headers;
+    request_options.on_response_header_block_done = s_on_incoming_header_block_done;
+    request_options.on_response_body = s_on_incoming_response_body;
+    request_options.on_complete = s_on_stream_complete;
+    request_options.user_data = stream;
+
+    if (s_init_deadline_from_py(stream, py_connection, py_prepared_request)) {
+        /* bad timeout settings, PreparedRequest checks them */
+        PyErr_Clear();
+        aws_raise_error(AWS_ERROR_INVALID_ARGUMENT);
+        goto error;
+    }
+
+    aws_high_res_clock_get_ticks(&stream->metrics.request_made_ns);
+    if (!body) {
+        stream->metrics.request_sent_ns = stream->metrics.request_made_ns;
+    }
+
+    stream->stream = aws_http_stream_new_client_request(&request_options);
+    aws_array_list_clean_up(&headers);
+    if (!stream->stream) {
+        s_batch_stream_complete(stream, aws_last_error());
+        return;
+    }
+
+    if (stream->deadline.enabled) {
+        aws_mutex_lock(&stream->deadline.lock);
+        if (!stream->deadline.complete) {
+            s_deadline_schedule(stream);
+        }
+        aws_mutex_unlock(&stream->deadline.lock);
+    }
+    return;
+
+error:
+    aws_array_list_clean_up(&headers);
+    s_batch_stream_complete(stream, aws_last_error());
+}
+
+PyObject *aws_py_http_client_connection_make_requests(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *connections = NULL;
+    PyObject *py_prepared_request = NULL;
+    PyObject *items = NULL;
+    PyObject *queue_capsule = NULL;
+    if (!PyArg_ParseTuple(
+            args, "O!OO!O", &PyList_Type, &connections, &py_prepared_request, &PyList_Type, &items, &queue_capsule)) {
+        return NULL;
+    }
+
+    struct py_http_completion_queue *queue = PyCapsule_GetPointer(queue_capsule, s_capsule_name_http_completion_queue);
+    if (!queue) {
+        return NULL;
+    }
+
+    Py_ssize_t num_connections = PyList_GET_SIZE(connections);
+    if (num_connections == 0) {
+        PyErr_SetString(PyExc_ValueError, "at least one connection is required");
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < num_connections; ++i) {
+        if (!PyCapsule_GetPointer(PyList_GET_ITEM(connections, i), s_capsule_name_http_client_connection)) {
+            return NULL;
+        }
+    }
+
+    /* everything that could fail in python is checked before anything is sent */
+    Py_ssize_t num_items = PyList_GET_SIZE(items);
+    for (Py_ssize_t i = 0; i < num_items; ++i) {
+        PyObject *item = PyList_GET_ITEM(items, i);
+        PyObject *path = item;
+        if (PyTuple_Check(item)) {
+            Py_ssize_t size = PyTuple_GET_SIZE(item);
+            if (size < 1 || size > 3) {
+                PyErr_SetString(PyExc_ValueError, "requests are (path_and_query, outgoing_headers, body) tuples");
+                return NULL;
+            }
+            path = PyTuple_GET_ITEM(item, 0);
+            if (size > 1 && PyTuple_GET_ITEM(item, 1) != Py_None && !PyDict_Check(PyTuple_GET_ITEM(item, 1))) {
+                PyErr_SetString(PyExc_TypeError, "outgoing_headers must be a dict");
+                return NULL;
+            }
+        }
+        if (!PyBytes_CheckExact(path) && !PyUnicode_CheckExact(path)) {
+            PyErr_SetString(PyExc_TypeError, "path_and_query must be a string");
+            return NULL;
+        }
+    }
+
+    PyObject *method = PyObject_GetAttrString(py_prepared_request, "method");
+    PyObject *headers_capsule = PyObject_GetAttrString(py_prepared_request, "_prepared_headers");
+    PyObject *decode_content = PyObject_GetAttrString(py_prepared_request, "_decode_content");
+    PyObject *result = NULL;
+    if (!method || !headers_capsule || !decode_content) {
+        goto done;
+    }
+
+    const struct py_http_headers *prepared_headers = aws_py_http_headers_from_capsule(headers_capsule);
+    if (!prepared_headers) {
+        goto done;
+    }
+    /* allocated before anything is sent, so that running out of memory fails the whole call rather than leaving
+     * some items without a result */
+    struct py_http_stream **streams = NULL;
+    if (num_items > 0) {
+        streams = aws_mem_calloc(queue->allocator, (size_t)num_items, sizeof(struct py_http_stream *));
+        if (!streams) {
+            PyErr_SetAwsLastError();
+            goto done;
+        }
+    }
+    for (Py_ssize_t i = 0; i < num_items; ++i) {
+        streams[i] = aws_mem_acquire(queue->allocator, sizeof(struct py_http_stream));
+        if (!streams[i]) {
+            PyErr_SetAwsLastError();
+            for (Py_ssize_t j = 0; j < i; ++j) {
+                aws_mem_release(queue->allocator, streams[j]);
+            }
+            aws_mem_release(queue->allocator, streams);
+            goto done;
+        }
+    }
+
+    aws_mutex_lock(&queue->lock);
+    uint64_t first_tag = queue->next_tag;
+    queue->next_tag += (uint64_t)num_items;
+    /* held until every item is in, so on_idle can't fire part way through */
+    queue->pending++;
+    aws_mutex_unlock(&queue->lock);
+
+    struct aws_byte_cursor method_cur = aws_byte_cursor_from_pystring(method);
+    bool decode = PyObject_IsTrue(decode_content) == 1;
+    for (Py_ssize_t i = 0; i < num_items; ++i) {
+        struct py_http_connection *py_connection = PyCapsule_GetPointer(
+            PyList_GET_ITEM(connections, i % num_connections), s_capsule_name_http_client_connection);
+        s_batch_submit(
+            queue,
+            streams[i],
+            py_connection,
+            py_prepared_request,
+            method_cur,
+            prepared_headers,
+            decode,
+            PyList_GET_ITEM(items, i),
+            first_tag + (uint64_t)i);
+    }
+
+    if (streams) {
+        aws_mem_release(queue->allocator, streams);
+    }
+
+    s_completion_queue_settle(queue);
+    result = PyLong_FromUnsignedLongLong(first_tag);
+
+done:
+    Py_XDECREF(method);
+    Py_XDECREF(headers_capsule);
+    Py_XDECREF(decode_content);
+    return result;
+}
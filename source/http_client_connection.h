@@ -20,6 +20,7 @@
 
 extern const char *s_capsule_name_http_client_connection;
 extern const char *s_capsule_name_http_client_stream;
+extern const char *s_capsule_name_http_completion_queue;
 
 /**
  * Create a new connection. returns void. The on_setup callback will be invoked
@@ -34,9 +35,49 @@ PyObject *aws_py_http_client_connection_close(PyObject *self, PyObject *args);
  * Returns True if connection is open and usable, False otherwise.
  */
 PyObject *aws_py_http_client_connection_is_open(PyObject *self, PyObject *args);
+/**
+ * Returns the HTTP version the connection speaks, as an aws_http_version.
+ */
+PyObject *aws_py_http_client_connection_get_version(PyObject *self, PyObject *args);
+/**
+ * Returns a tuple of the connection's timestamps and totals, see awscrt.http.HttpConnectionMetrics.
+ */
+PyObject *aws_py_http_client_connection_get_metrics(PyObject *self, PyObject *args);
 /**
  * Initiates a request on connection.
  */
 PyObject *aws_py_http_client_connection_make_request(PyObject *self, PyObject *args);
+/**
+ * Opens a stream's flow-control window by the given number of bytes.
+ */
+PyObject *aws_py_http_client_stream_update_window(PyObject *self, PyObject *args);
+
+/**
+ * Returns a tuple of the stream's timestamps and byte counts, see awscrt.http.HttpRequestMetrics.
+ */
+PyObject *aws_py_http_client_stream_get_metrics(PyObject *self, PyObject *args);
+
+/**
+ * Reads up to max_size bytes of the response body of a stream made with incoming_body_stream_capacity.
+ * Returns b'' at the end of the body and None if block is false and nothing has arrived yet.
+ */
+PyObject *aws_py_http_client_stream_read(PyObject *self, PyObject *args);
+
+/**
+ * Create a queue that the responses to batches of requests are collected in. Takes an on_idle callable or None.
+ */
+PyObject *aws_py_http_completion_queue_new(PyObject *self, PyObject *args);
+
+/**
+ * Takes up to max_count completed requests out of a queue as (tag, error_code, response_code, headers, body) tuples.
+ * Waits up to timeout_ms, or forever if it is negative, for at least one, unless nothing is pending.
+ */
+PyObject *aws_py_http_completion_queue_get(PyObject *self, PyObject *args);
+
+/**
+ * Sends a list of requests, made from a PreparedRequest and spread round-robin over a list of connections, with the
+ * responses going to a completion queue. Returns the tag of the first request, the rest follow in order.
+ */
+PyObject *aws_py_http_client_connection_make_requests(PyObject *self, PyObject *args);
 
 #endif /* AWS_CRT_PYTHON_HTTP_CLIENT_CONNECTION_H */
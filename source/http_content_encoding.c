@@ -0,0 +1,323 @@
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "http_content_encoding.h"
+
+#include <aws/http/http.h>
+
+PyObject *aws_py_http_is_content_encoding_available(PyObject *self, PyObject *args) {
+    (void)self;
+    (void)args;
+
+    return PyBool_FromLong(aws_py_http_content_encoding_is_available());
+}
+
+#ifdef AWS_CRT_PYTHON_HAVE_ZLIB
+
+#    include <zlib.h>
+
+/* zlib counts in uInt */
+#    define S_MAX_ZLIB_CHUNK ((size_t)UINT_MAX)
+
+struct py_http_content_decoder {
+    struct aws_allocator *allocator;
+    z_stream zstream;
+    /* set once the data turned out not to have a zlib or gzip header */
+    bool raw;
+    /* the header hasn't been checked yet, so switching to raw deflate is still possible */
+    bool at_start;
+    /* zlib and gzip headers are told apart by their first two bytes, kept so they can be replayed as raw deflate */
+    uint8_t head[2];
+    size_t head_len;
+    /* the last thing decoded was the end of a complete member */
+    bool member_ended;
+    /* input of a member has been consumed but its end not reached yet, so the body can't end here */
+    bool in_member;
+    /* a complete member was followed by something that isn't one, which is ignored like other decoders do */
+    bool ignore_rest;
+};
+
+struct py_http_content_encoder {
+    struct aws_allocator *allocator;
+    z_stream zstream;
+};
+
+bool aws_py_http_content_encoding_is_available(void) {
+    return true;
+}
+
+/* zlib's own allocations go through the same allocator as the decoder or encoder holding them */
+static voidpf s_zlib_alloc(voidpf opaque, uInt items, uInt size) {
+    return aws_mem_calloc(opaque, items, size);
+}
+
+static void s_zlib_free(voidpf opaque, voidpf address) {
+    aws_mem_release(opaque, address);
+}
+
+static void s_zstream_init_allocator(z_stream *zstream, struct aws_allocator *allocator) {
+    zstream->zalloc = s_zlib_alloc;
+    zstream->zfree = s_zlib_free;
+    zstream->opaque = allocator;
+}
+
+struct py_http_content_decoder *aws_py_http_content_decoder_new(struct aws_allocator *allocator) {
+    struct py_http_content_decoder *decoder = aws_mem_acquire(allocator, sizeof(struct py_http_content_decoder));
+    if (!decoder) {
+        return NULL;
+    }
+    AWS_ZERO_STRUCT(*decoder);
+    decoder->allocator = allocator;
+    decoder->at_start = true;
+    s_zstream_init_allocator(&decoder->zstream, allocator);
+
+    /* 32 added to the window bits detects zlib and gzip headers automatically */
+    if (inflateInit2(&decoder->zstream, MAX_WBITS + 32) != Z_OK) {
+        aws_mem_release(allocator, decoder);
+        aws_raise_error(AWS_ERROR_OOM);
+        return NULL;
+    }
+
+    return decoder;
+}
+
+void aws_py_http_content_decoder_destroy(struct py_http_content_decoder *decoder) {
+    if (!decoder) {
+        return;
+    }
+
+    inflateEnd(&decoder->zstream);
+    aws_mem_release(decoder->allocator, decoder);
+}
+
+int aws_py_http_content_decoder_decode(
+    struct py_http_content_decoder *decoder,
+    struct aws_byte_cursor data,
+    py_http_content_on_decoded_fn *on_decoded,
+    void *user_data) {
+
+    uint8_t output[16 * 1024];
+    struct aws_byte_cursor input = data;
+
+    while (input.len > 0 && !decoder->ignore_rest) {
+        size_t input_len = input.len < S_MAX_ZLIB_CHUNK ? input.len : S_MAX_ZLIB_CHUNK;
+        decoder->zstream.next_in = input.ptr;
+        decoder->zstream.avail_in = (uInt)input_len;
+
+        int result = Z_OK;
+        do {
+            decoder->zstream.next_out = output;
+            decoder->zstream.avail_out = (uInt)sizeof(output);
+
+            uInt avail_in = decoder->zstream.avail_in;
+            result = inflate(&decoder->zstream, Z_NO_FLUSH);
+
+            if (result == Z_DATA_ERROR && decoder->at_start && !decoder->raw) {
+                /* no header, so this is a raw deflate stream. Start over with the same input. */
+                inflateEnd(&decoder->zstream);
+                AWS_ZERO_STRUCT(decoder->zstream);
+                s_zstream_init_allocator(&decoder->zstream, decoder->allocator);
+                if (inflateInit2(&decoder->zstream, -MAX_WBITS) != Z_OK) {
+                    return aws_raise_error(AWS_ERROR_OOM);
+                }
+                decoder->raw = true;
+
+                if (decoder->head_len > 0 &&
+                    aws_py_http_content_decoder_decode(
+                        decoder, aws_byte_cursor_from_array(decoder->head, decoder->head_len), on_decoded, user_data)) {
+                    return AWS_OP_ERR;
+                }
+
+                decoder->zstream.next_in = input.ptr;
+                decoder->zstream.avail_in = (uInt)input_len;
+                continue;
+            }
+
+            if (result == Z_DATA_ERROR && decoder->member_ended) {
+                decoder->ignore_rest = true;
+                return AWS_OP_SUCCESS;
+            }
+
+            if (result != Z_OK && result != Z_STREAM_END && result != Z_BUF_ERROR) {
+                return aws_raise_error(AWS_ERROR_HTTP_INVALID_BODY_STREAM);
+            }
+
+            size_t produced = sizeof(output) - decoder->zstream.avail_out;
+            if (produced > 0) {
+                decoder->at_start = false;
+                decoder->member_ended = false;
+                on_decoded(aws_byte_cursor_from_array(output, produced), user_data);
+            }
+
+            if (result == Z_STREAM_END) {
+                /* gzip allows several members back to back, anything after the end starts the next one */
+                decoder->member_ended = true;
+                decoder->in_member = false;
+                if (decoder->zstream.avail_in == 0) {
+                    break;
+                }
+                inflateReset(&decoder->zstream);
+            } else if (decoder->zstream.avail_in != avail_in) {
+                decoder->in_member = true;
+            }
+        } while (decoder->zstream.avail_in > 0 || decoder->zstream.avail_out == 0);
+
+        if (decoder->at_start && !decoder->raw) {
+            size_t head_len = sizeof(decoder->head) - decoder->head_len;
+            if (head_len > input_len) {
+                head_len = input_len;
+            }
+            memcpy(decoder->head + decoder->head_len, input.ptr, head_len);
+            decoder->head_len += head_len;
+            decoder->at_start = decoder->head_len < sizeof(decoder->head);
+        }
+
+        aws_byte_cursor_advance(&input, input_len);
+    }
+
+    return AWS_OP_SUCCESS;
+}
+
+int aws_py_http_content_decoder_finish(struct py_http_content_decoder *decoder) {
+    if (decoder->in_member && !decoder->ignore_rest) {
+        /* the body stopped partway through a member, the data is truncated */
+        return aws_raise_error(AWS_ERROR_HTTP_INVALID_BODY_STREAM);
+    }
+    return AWS_OP_SUCCESS;
+}
+
+struct py_http_content_encoder *aws_py_http_gzip_encoder_new(struct aws_allocator *allocator) {
+    struct py_http_content_encoder *encoder = aws_mem_acquire(allocator, sizeof(struct py_http_content_encoder));
+    if (!encoder) {
+        return NULL;
+    }
+    AWS_ZERO_STRUCT(*encoder);
+    encoder->allocator = allocator;
+    s_zstream_init_allocator(&encoder->zstream, allocator);
+
+    /* 16 added to the window bits writes a gzip header and trailer */
+    if (deflateInit2(&encoder->zstream, Z_DEFAULT_COMPRESSION, Z_DEFLATED, MAX_WBITS + 16, 8, Z_DEFAULT_STRATEGY) !=
+        Z_OK) {
+        aws_mem_release(allocator, encoder);
+        aws_raise_error(AWS_ERROR_OOM);
+        return NULL;
+    }
+
+    return encoder;
+}
+
+void aws_py_http_content_encoder_destroy(struct py_http_content_encoder *encoder) {
+    if (!encoder) {
+        return;
+    }
+
+    deflateEnd(&encoder->zstream);
+    aws_mem_release(encoder->allocator, encoder);
+}
+
+int aws_py_http_content_encoder_encode(
+    struct py_http_content_encoder *encoder,
+    struct aws_byte_cursor data,
+    bool finish,
+    struct aws_byte_buf *out) {
+
+    do {
+        size_t input_len = data.len < S_MAX_ZLIB_CHUNK ? data.len : S_MAX_ZLIB_CHUNK;
+        bool last = finish && input_len == data.len;
+        encoder->zstream.next_in = data.ptr;
+        encoder->zstream.avail_in = (uInt)input_len;
+
+        int result = Z_OK;
+        do {
+            if (out->capacity - out->len < 1024 && aws_byte_buf_reserve(out, out->capacity * 2 + 1024)) {
+                return AWS_OP_ERR;
+            }
+
+            size_t space = out->capacity - out->len;
+            if (space > S_MAX_ZLIB_CHUNK) {
+                space = S_MAX_ZLIB_CHUNK;
+            }
+            encoder->zstream.next_out = out->buffer + out->len;
+            encoder->zstream.avail_out = (uInt)space;
+
+            result = deflate(&encoder->zstream, last ? Z_FINISH : Z_NO_FLUSH);
+            if (result == Z_STREAM_ERROR) {
+                return aws_raise_error(AWS_ERROR_INVALID_STATE);
+            }
+
+            out->len += space - encoder->zstream.avail_out;
+        } while (encoder->zstream.avail_in > 0 || encoder->zstream.avail_out == 0 || (last && result != Z_STREAM_END));
+
+        aws_byte_cursor_advance(&data, input_len);
+    } while (data.len > 0);
+
+    return AWS_OP_SUCCESS;
+}
+
+#else
+
+bool aws_py_http_content_encoding_is_available(void) {
+    return false;
+}
+
+struct py_http_content_decoder *aws_py_http_content_decoder_new(struct aws_allocator *allocator) {
+    (void)allocator;
+    aws_raise_error(AWS_ERROR_UNSUPPORTED_OPERATION);
+    return NULL;
+}
+
+void aws_py_http_content_decoder_destroy(struct py_http_content_decoder *decoder) {
+    (void)decoder;
+}
+
+int aws_py_http_content_decoder_decode(
+    struct py_http_content_decoder *decoder,
+    struct aws_byte_cursor data,
+    py_http_content_on_decoded_fn *on_decoded,
+    void *user_data) {
+    (void)decoder;
+    (void)data;
+    (void)on_decoded;
+    (void)user_data;
+    return aws_raise_error(AWS_ERROR_UNSUPPORTED_OPERATION);
+}
+
+int aws_py_http_content_decoder_finish(struct py_http_content_decoder *decoder) {
+    (void)decoder;
+    return aws_raise_error(AWS_ERROR_UNSUPPORTED_OPERATION);
+}
+
+struct py_http_content_encoder *aws_py_http_gzip_encoder_new(struct aws_allocator *allocator) {
+    (void)allocator;
+    aws_raise_error(AWS_ERROR_UNSUPPORTED_OPERATION);
+    return NULL;
+}
+
+void aws_py_http_content_encoder_destroy(struct py_http_content_encoder *encoder) {
+    (void)encoder;
+}
+
+int aws_py_http_content_encoder_encode(
+    struct py_http_content_encoder *encoder,
+    struct aws_byte_cursor data,
+    bool finish,
+    struct aws_byte_buf *out) {
+    (void)encoder;
+    (void)data;
+    (void)finish;
+    (void)out;
+    return aws_raise_error(AWS_ERROR_UNSUPPORTED_OPERATION);
+}
+
+#endif /* AWS_CRT_PYTHON_HAVE_ZLIB */
@@ -0,0 +1,82 @@
+#ifndef AWS_CRT_PYTHON_HTTP_CONTENT_ENCODING_H
+#define AWS_CRT_PYTHON_HTTP_CONTENT_ENCODING_H
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "module.h"
+
+#include <aws/common/byte_buf.h>
+
+/**
+ * gzip/deflate support for http bodies. Backed by zlib where the build has it (AWS_CRT_PYTHON_HAVE_ZLIB), elsewhere
+ * every constructor fails with AWS_ERROR_UNSUPPORTED_OPERATION.
+ * None of these functions require the GIL.
+ */
+
+/**
+ * Whether content encoding is supported by this build.
+ */
+bool aws_py_http_content_encoding_is_available(void);
+
+/**
+ * Streaming decoder for a 'content-encoding: gzip' or 'deflate' body. zlib wrapped and raw deflate data are both
+ * accepted for deflate, since servers disagree on what it means.
+ */
+struct py_http_content_decoder;
+
+typedef void(py_http_content_on_decoded_fn)(struct aws_byte_cursor data, void *user_data);
+
+struct py_http_content_decoder *aws_py_http_content_decoder_new(struct aws_allocator *allocator);
+
+void aws_py_http_content_decoder_destroy(struct py_http_content_decoder *decoder);
+
+/**
+ * Decodes the next piece of the body, calling on_decoded with each piece of output as it is produced.
+ */
+int aws_py_http_content_decoder_decode(
+    struct py_http_content_decoder *decoder,
+    struct aws_byte_cursor data,
+    py_http_content_on_decoded_fn *on_decoded,
+    void *user_data);
+
+/**
+ * Called once the whole body has been decoded. Fails with AWS_ERROR_HTTP_INVALID_BODY_STREAM if it ended partway
+ * through a gzip member or deflate stream.
+ */
+int aws_py_http_content_decoder_finish(struct py_http_content_decoder *decoder);
+
+/**
+ * gzip compressor.
+ */
+struct py_http_content_encoder;
+
+struct py_http_content_encoder *aws_py_http_gzip_encoder_new(struct aws_allocator *allocator);
+
+void aws_py_http_content_encoder_destroy(struct py_http_content_encoder *encoder);
+
+/**
+ * Compresses data onto the end of out, growing it as needed. Pass finish with the last (possibly empty) input.
+ */
+int aws_py_http_content_encoder_encode(
+    struct py_http_content_encoder *encoder,
+    struct aws_byte_cursor data,
+    bool finish,
+    struct aws_byte_buf *out);
+
+/**
+ * Returns True if this build can decode and encode http content.
+ */
+PyObject *aws_py_http_is_content_encoding_available(PyObject *self, PyObject *args);
+
+#endif /* AWS_CRT_PYTHON_HTTP_CONTENT_ENCODING_H */
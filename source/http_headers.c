@@ -0,0 +1,257 @@
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "http_headers.h"
+#include "allocator.h"
+
+#include <aws/common/array_list.h>
+#include <aws/common/byte_buf.h>
+
+const char *s_capsule_name_http_headers = "aws_http_headers";
+
+/* Offsets rather than pointers, so growing the storage buffer doesn't invalidate anything */
+struct py_http_header_entry {
+    size_t name_offset;
+    size_t name_len;
+    size_t value_offset;
+    size_t value_len;
+};
+
+struct py_http_headers {
+    struct aws_allocator *allocator;
+    struct aws_byte_buf storage;
+    struct aws_array_list entries;
+};
+
+struct py_http_headers *aws_py_http_headers_new(struct aws_allocator *allocator) {
+    struct py_http_headers *headers = aws_mem_acquire(allocator, sizeof(struct py_http_headers));
+    if (!headers) {
+        return NULL;
+    }
+    AWS_ZERO_STRUCT(*headers);
+    headers->allocator = allocator;
+
+    /* sized for a typical response, both grow on demand */
+    if (aws_byte_buf_init(&headers->storage, allocator, 512)) {
+        goto error;
+    }
+
+    if (aws_array_list_init_dynamic(&headers->entries, allocator, 16, sizeof(struct py_http_header_entry))) {
+        goto error;
+    }
+
+    return headers;
+
+error:
+    aws_byte_buf_clean_up(&headers->storage);
+    aws_mem_release(allocator, headers);
+    return NULL;
+}
+
+void aws_py_http_headers_destroy(struct py_http_headers *headers) {
+    if (!headers) {
+        return;
+    }
+
+    aws_array_list_clean_up(&headers->entries);
+    aws_byte_buf_clean_up(&headers->storage);
+    aws_mem_release(headers->allocator, headers);
+}
+
+int aws_py_http_headers_append(
+    struct py_http_headers *headers,
+    const struct aws_http_header *header_array,
+    size_t num_headers) {
+
+    for (size_t i = 0; i < num_headers; ++i) {
+        struct py_http_header_entry entry = {
+            .name_offset = headers->storage.len,
+            .name_len = header_array[i].name.len,
+            .value_offset = headers->storage.len + header_array[i].name.len,
+            .value_len = header_array[i].value.len,
+        };
+
+        if (aws_byte_buf_append_dynamic(&headers->storage, &header_array[i].name) ||
+            aws_byte_buf_append_dynamic(&headers->storage, &header_array[i].value)) {
+            return AWS_OP_ERR;
+        }
+
+        if (aws_array_list_push_back(&headers->entries, &entry)) {
+            return AWS_OP_ERR;
+        }
+    }
+
+    return AWS_OP_SUCCESS;
+}
+
+size_t aws_py_http_headers_count(const struct py_http_headers *headers) {
+    return aws_array_list_length(&headers->entries);
+}
+
+int aws_py_http_headers_at(const struct py_http_headers *headers, size_t index, struct aws_http_header *out) {
+    struct py_http_header_entry *entry = NULL;
+    if (aws_array_list_get_at_ptr(&headers->entries, (void **)&entry, index)) {
+        return AWS_OP_ERR;
+    }
+
+    out->name = aws_byte_cursor_from_array(headers->storage.buffer + entry->name_offset, entry->name_len);
+    out->value = aws_byte_cursor_from_array(headers->storage.buffer + entry->value_offset, entry->value_len);
+    return AWS_OP_SUCCESS;
+}
+
+static void s_http_headers_destructor(PyObject *headers_capsule) {
+    struct py_http_headers *headers = PyCapsule_GetPointer(headers_capsule, s_capsule_name_http_headers);
+    assert(headers);
+
+    aws_py_http_headers_destroy(headers);
+}
+
+PyObject *aws_py_http_headers_to_capsule(struct py_http_headers *headers) {
+    PyObject *capsule = PyCapsule_New(headers, s_capsule_name_http_headers, s_http_headers_destructor);
+    if (!capsule) {
+        aws_py_http_headers_destroy(headers);
+    }
+
+    return capsule;
+}
+
+struct py_http_headers *aws_py_http_headers_from_capsule(PyObject *headers_capsule) {
+    return PyCapsule_GetPointer(headers_capsule, s_capsule_name_http_headers);
+}
+
+PyObject *aws_py_http_headers_new_from_dict(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *dict = NULL;
+    if (!PyArg_ParseTuple(args, "O!", &PyDict_Type, &dict)) {
+        return NULL;
+    }
+
+    struct py_http_headers *headers = aws_py_http_headers_new(aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP));
+    if (!headers) {
+        return PyErr_AwsLastError();
+    }
+
+    PyObject *key, *value;
+    Py_ssize_t pos = 0;
+    while (PyDict_Next(dict, &pos, &key, &value)) {
+        if (!(PyBytes_CheckExact(key) || PyUnicode_CheckExact(key)) ||
+            !(PyBytes_CheckExact(value) || PyUnicode_CheckExact(value))) {
+            PyErr_SetString(PyExc_TypeError, "header names and values must be strings");
+            goto error;
+        }
+
+        struct aws_http_header header;
+        header.name = aws_byte_cursor_from_pystring(key);
+        header.value = aws_byte_cursor_from_pystring(value);
+        if (aws_py_http_headers_append(headers, &header, 1)) {
+            PyErr_SetAwsLastError();
+            goto error;
+        }
+    }
+
+    return aws_py_http_headers_to_capsule(headers);
+
+error:
+    aws_py_http_headers_destroy(headers);
+    return NULL;
+}
+
+PyObject *aws_py_http_headers_len(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *headers_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &headers_capsule)) {
+        return NULL;
+    }
+
+    struct py_http_headers *headers = PyCapsule_GetPointer(headers_capsule, s_capsule_name_http_headers);
+    if (!headers) {
+        return NULL;
+    }
+
+    return PyLong_FromSize_t(aws_py_http_headers_count(headers));
+}
+
+PyObject *aws_py_http_headers_get_index(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *headers_capsule = NULL;
+    Py_ssize_t index = 0;
+    if (!PyArg_ParseTuple(args, "On", &headers_capsule, &index)) {
+        return NULL;
+    }
+
+    struct py_http_headers *headers = PyCapsule_GetPointer(headers_capsule, s_capsule_name_http_headers);
+    if (!headers) {
+        return NULL;
+    }
+
+    struct aws_http_header header;
+    if (index < 0 || aws_py_http_headers_at(headers, (size_t)index, &header)) {
+        PyErr_SetString(PyExc_IndexError, "header index out of range");
+        return NULL;
+    }
+
+    return Py_BuildValue(
+        "(s#s#)",
+        (const char *)header.name.ptr,
+        (Py_ssize_t)header.name.len,
+        (const char *)header.value.ptr,
+        (Py_ssize_t)header.value.len);
+}
+
+PyObject *aws_py_http_headers_get_values(PyObject *self, PyObject *args) {
+    (void)self;
+
+    const char *name = NULL;
+    Py_ssize_t name_len = 0;
+    PyObject *headers_capsule = NULL;
+
+    if (!PyArg_ParseTuple(args, "Os#", &headers_capsule, &name, &name_len)) {
+        return NULL;
+    }
+
+    struct py_http_headers *headers = PyCapsule_GetPointer(headers_capsule, s_capsule_name_http_headers);
+    if (!headers) {
+        return NULL;
+    }
+
+    PyObject *values = PyList_New(0);
+    if (!values) {
+        return NULL;
+    }
+
+    struct aws_byte_cursor name_cur = aws_byte_cursor_from_array(name, (size_t)name_len);
+    size_t count = aws_py_http_headers_count(headers);
+    for (size_t i = 0; i < count; ++i) {
+        struct aws_http_header header;
+        aws_py_http_headers_at(headers, i, &header);
+
+        if (!aws_byte_cursor_eq_ignore_case(&header.name, &name_cur)) {
+            continue;
+        }
+
+        /* only the values that were asked for get decoded */
+        PyObject *value = PyString_FromAwsByteCursor(&header.value);
+        if (!value || PyList_Append(values, value)) {
+            Py_XDECREF(value);
+            Py_DECREF(values);
+            return NULL;
+        }
+        Py_DECREF(value);
+    }
+
+    return values;
+}
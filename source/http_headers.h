@@ -0,0 +1,87 @@
+#ifndef AWS_CRT_PYTHON_HTTP_HEADERS_H
+#define AWS_CRT_PYTHON_HTTP_HEADERS_H
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "module.h"
+
+#include <aws/http/request_response.h>
+
+extern const char *s_capsule_name_http_headers;
+
+/**
+ * A block of http headers packed into one contiguous buffer, plus an index of where each name and value lives.
+ * Python strings are only created for the headers that python code actually looks at.
+ */
+struct py_http_headers;
+
+/**
+ * Create an empty block of headers. Does not require the GIL.
+ */
+struct py_http_headers *aws_py_http_headers_new(struct aws_allocator *allocator);
+
+/**
+ * Free a block of headers that was never handed to python. Does not require the GIL.
+ */
+void aws_py_http_headers_destroy(struct py_http_headers *headers);
+
+/**
+ * Copy num_headers headers onto the end of the block. Does not require the GIL.
+ */
+int aws_py_http_headers_append(
+    struct py_http_headers *headers,
+    const struct aws_http_header *header_array,
+    size_t num_headers);
+
+/**
+ * Number of headers in the block.
+ */
+size_t aws_py_http_headers_count(const struct py_http_headers *headers);
+
+/**
+ * Get the header at index. The cursors point into the block and are valid as long as the block is.
+ */
+int aws_py_http_headers_at(const struct py_http_headers *headers, size_t index, struct aws_http_header *out);
+
+/**
+ * Wrap the block in a capsule, which takes ownership of it. GIL must be held.
+ */
+PyObject *aws_py_http_headers_to_capsule(struct py_http_headers *headers);
+
+/**
+ * Get the block out of a headers capsule, sets a python exception and returns NULL if it isn't one.
+ */
+struct py_http_headers *aws_py_http_headers_from_capsule(PyObject *headers_capsule);
+
+/**
+ * Returns a new headers capsule holding a copy of a dict of headers.
+ */
+PyObject *aws_py_http_headers_new_from_dict(PyObject *self, PyObject *args);
+
+/**
+ * Returns the number of headers in a headers capsule.
+ */
+PyObject *aws_py_http_headers_len(PyObject *self, PyObject *args);
+
+/**
+ * Returns the (name, value) tuple at an index of a headers capsule.
+ */
+PyObject *aws_py_http_headers_get_index(PyObject *self, PyObject *args);
+
+/**
+ * Returns a list of every value for a name, compared case-insensitively, in a headers capsule.
+ */
+PyObject *aws_py_http_headers_get_values(PyObject *self, PyObject *args);
+
+#endif /* AWS_CRT_PYTHON_HTTP_HEADERS_H */
@@ -0,0 +1,670 @@
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "http_server.h"
+#include "allocator.h"
+
+#include "http_headers.h"
+#include "io.h"
+
+#include <aws/common/atomics.h>
+#include <aws/common/byte_buf.h>
+#include <aws/http/connection.h>
+#include <aws/http/request_response.h>
+#include <aws/http/server.h>
+#include <aws/io/channel_bootstrap.h>
+#include <aws/io/socket.h>
+#include <aws/io/tls_channel_handler.h>
+
+#include <stdio.h>
+#include <string.h>
+
+const char *s_capsule_name_http_server = "aws_http_server";
+
+enum py_http_server_mode {
+    /* every request gets the same response, built once when the server is created */
+    PY_HTTP_SERVER_MODE_STATIC,
+    /* every request gets a 200 with its own body */
+    PY_HTTP_SERVER_MODE_ECHO,
+    /* a python callable is invoked once per request, with the whole request */
+    PY_HTTP_SERVER_MODE_PYTHON,
+};
+
+struct py_http_server {
+    struct aws_allocator *allocator;
+    struct aws_http_server *server;
+    enum py_http_server_mode mode;
+    PyObject *on_incoming_request;
+    PyObject *on_shutdown;
+    struct aws_atomic_var request_count;
+
+    /* static mode. The header cursors point into static_headers_capsule's block, plus content-length at the end */
+    int static_status;
+    PyObject *static_headers_capsule;
+    struct aws_http_header *static_header_array;
+    size_t static_num_headers;
+    char static_content_length[32];
+    struct aws_byte_buf static_body;
+
+    /* written with the GIL held, see s_http_server_destructor() */
+    bool destructor_called;
+    bool destroy_complete;
+};
+
+struct py_http_server_stream {
+    struct py_http_server *server;
+    struct aws_http_stream *stream;
+
+    /* the request, only collected when the response needs it */
+    struct py_http_headers *request_headers;
+    struct aws_byte_buf request_body;
+
+    /* the response. For python mode the headers and body point into objects that are held until completion */
+    struct aws_http_header *response_header_array;
+    size_t response_num_headers;
+    char response_content_length[32];
+    PyObject *response_headers_capsule;
+    Py_buffer response_body_view;
+    bool has_response_body_view;
+    struct aws_byte_cursor response_body;
+};
+
+/* Copies headers, minus any content-length, into a new array with content-length for body_len at the end. */
+static struct aws_http_header *s_new_response_header_array(
+    struct aws_allocator *allocator,
+    const struct py_http_headers *headers,
+    size_t body_len,
+    char *content_length_storage,
+    size_t content_length_storage_len,
+    size_t *out_num_headers) {
+
+    size_t count = headers ? aws_py_http_headers_count(headers) : 0;
+    struct aws_http_header *header_array = aws_mem_calloc(allocator, count + 1, sizeof(struct aws_http_header));
+    if (!header_array) {
+        return NULL;
+    }
+
+    size_t num_headers = 0;
+    for (size_t i = 0; i < count; ++i) {
+        struct aws_http_header header;
+        aws_py_http_headers_at(headers, i, &header);
+        if (!aws_byte_cursor_eq_c_str_ignore_case(&header.name, "content-length")) {
+            header_array[num_headers++] = header;
+        }
+    }
+
+    snprintf(content_length_storage, content_length_storage_len, "%llu", (unsigned long long)body_len);
+    header_array[num_headers].name = aws_byte_cursor_from_c_str("content-length");
+    header_array[num_headers].value = aws_byte_cursor_from_c_str(content_length_storage);
+    *out_num_headers = num_headers + 1;
+    return header_array;
+}
+
+static void s_server_stream_destroy(struct py_http_server_stream *stream) {
+    struct aws_allocator *allocator = stream->server->allocator;
+
+    if (stream->stream) {
+        aws_http_stream_release(stream->stream);
+    }
+
+    if (stream->has_response_body_view || stream->response_headers_capsule) {
+        PyGILState_STATE state = PyGILState_Ensure();
+        if (stream->has_response_body_view) {
+            PyBuffer_Release(&stream->response_body_view);
+        }
+        Py_XDECREF(stream->response_headers_capsule);
+        PyGILState_Release(state);
+    }
+
+    if (stream->request_headers) {
+        aws_py_http_headers_destroy(stream->request_headers);
+    }
+    if (stream->response_header_array) {
+        aws_mem_release(allocator, stream->response_header_array);
+    }
+    aws_byte_buf_clean_up(&stream->request_body);
+    aws_mem_release(allocator, stream);
+}
+
+static void s_on_request_headers(
+    struct aws_http_stream *internal_stream,
+    const struct aws_http_header *header_array,
+    size_t num_headers,
+    void *user_data) {
+
+    struct py_http_server_stream *stream = user_data;
+    if (stream->request_headers && aws_py_http_headers_append(stream->request_headers, header_array, num_headers)) {
+        aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+    }
+}
+
+static void s_on_request_body(
+    struct aws_http_stream *internal_stream,
+    const struct aws_byte_cursor *data,
+    size_t *out_window_update_size,
+    void *user_data) {
+    (void)out_window_update_size;
+
+    struct py_http_server_stream *stream = user_data;
+    if (stream->server->mode == PY_HTTP_SERVER_MODE_STATIC) {
+        return;
+    }
+
+    if (aws_byte_buf_append_dynamic(&stream->request_body, data)) {
+        aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+    }
+}
+
+static enum aws_http_outgoing_body_state s_on_response_body(
+    struct aws_http_stream *internal_stream,
+    struct aws_byte_buf *buf,
+    void *user_data) {
+    (void)internal_stream;
+
+    struct py_http_server_stream *stream = user_data;
+    size_t space = buf->capacity - buf->len;
+    size_t write_len = stream->response_body.len < space ? stream->response_body.len : space;
+    aws_byte_buf_write(buf, stream->response_body.ptr, write_len);
+    aws_byte_cursor_advance(&stream->response_body, write_len);
+
+    return stream->response_body.len ? AWS_HTTP_OUTGOING_BODY_IN_PROGRESS : AWS_HTTP_OUTGOING_BODY_DONE;
+}
+
+/* Hands the whole request to python and sets up the response it returns. Returns AWS_OP_ERR if that fails. */
+static int s_call_on_incoming_request(struct py_http_server_stream *stream, int *out_status) {
+    struct py_http_server *server = stream->server;
+    int result_code = AWS_OP_ERR;
+
+    struct aws_byte_cursor method;
+    struct aws_byte_cursor uri;
+    AWS_ZERO_STRUCT(method);
+    AWS_ZERO_STRUCT(uri);
+    aws_http_stream_get_incoming_request_method(stream->stream, &method);
+    aws_http_stream_get_incoming_request_uri(stream->stream, &uri);
+    struct aws_byte_cursor body = aws_byte_cursor_from_buf(&stream->request_body);
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    PyObject *result = NULL;
+    PyObject *py_headers = aws_py_http_headers_to_capsule(stream->request_headers);
+    stream->request_headers = NULL;
+    if (!py_headers) {
+        goto done;
+    }
+
+    PyObject *py_body = aws_py_memory_view_from_byte_cursor(&body);
+    if (!py_body) {
+        Py_DECREF(py_headers);
+        goto done;
+    }
+
+    result = PyObject_CallFunction(
+        server->on_incoming_request,
+        "(s#s#OO)",
+        (const char *)method.ptr,
+        (Py_ssize_t)method.len,
+        (const char *)uri.ptr,
+        (Py_ssize_t)uri.len,
+        py_headers,
+        py_body);
+    /* the view is only promised to be valid during on_incoming_request */
+    aws_py_memory_view_release(py_body);
+    Py_DECREF(py_headers);
+    if (!result) {
+        goto done;
+    }
+
+    PyObject *py_response_headers = NULL;
+    PyObject *py_response_body = NULL;
+    if (!PyArg_ParseTuple(result, "iOO", out_status, &py_response_headers, &py_response_body)) {
+        goto done;
+    }
+
+    struct py_http_headers *response_headers = NULL;
+    if (py_response_headers != Py_None) {
+        response_headers = aws_py_http_headers_from_capsule(py_response_headers);
+        if (!response_headers) {
+            goto done;
+        }
+        Py_INCREF(py_response_headers);
+        stream->response_headers_capsule = py_response_headers;
+    }
+
+    if (py_response_body != Py_None) {
+        if (PyObject_GetBuffer(py_response_body, &stream->response_body_view, PyBUF_SIMPLE)) {
+            goto done;
+        }
+        stream->has_response_body_view = true;
+        stream->response_body =
+            aws_byte_cursor_from_array(stream->response_body_view.buf, (size_t)stream->response_body_view.len);
+    }
+
+    stream->response_header_array = s_new_response_header_array(
+        server->allocator,
+        response_headers,
+        stream->response_body.len,
+        stream->response_content_length,
+        sizeof(stream->response_content_length),
+        &stream->response_num_headers);
+    if (!stream->response_header_array) {
+        PyErr_SetAwsLastError();
+        goto done;
+    }
+
+    result_code = AWS_OP_SUCCESS;
+
+done:
+    if (result_code) {
+        PyErr_WriteUnraisable(PyErr_Occurred());
+    }
+    Py_XDECREF(result);
+    PyGILState_Release(state);
+    return result_code;
+}
+
+static void s_on_request_done(struct aws_http_stream *internal_stream, void *user_data) {
+    struct py_http_server_stream *stream = user_data;
+    struct py_http_server *server = stream->server;
+
+    struct aws_http_response_options options;
+    AWS_ZERO_STRUCT(options);
+    options.self_size = sizeof(options);
+
+    switch (server->mode) {
+        case PY_HTTP_SERVER_MODE_STATIC:
+            options.status = server->static_status;
+            options.header_array = server->static_header_array;
+            options.num_headers = server->static_num_headers;
+            stream->response_body = aws_byte_cursor_from_buf(&server->static_body);
+            break;
+
+        case PY_HTTP_SERVER_MODE_ECHO:
+            options.status = 200;
+            stream->response_body = aws_byte_cursor_from_buf(&stream->request_body);
+            stream->response_header_array = s_new_response_header_array(
+                server->allocator,
+                NULL,
+                stream->response_body.len,
+                stream->response_content_length,
+                sizeof(stream->response_content_length),
+                &stream->response_num_headers);
+            if (!stream->response_header_array) {
+                goto error;
+            }
+            options.header_array = stream->response_header_array;
+            options.num_headers = stream->response_num_headers;
+            break;
+
+        case PY_HTTP_SERVER_MODE_PYTHON:
+            if (s_call_on_incoming_request(stream, &options.status)) {
+                goto error;
+            }
+            options.header_array = stream->response_header_array;
+            options.num_headers = stream->response_num_headers;
+            break;
+    }
+
+    if (stream->response_body.len) {
+        options.stream_outgoing_body = s_on_response_body;
+    }
+
+    if (aws_http_stream_send_response(internal_stream, &options) == AWS_OP_SUCCESS) {
+        return;
+    }
+
+error:
+    aws_http_connection_close(aws_http_stream_get_connection(internal_stream));
+}
+
+static void s_on_server_stream_complete(struct aws_http_stream *internal_stream, int error_code, void *user_data) {
+    (void)internal_stream;
+    (void)error_code;
+
+    struct py_http_server_stream *stream = user_data;
+    aws_atomic_fetch_add(&stream->server->request_count, 1);
+    s_server_stream_destroy(stream);
+}
+
+static struct aws_http_stream *s_on_incoming_request(struct aws_http_connection *connection, void *user_data) {
+    struct py_http_server *server = user_data;
+
+    struct py_http_server_stream *stream = aws_mem_calloc(server->allocator, 1, sizeof(struct py_http_server_stream));
+    if (!stream) {
+        return NULL;
+    }
+    stream->server = server;
+
+    if (server->mode == PY_HTTP_SERVER_MODE_PYTHON) {
+        stream->request_headers = aws_py_http_headers_new(server->allocator);
+        if (!stream->request_headers) {
+            goto error;
+        }
+    }
+    if (server->mode != PY_HTTP_SERVER_MODE_STATIC) {
+        if (aws_byte_buf_init(&stream->request_body, server->allocator, 0)) {
+            goto error;
+        }
+    }
+
+    struct aws_http_request_handler_options options;
+    AWS_ZERO_STRUCT(options);
+    options.self_size = sizeof(options);
+    options.server_connection = connection;
+    options.user_data = stream;
+    options.on_request_headers = s_on_request_headers;
+    options.on_request_body = s_on_request_body;
+    options.on_request_done = s_on_request_done;
+    options.on_complete = s_on_server_stream_complete;
+
+    stream->stream = aws_http_stream_new_server_request_handler(&options);
+    if (!stream->stream) {
+        goto error;
+    }
+
+    return stream->stream;
+
+error:
+    s_server_stream_destroy(stream);
+    return NULL;
+}
+
+static void s_on_server_connection_shutdown(struct aws_http_connection *connection, int error_code, void *user_data) {
+    (void)error_code;
+    (void)user_data;
+
+    aws_http_connection_release(connection);
+}
+
+static void s_on_incoming_connection(
+    struct aws_http_server *internal_server,
+    struct aws_http_connection *connection,
+    int error_code,
+    void *user_data) {
+    (void)internal_server;
+
+    if (error_code) {
+        return;
+    }
+
+    struct aws_http_server_connection_options options;
+    AWS_ZERO_STRUCT(options);
+    options.self_size = sizeof(options);
+    options.connection_user_data = user_data;
+    options.on_incoming_request = s_on_incoming_request;
+    options.on_shutdown = s_on_server_connection_shutdown;
+
+    if (aws_http_connection_configure_server(connection, &options)) {
+        aws_http_connection_close(connection);
+        aws_http_connection_release(connection);
+    }
+}
+
+/* Frees everything but the server itself. GIL must be held. */
+static void s_server_clean_up(struct py_http_server *server) {
+    Py_XDECREF(server->on_incoming_request);
+    Py_XDECREF(server->on_shutdown);
+    Py_XDECREF(server->static_headers_capsule);
+    if (server->static_header_array) {
+        aws_mem_release(server->allocator, server->static_header_array);
+    }
+    aws_byte_buf_clean_up(&server->static_body);
+    aws_mem_release(server->allocator, server);
+}
+
+static void s_on_server_destroy_complete(void *user_data) {
+    struct py_http_server *server = user_data;
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    if (server->on_shutdown) {
+        PyObject *result = PyObject_CallFunction(server->on_shutdown, "()");
+        if (!result) {
+            PyErr_WriteUnraisable(PyErr_Occurred());
+        }
+        Py_XDECREF(result);
+    }
+
+    server->destroy_complete = true;
+    if (server->destructor_called) {
+        s_server_clean_up(server);
+    }
+
+    PyGILState_Release(state);
+}
+
+/* The server may finish shutting down inside aws_http_server_release(), so nothing can be touched after it. */
+static void s_server_release(struct py_http_server *server) {
+    struct aws_http_server *internal_server = server->server;
+    server->server = NULL;
+    aws_http_server_release(internal_server);
+}
+
+static void s_http_server_destructor(PyObject *server_capsule) {
+    struct py_http_server *server = PyCapsule_GetPointer(server_capsule, s_capsule_name_http_server);
+    assert(server);
+
+    server->destructor_called = true;
+    if (server->server) {
+        s_server_release(server);
+    } else if (server->destroy_complete) {
+        s_server_clean_up(server);
+    }
+}
+
+PyObject *aws_py_http_server_create(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP);
+
+    PyObject *bootstrap_capsule = NULL;
+    const char *host_name = NULL;
+    Py_ssize_t host_name_len = 0;
+    uint16_t port_number = 0;
+    PyObject *py_socket_options = NULL;
+    PyObject *tls_conn_options_capsule = NULL;
+    PyObject *py_initial_window_size = NULL;
+    PyObject *on_incoming_request = NULL;
+    uint8_t echo = false;
+    int static_status = 200;
+    PyObject *static_headers_capsule = NULL;
+    Py_buffer static_body;
+    AWS_ZERO_STRUCT(static_body);
+    PyObject *on_shutdown = NULL;
+
+    if (!PyArg_ParseTuple(
+            args,
+            "Os#HOOOObiOz*O",
+            &bootstrap_capsule,
+            &host_name,
+            &host_name_len,
+            &port_number,
+            &py_socket_options,
+            &tls_conn_options_capsule,
+            &py_initial_window_size,
+            &on_incoming_request,
+            &echo,
+            &static_status,
+            &static_headers_capsule,
+            &static_body,
+            &on_shutdown)) {
+        return NULL;
+    }
+
+    struct py_http_server *server = NULL;
+    Py_ssize_t initial_window_size = PY_SSIZE_T_MAX;
+
+    if (py_initial_window_size != Py_None) {
+        initial_window_size = PyNumber_AsSsize_t(py_initial_window_size, PyExc_OverflowError);
+        if (initial_window_size < 0) {
+            if (!PyErr_Occurred()) {
+                PyErr_SetString(PyExc_ValueError, "initial_window_size must not be negative");
+            }
+            goto error;
+        }
+    }
+
+    struct aws_server_bootstrap *bootstrap = PyCapsule_GetPointer(bootstrap_capsule, s_capsule_name_server_bootstrap);
+    if (!bootstrap) {
+        goto error;
+    }
+
+    struct aws_tls_connection_options *tls_options = NULL;
+    if (tls_conn_options_capsule != Py_None) {
+        tls_options = PyCapsule_GetPointer(tls_conn_options_capsule, s_capsule_name_tls_conn_options);
+        if (!tls_options) {
+            goto error;
+        }
+    }
+
+    if ((size_t)host_name_len >= sizeof(((struct aws_socket_endpoint *)NULL)->address)) {
+        PyErr_SetString(PyExc_ValueError, "host_name is too long");
+        goto error;
+    }
+
+    struct py_http_headers *static_headers = NULL;
+    if (static_headers_capsule != Py_None) {
+        static_headers = aws_py_http_headers_from_capsule(static_headers_capsule);
+        if (!static_headers) {
+            goto error;
+        }
+    }
+
+    server = aws_mem_calloc(allocator, 1, sizeof(struct py_http_server));
+    if (!server) {
+        PyErr_SetAwsLastError();
+        goto error;
+    }
+    server->allocator = allocator;
+    aws_atomic_init_int(&server->request_count, 0);
+
+    if (on_incoming_request != Py_None) {
+        server->mode = PY_HTTP_SERVER_MODE_PYTHON;
+        Py_INCREF(on_incoming_request);
+        server->on_incoming_request = on_incoming_request;
+    } else if (echo) {
+        server->mode = PY_HTTP_SERVER_MODE_ECHO;
+    } else {
+        server->mode = PY_HTTP_SERVER_MODE_STATIC;
+        server->static_status = static_status;
+        if (static_headers) {
+            Py_INCREF(static_headers_capsule);
+            server->static_headers_capsule = static_headers_capsule;
+        }
+
+        if (aws_byte_buf_init(&server->static_body, allocator, (size_t)static_body.len)) {
+            PyErr_SetAwsLastError();
+            goto error;
+        }
+        aws_byte_buf_write(&server->static_body, static_body.buf, (size_t)static_body.len);
+
+        server->static_header_array = s_new_response_header_array(
+            allocator,
+            static_headers,
+            server->static_body.len,
+            server->static_content_length,
+            sizeof(server->static_content_length),
+            &server->static_num_headers);
+        if (!server->static_header_array) {
+            PyErr_SetAwsLastError();
+            goto error;
+        }
+    }
+
+    if (on_shutdown != Py_None) {
+        Py_INCREF(on_shutdown);
+        server->on_shutdown = on_shutdown;
+    }
+
+    struct aws_socket_options socket_options;
+    aws_py_socket_options_init(&socket_options, py_socket_options);
+
+    struct aws_socket_endpoint endpoint;
+    AWS_ZERO_STRUCT(endpoint);
+    memcpy(endpoint.address, host_name, (size_t)host_name_len);
+    endpoint.port = port_number;
+
+    struct aws_http_server_options options;
+    AWS_ZERO_STRUCT(options);
+    options.self_size = sizeof(options);
+    options.allocator = allocator;
+    options.bootstrap = bootstrap;
+    options.endpoint = &endpoint;
+    options.socket_options = &socket_options;
+    options.tls_options = tls_options;
+    options.initial_window_size = (size_t)initial_window_size;
+    options.server_user_data = server;
+    options.on_incoming_connection = s_on_incoming_connection;
+    options.on_destroy_complete = s_on_server_destroy_complete;
+
+    server->server = aws_http_server_new(&options);
+    if (!server->server) {
+        PyErr_SetAwsLastError();
+        goto error;
+    }
+
+    PyObject *capsule = PyCapsule_New(server, s_capsule_name_http_server, s_http_server_destructor);
+    if (!capsule) {
+        /* nothing else refers to the server, so it is cleaned up once it has finished shutting down */
+        server->destructor_called = true;
+        s_server_release(server);
+        server = NULL;
+        goto error;
+    }
+
+    PyBuffer_Release(&static_body);
+    return capsule;
+
+error:
+    if (server) {
+        s_server_clean_up(server);
+    }
+    PyBuffer_Release(&static_body);
+    return NULL;
+}
+
+PyObject *aws_py_http_server_close(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *server_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &server_capsule)) {
+        return NULL;
+    }
+
+    struct py_http_server *server = PyCapsule_GetPointer(server_capsule, s_capsule_name_http_server);
+    if (!server) {
+        return NULL;
+    }
+
+    if (server->server) {
+        s_server_release(server);
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyObject *aws_py_http_server_get_request_count(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *server_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &server_capsule)) {
+        return NULL;
+    }
+
+    struct py_http_server *server = PyCapsule_GetPointer(server_capsule, s_capsule_name_http_server);
+    if (!server) {
+        return NULL;
+    }
+
+    return PyLong_FromSize_t(aws_atomic_load_int(&server->request_count));
+}
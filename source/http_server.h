@@ -0,0 +1,38 @@
+#ifndef AWS_CRT_PYTHON_HTTP_SERVER_H
+#define AWS_CRT_PYTHON_HTTP_SERVER_H
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "module.h"
+
+extern const char *s_capsule_name_http_server;
+
+/**
+ * Start listening on a host and port, with TLS if given tls_connection_options from a server tls_ctx. Every request
+ * gets the same static response, its own body echoed back, or whatever a python callable returns, see
+ * awscrt.http.HttpServer. Returns a capsule for the server.
+ */
+PyObject *aws_py_http_server_create(PyObject *self, PyObject *args);
+
+/**
+ * Stop listening and close every connection. The server's on_shutdown callback is invoked once that is done.
+ */
+PyObject *aws_py_http_server_close(PyObject *self, PyObject *args);
+
+/**
+ * Returns the number of requests the server has finished with, successfully or not.
+ */
+PyObject *aws_py_http_server_get_request_count(PyObject *self, PyObject *args);
+
+#endif /* AWS_CRT_PYTHON_HTTP_SERVER_H */
@@ -13,15 +13,21 @@
  * permissions and limitations under the License.
  */
 #include "io.h"
+#include "allocator.h"
 
+#include <aws/common/atomics.h>
+#include <aws/common/string.h>
+#include <aws/common/thread.h>
 #include <aws/io/channel_bootstrap.h>
 #include <aws/io/event_loop.h>
+#include <aws/io/host_resolver.h>
 #include <aws/io/tls_channel_handler.h>
 
 #include <stdio.h>
 #include <string.h>
 
 const char *s_capsule_name_client_bootstrap = "aws_client_bootstrap";
+const char *s_capsule_name_server_bootstrap = "aws_server_bootstrap";
 static const char *s_capsule_name_elg = "aws_event_loop_group";
 const char *s_capsule_name_host_resolver = "aws_host_resolver";
 const char *s_capsule_name_tls_ctx = "aws_client_tls_ctx";
@@ -50,7 +56,7 @@ static void s_elg_destructor(PyObject *elg_capsule) {
 PyObject *aws_py_io_event_loop_group_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
 
     uint16_t num_threads = 0;
 
@@ -72,23 +78,189 @@ PyObject *aws_py_io_event_loop_group_new(PyObject *self, PyObject *args) {
     return PyCapsule_New(elg, s_capsule_name_elg, s_elg_destructor);
 }
 
+struct py_event_loop_timer {
+    struct aws_allocator *allocator;
+    struct aws_task task;
+    PyObject *callback;
+};
+
+static void s_event_loop_timer_task(struct aws_task *task, void *arg, enum aws_task_status status) {
+    (void)task;
+    struct py_event_loop_timer *timer = arg;
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    if (status == AWS_TASK_STATUS_RUN_READY) {
+        PyObject *result = PyObject_CallFunction(timer->callback, "()");
+        if (!result) {
+            PyErr_WriteUnraisable(PyErr_Occurred());
+        }
+        Py_XDECREF(result);
+    }
+
+    /* a cancelled task runs on the thread cleaning up the event loop group, which already holds the GIL */
+    Py_DECREF(timer->callback);
+    PyGILState_Release(state);
+
+    aws_mem_release(timer->allocator, timer);
+}
+
+PyObject *aws_py_io_event_loop_group_schedule(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
+
+    PyObject *elg_capsule = NULL;
+    unsigned long long delay_ms = 0;
+    PyObject *callback = NULL;
+
+    if (!PyArg_ParseTuple(args, "OKO", &elg_capsule, &delay_ms, &callback)) {
+        return NULL;
+    }
+
+    if (!elg_capsule || !PyCapsule_CheckExact(elg_capsule)) {
+        PyErr_SetNone(PyExc_ValueError);
+        return NULL;
+    }
+    struct aws_event_loop_group *elg = PyCapsule_GetPointer(elg_capsule, s_capsule_name_elg);
+    if (!elg) {
+        return NULL;
+    }
+
+    if (!callback || !PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "callback must be callable");
+        return NULL;
+    }
+
+    struct aws_event_loop *event_loop = aws_event_loop_group_get_next_loop(elg);
+    if (!event_loop) {
+        return PyErr_AwsLastError();
+    }
+
+    struct py_event_loop_timer *timer = aws_mem_acquire(allocator, sizeof(struct py_event_loop_timer));
+    if (!timer) {
+        return PyErr_AwsLastError();
+    }
+    AWS_ZERO_STRUCT(*timer);
+
+    timer->allocator = allocator;
+    timer->callback = callback;
+    Py_INCREF(callback);
+
+    uint64_t now = 0;
+    aws_event_loop_current_clock_time(event_loop, &now);
+    aws_task_init(&timer->task, s_event_loop_timer_task, timer);
+    aws_event_loop_schedule_task_future(event_loop, &timer->task, now + (uint64_t)delay_ms * 1000000);
+
+    Py_RETURN_NONE;
+}
+
+struct py_host_resolver {
+    struct aws_host_resolver resolver;
+    /* handed to every resolve, by bootstraps made with this resolver too */
+    struct aws_host_resolution_config config;
+    /* the default resolver's vtable, with resolve_host wrapped to count cache hits */
+    struct aws_host_resolver_vtable vtable;
+    struct aws_host_resolver_vtable *default_vtable;
+    struct aws_atomic_var hits;
+    struct aws_atomic_var misses;
+    struct aws_atomic_var dns_queries;
+};
+
+struct py_host_resolve_request {
+    struct py_host_resolver *py_resolver;
+    aws_on_host_resolved_result_fn *on_resolved;
+    void *user_data;
+    uint64_t calling_thread_id;
+};
+
+static void s_on_host_resolved_counted(
+    struct aws_host_resolver *resolver,
+    const struct aws_string *host_name,
+    int error_code,
+    const struct aws_array_list *host_addresses,
+    void *user_data) {
+
+    struct py_host_resolve_request *request = user_data;
+    struct py_host_resolver *py_resolver = request->py_resolver;
+    aws_on_host_resolved_result_fn *on_resolved = request->on_resolved;
+    void *on_resolved_user_data = request->user_data;
+
+    /* Only successful resolves count. The default resolver answers from its cache before resolve_host() returns,
+     * otherwise from its own thread, so that is what tells a hit from a miss. It's a heuristic, the resolver doesn't
+     * say where an answer came from. */
+    if (!error_code) {
+        if (aws_thread_current_thread_id() == request->calling_thread_id) {
+            aws_atomic_fetch_add(&py_resolver->hits, 1);
+        } else {
+            aws_atomic_fetch_add(&py_resolver->misses, 1);
+        }
+    }
+    aws_mem_release(resolver->allocator, request);
+
+    on_resolved(resolver, host_name, error_code, host_addresses, on_resolved_user_data);
+}
+
+static int s_resolve_host_counted(
+    struct aws_host_resolver *resolver,
+    const struct aws_string *host_name,
+    aws_on_host_resolved_result_fn *res,
+    struct aws_host_resolution_config *config,
+    void *user_data) {
+
+    struct py_host_resolver *py_resolver = AWS_CONTAINER_OF(resolver, struct py_host_resolver, resolver);
+
+    struct py_host_resolve_request *request =
+        aws_mem_acquire(resolver->allocator, sizeof(struct py_host_resolve_request));
+    if (!request) {
+        return AWS_OP_ERR;
+    }
+    request->py_resolver = py_resolver;
+    request->on_resolved = res;
+    request->user_data = user_data;
+    request->calling_thread_id = aws_thread_current_thread_id();
+
+    if (py_resolver->default_vtable->resolve_host(resolver, host_name, s_on_host_resolved_counted, config, request)) {
+        aws_mem_release(resolver->allocator, request);
+        return AWS_OP_ERR;
+    }
+
+    return AWS_OP_SUCCESS;
+}
+
+static int s_dns_resolve_counted(
+    struct aws_allocator *allocator,
+    const struct aws_string *host_name,
+    struct aws_array_list *output_addresses,
+    void *user_data) {
+
+    struct py_host_resolver *py_resolver = user_data;
+    aws_atomic_fetch_add(&py_resolver->dns_queries, 1);
+    return aws_default_dns_resolve(allocator, host_name, output_addresses, NULL);
+}
+
 static void s_host_resolver_destructor(PyObject *host_resolver_capsule) {
     assert(PyCapsule_CheckExact(host_resolver_capsule));
 
-    struct aws_host_resolver *host_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
-    assert(host_resolver);
-    aws_host_resolver_clean_up(host_resolver);
-    aws_mem_release(aws_crt_python_get_allocator(), host_resolver);
+    struct py_host_resolver *py_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    assert(py_resolver);
+    aws_host_resolver_clean_up(&py_resolver->resolver);
+    aws_mem_release(aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO), py_resolver);
 }
 
 PyObject *aws_py_io_host_resolver_new_default(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
 
-    int max_hosts = 16;
+    Py_ssize_t max_hosts = 16;
     PyObject *elg_capsule = NULL;
-    if (!PyArg_ParseTuple(args, "bO", &max_hosts, &elg_capsule)) {
+    Py_ssize_t max_ttl_secs = 30;
+    if (!PyArg_ParseTuple(args, "nO|n", &max_hosts, &elg_capsule, &max_ttl_secs)) {
+        return NULL;
+    }
+    if (max_hosts <= 0 || max_ttl_secs <= 0) {
+        PyErr_SetString(PyExc_ValueError, "max_hosts and max_ttl_secs must be positive");
         return NULL;
     }
     if (!elg_capsule || !PyCapsule_CheckExact(elg_capsule)) {
@@ -97,14 +269,166 @@ PyObject *aws_py_io_host_resolver_new_default(PyObject *self, PyObject *args) {
     }
 
     struct aws_event_loop_group *elg = PyCapsule_GetPointer(elg_capsule, s_capsule_name_elg);
-    struct aws_host_resolver *host_resolver = aws_mem_acquire(allocator, sizeof(struct aws_host_resolver));
-    if (aws_host_resolver_init_default(host_resolver, allocator, max_hosts, elg)) {
+    if (!elg) {
+        return NULL;
+    }
+
+    struct py_host_resolver *py_resolver = aws_mem_calloc(allocator, 1, sizeof(struct py_host_resolver));
+    if (!py_resolver) {
+        return PyErr_AwsLastError();
+    }
+    if (aws_host_resolver_init_default(&py_resolver->resolver, allocator, (size_t)max_hosts, elg)) {
         PyErr_SetAwsLastError();
-        aws_mem_release(allocator, host_resolver);
+        aws_mem_release(allocator, py_resolver);
         return NULL;
     }
 
-    return PyCapsule_New(host_resolver, s_capsule_name_host_resolver, s_host_resolver_destructor);
+    py_resolver->config.impl = s_dns_resolve_counted;
+    py_resolver->config.impl_data = py_resolver;
+    py_resolver->config.max_ttl = (size_t)max_ttl_secs;
+    aws_atomic_init_int(&py_resolver->hits, 0);
+    aws_atomic_init_int(&py_resolver->misses, 0);
+    aws_atomic_init_int(&py_resolver->dns_queries, 0);
+
+    py_resolver->default_vtable = py_resolver->resolver.vtable;
+    py_resolver->vtable = *py_resolver->default_vtable;
+    py_resolver->vtable.resolve_host = s_resolve_host_counted;
+    py_resolver->resolver.vtable = &py_resolver->vtable;
+
+    return PyCapsule_New(py_resolver, s_capsule_name_host_resolver, s_host_resolver_destructor);
+}
+
+struct py_host_resolve_callback {
+    struct aws_allocator *allocator;
+    struct aws_string *host_name;
+    PyObject *on_resolved;
+};
+
+static void s_on_host_resolved_py(
+    struct aws_host_resolver *resolver,
+    const struct aws_string *host_name,
+    int error_code,
+    const struct aws_array_list *host_addresses,
+    void *user_data) {
+    (void)resolver;
+    (void)host_name;
+
+    struct py_host_resolve_callback *callback = user_data;
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    PyObject *addresses = PyList_New(0);
+    size_t num_addresses = (!error_code && host_addresses) ? aws_array_list_length(host_addresses) : 0;
+    for (size_t i = 0; addresses && i < num_addresses; ++i) {
+        struct aws_host_address *address = NULL;
+        aws_array_list_get_at_ptr(host_addresses, (void **)&address, i);
+        PyObject *py_address = PyString_FromStringAndSize(aws_string_c_str(address->address), address->address->len);
+        if (!py_address || PyList_Append(addresses, py_address)) {
+            Py_XDECREF(py_address);
+            Py_CLEAR(addresses);
+            break;
+        }
+        Py_DECREF(py_address);
+    }
+
+    PyObject *result = NULL;
+    if (addresses) {
+        result = PyObject_CallFunction(callback->on_resolved, "(iO)", error_code, addresses);
+    }
+    if (!result) {
+        PyErr_WriteUnraisable(PyErr_Occurred());
+    }
+    Py_XDECREF(result);
+    Py_XDECREF(addresses);
+    Py_DECREF(callback->on_resolved);
+
+    PyGILState_Release(state);
+
+    aws_string_destroy(callback->host_name);
+    aws_mem_release(callback->allocator, callback);
+}
+
+PyObject *aws_py_io_host_resolver_resolve(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
+
+    PyObject *host_resolver_capsule = NULL;
+    const char *host_name = NULL;
+    Py_ssize_t host_name_len = 0;
+    PyObject *on_resolved = NULL;
+    if (!PyArg_ParseTuple(args, "Os#O", &host_resolver_capsule, &host_name, &host_name_len, &on_resolved)) {
+        return NULL;
+    }
+
+    struct py_host_resolver *py_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    if (!py_resolver) {
+        return NULL;
+    }
+
+    struct py_host_resolve_callback *callback = aws_mem_calloc(allocator, 1, sizeof(struct py_host_resolve_callback));
+    if (!callback) {
+        return PyErr_AwsLastError();
+    }
+    callback->allocator = allocator;
+    callback->host_name = aws_string_new_from_array(allocator, (const uint8_t *)host_name, (size_t)host_name_len);
+    if (!callback->host_name) {
+        aws_mem_release(allocator, callback);
+        return PyErr_AwsLastError();
+    }
+    Py_INCREF(on_resolved);
+    callback->on_resolved = on_resolved;
+
+    if (aws_host_resolver_resolve_host(
+            &py_resolver->resolver, callback->host_name, s_on_host_resolved_py, &py_resolver->config, callback)) {
+        PyErr_SetAwsLastError();
+        Py_DECREF(on_resolved);
+        aws_string_destroy(callback->host_name);
+        aws_mem_release(allocator, callback);
+        return NULL;
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyObject *aws_py_io_host_resolver_purge_cache(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *host_resolver_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &host_resolver_capsule)) {
+        return NULL;
+    }
+
+    struct py_host_resolver *py_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    if (!py_resolver) {
+        return NULL;
+    }
+
+    if (aws_host_resolver_purge_cache(&py_resolver->resolver)) {
+        return PyErr_AwsLastError();
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyObject *aws_py_io_host_resolver_get_stats(PyObject *self, PyObject *args) {
+    (void)self;
+
+    PyObject *host_resolver_capsule = NULL;
+    if (!PyArg_ParseTuple(args, "O", &host_resolver_capsule)) {
+        return NULL;
+    }
+
+    struct py_host_resolver *py_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    if (!py_resolver) {
+        return NULL;
+    }
+
+    return Py_BuildValue(
+        "(KKK)",
+        (unsigned long long)aws_atomic_load_int(&py_resolver->hits),
+        (unsigned long long)aws_atomic_load_int(&py_resolver->misses),
+        (unsigned long long)aws_atomic_load_int(&py_resolver->dns_queries));
 }
 
 static void s_client_bootstrap_destructor(PyObject *bootstrap_capsule) {
@@ -118,7 +442,7 @@ static void s_client_bootstrap_destructor(PyObject *bootstrap_capsule) {
 PyObject *aws_py_io_client_bootstrap_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
 
     PyObject *elg_capsule = NULL;
     PyObject *host_resolver_capsule = NULL;
@@ -140,9 +464,13 @@ PyObject *aws_py_io_client_bootstrap_new(PyObject *self, PyObject *args) {
         PyErr_SetNone(PyExc_ValueError);
         return NULL;
     }
-    struct aws_host_resolver *host_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    struct py_host_resolver *py_resolver = PyCapsule_GetPointer(host_resolver_capsule, s_capsule_name_host_resolver);
+    if (!py_resolver) {
+        return NULL;
+    }
 
-    struct aws_client_bootstrap *bootstrap = aws_client_bootstrap_new(allocator, elg, host_resolver, NULL);
+    struct aws_client_bootstrap *bootstrap =
+        aws_client_bootstrap_new(allocator, elg, &py_resolver->resolver, &py_resolver->config);
     if (!bootstrap) {
         PyErr_SetAwsLastError();
         return NULL;
@@ -151,6 +479,82 @@ PyObject *aws_py_io_client_bootstrap_new(PyObject *self, PyObject *args) {
     return PyCapsule_New(bootstrap, s_capsule_name_client_bootstrap, s_client_bootstrap_destructor);
 }
 
+static void s_server_bootstrap_destructor(PyObject *bootstrap_capsule) {
+
+    assert(PyCapsule_CheckExact(bootstrap_capsule));
+    struct aws_server_bootstrap *bootstrap = PyCapsule_GetPointer(bootstrap_capsule, s_capsule_name_server_bootstrap);
+    assert(bootstrap);
+    aws_server_bootstrap_release(bootstrap);
+}
+
+PyObject *aws_py_io_server_bootstrap_new(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
+
+    PyObject *elg_capsule = NULL;
+
+    if (!PyArg_ParseTuple(args, "O", &elg_capsule)) {
+        return NULL;
+    }
+
+    if (!elg_capsule || !PyCapsule_CheckExact(elg_capsule)) {
+        PyErr_SetNone(PyExc_ValueError);
+        return NULL;
+    }
+    struct aws_event_loop_group *elg = PyCapsule_GetPointer(elg_capsule, s_capsule_name_elg);
+    if (!elg) {
+        return NULL;
+    }
+
+    struct aws_server_bootstrap *bootstrap = aws_server_bootstrap_new(allocator, elg);
+    if (!bootstrap) {
+        PyErr_SetAwsLastError();
+        return NULL;
+    }
+
+    return PyCapsule_New(bootstrap, s_capsule_name_server_bootstrap, s_server_bootstrap_destructor);
+}
+
+void aws_py_socket_options_init(struct aws_socket_options *socket_options, PyObject *py_socket_options) {
+    AWS_ZERO_STRUCT(*socket_options);
+
+    PyObject *sock_domain = PyObject_GetAttrString(py_socket_options, "domain");
+    if (sock_domain) {
+        socket_options->domain = (enum aws_socket_domain)PyIntEnum_AsLong(sock_domain);
+    }
+
+    PyObject *sock_type = PyObject_GetAttrString(py_socket_options, "type");
+    if (sock_type) {
+        socket_options->type = (enum aws_socket_type)PyIntEnum_AsLong(sock_type);
+    }
+
+    PyObject *connect_timeout_ms = PyObject_GetAttrString(py_socket_options, "connect_timeout_ms");
+    if (connect_timeout_ms) {
+        socket_options->connect_timeout_ms = (uint32_t)PyLong_AsLong(connect_timeout_ms);
+    }
+
+    PyObject *keep_alive = PyObject_GetAttrString(py_socket_options, "keep_alive");
+    if (keep_alive) {
+        socket_options->keepalive = (bool)PyObject_IsTrue(keep_alive);
+    }
+
+    PyObject *keep_alive_interval = PyObject_GetAttrString(py_socket_options, "keep_alive_interval_secs");
+    if (keep_alive_interval) {
+        socket_options->keep_alive_interval_sec = (uint16_t)PyLong_AsLong(keep_alive_interval);
+    }
+
+    PyObject *keep_alive_timeout = PyObject_GetAttrString(py_socket_options, "keep_alive_timeout_secs");
+    if (keep_alive_timeout) {
+        socket_options->keep_alive_timeout_sec = (uint16_t)PyLong_AsLong(keep_alive_timeout);
+    }
+
+    PyObject *keep_alive_max_probes = PyObject_GetAttrString(py_socket_options, "keep_alive_max_probes");
+    if (keep_alive_max_probes) {
+        socket_options->keep_alive_max_failed_probes = (uint16_t)PyLong_AsLong(keep_alive_max_probes);
+    }
+}
+
 static void s_tls_ctx_destructor(PyObject *tls_ctx_capsule) {
 
     assert(PyCapsule_CheckExact(tls_ctx_capsule));
@@ -164,7 +568,7 @@ static void s_tls_ctx_destructor(PyObject *tls_ctx_capsule) {
 PyObject *aws_py_io_client_tls_ctx_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
 
     int min_tls_version = AWS_IO_TLS_VER_SYS_DEFAULTS;
     const char *ca_path = NULL;
@@ -238,9 +642,58 @@ PyObject *aws_py_io_client_tls_ctx_new(PyObject *self, PyObject *args) {
     return PyCapsule_New(tls_ctx, s_capsule_name_tls_ctx, s_tls_ctx_destructor);
 }
 
+PyObject *aws_py_io_server_tls_ctx_new(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
+
+    int min_tls_version = AWS_IO_TLS_VER_SYS_DEFAULTS;
+    const char *certificate_buffer = NULL;
+    Py_ssize_t certificate_buffer_len = 0;
+    const char *private_key_buffer = NULL;
+    Py_ssize_t private_key_buffer_len = 0;
+    const char *alpn_list = NULL;
+
+    if (!PyArg_ParseTuple(
+            args,
+            "bs#s#z",
+            &min_tls_version,
+            &certificate_buffer,
+            &certificate_buffer_len,
+            &private_key_buffer,
+            &private_key_buffer_len,
+            &alpn_list)) {
+        return NULL;
+    }
+
+    struct aws_tls_ctx_options ctx_options;
+    AWS_ZERO_STRUCT(ctx_options);
+    struct aws_byte_cursor cert = aws_byte_cursor_from_array(certificate_buffer, certificate_buffer_len);
+    struct aws_byte_cursor key = aws_byte_cursor_from_array(private_key_buffer, private_key_buffer_len);
+    if (aws_tls_ctx_options_init_default_server(&ctx_options, allocator, &cert, &key)) {
+        return PyErr_AwsLastError();
+    }
+
+    ctx_options.minimum_tls_version = min_tls_version;
+    ctx_options.verify_peer = false;
+
+    if (alpn_list) {
+        aws_tls_ctx_options_set_alpn_list(&ctx_options, alpn_list);
+    }
+
+    struct aws_tls_ctx *tls_ctx = aws_tls_server_ctx_new(allocator, &ctx_options);
+    aws_tls_ctx_options_clean_up(&ctx_options);
+
+    if (!tls_ctx) {
+        return PyErr_AwsLastError();
+    }
+
+    return PyCapsule_New(tls_ctx, s_capsule_name_tls_ctx, s_tls_ctx_destructor);
+}
+
 static void s_tls_connection_options_destructor(PyObject *tls_connection_options_capsule) {
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
     assert(PyCapsule_CheckExact(tls_connection_options_capsule));
 
     struct aws_tls_connection_options *tls_connection_options =
@@ -254,7 +707,7 @@ static void s_tls_connection_options_destructor(PyObject *tls_connection_options
 PyObject *aws_py_io_tls_connections_options_new_from_ctx(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
     struct aws_tls_connection_options *conn_options = NULL;
 
     PyObject *tls_ctx_capsule = NULL;
@@ -283,7 +736,7 @@ error:
 PyObject *aws_py_io_tls_connection_options_set_alpn_list(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
     PyObject *tls_conn_options_capsule = NULL;
     const char *alpn_list = NULL;
     Py_ssize_t alpn_list_len = 0;
@@ -311,7 +764,7 @@ PyObject *aws_py_io_tls_connection_options_set_alpn_list(PyObject *self, PyObjec
 PyObject *aws_py_io_tls_connection_options_set_server_name(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO);
     PyObject *tls_conn_options_capsule = NULL;
     const char *server_name = NULL;
     Py_ssize_t server_name_len = 0;
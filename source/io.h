@@ -21,11 +21,18 @@
 
 #include "module.h"
 
+struct aws_socket_options;
+
 /**
  * Name string for event_loop_group capsules.
  */
 extern const char *s_capsule_name_client_bootstrap;
 
+/**
+ * Name string for server_bootstrap capsules.
+ */
+extern const char *s_capsule_name_server_bootstrap;
+
 /**
  * Name string for tls_ctx capsules.
  */
@@ -41,11 +48,6 @@ extern const char *s_capsule_name_tls_conn_options;
  */
 extern const char *s_capsule_name_logger;
 
-/**
- * Returns a capsule for logging and starts the logging sub-system
- */
-PyObject *aws_py_io_init_logging(PyObject *self, PyObject *args);
-
 /**
  * Returns True if ALPN is available, False if it is not.
  */
@@ -56,21 +58,57 @@ PyObject *aws_py_is_alpn_available(PyObject *self, PyObject *args);
  */
 PyObject *aws_py_io_event_loop_group_new(PyObject *self, PyObject *args);
 
+/**
+ * Invokes a python callable, with no arguments, on one of the event_loop_group's threads after a delay in ms.
+ */
+PyObject *aws_py_io_event_loop_group_schedule(PyObject *self, PyObject *args);
+
 /**
  * Create a new default host_resolver to be managed by a Python Capsule.
  */
 PyObject *aws_py_io_host_resolver_new_default(PyObject *self, PyObject *args);
 
+/**
+ * Resolves a host name, from the resolver's cache if it can, then calls on_resolved(error_code, [address, ...]).
+ */
+PyObject *aws_py_io_host_resolver_resolve(PyObject *self, PyObject *args);
+
+/**
+ * Drops every address the resolver has cached.
+ */
+PyObject *aws_py_io_host_resolver_purge_cache(PyObject *self, PyObject *args);
+
+/**
+ * Returns the resolver's (cache hits, cache misses, dns queries) counters. Hits and misses only count successful
+ * resolves, and are told apart by whether the answer came back on the calling thread.
+ */
+PyObject *aws_py_io_host_resolver_get_stats(PyObject *self, PyObject *args);
+
 /**
  * Create a new client_bootstrap to be managed by a Python Capsule.
  */
 PyObject *aws_py_io_client_bootstrap_new(PyObject *self, PyObject *args);
 
+/**
+ * Create a new server_bootstrap to be managed by a Python Capsule.
+ */
+PyObject *aws_py_io_server_bootstrap_new(PyObject *self, PyObject *args);
+
+/**
+ * Fill in socket_options from an awscrt.io.SocketOptions. GIL must be held.
+ */
+void aws_py_socket_options_init(struct aws_socket_options *socket_options, PyObject *py_socket_options);
+
 /**
  * Create a new tls_ctx to be managed by a Python Capsule.
  */
 PyObject *aws_py_io_client_tls_ctx_new(PyObject *self, PyObject *args);
 
+/**
+ * Create a new server tls_ctx, from a PEM certificate and private key, to be managed by a Python Capsule.
+ */
+PyObject *aws_py_io_server_tls_ctx_new(PyObject *self, PyObject *args);
+
 PyObject *aws_py_io_tls_connections_options_new_from_ctx(PyObject *self, PyObject *args);
 
 PyObject *aws_py_io_tls_connection_options_set_alpn_list(PyObject *self, PyObject *args);
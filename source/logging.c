@@ -0,0 +1,488 @@
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "logging.h"
+#include "allocator.h"
+
+#include <aws/common/atomics.h>
+#include <aws/common/clock.h>
+#include <aws/common/logging.h>
+#include <aws/common/thread.h>
+
+#include <errno.h>
+#include <stdarg.h>
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+static struct aws_logger s_logger;
+static bool s_logger_init = false;
+
+PyObject *aws_py_io_init_logging(PyObject *self, PyObject *args) {
+    (void)self;
+
+    if (s_logger_init) {
+        Py_RETURN_NONE;
+    }
+
+    s_logger_init = true;
+
+    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+
+    int log_level = 0;
+    const char *file_path = NULL;
+    Py_ssize_t file_path_len = 0;
+
+    if (!PyArg_ParseTuple(args, "bs#", &log_level, &file_path, &file_path_len)) {
+        PyErr_SetNone(PyExc_ValueError);
+        return NULL;
+    }
+
+    struct aws_logger_standard_options log_options = {
+        .level = log_level,
+        .file = NULL,
+        .filename = NULL,
+    };
+
+    Py_ssize_t stdout_len = (Py_ssize_t)strlen("stdout");
+
+    Py_ssize_t cmp_len = file_path_len > stdout_len ? stdout_len : file_path_len;
+
+    if (!memcmp("stdout", file_path, (size_t)cmp_len)) {
+        log_options.file = stdout;
+    } else if (!memcmp("stderr", file_path, (size_t)cmp_len)) {
+        log_options.file = stderr;
+    } else {
+        log_options.filename = file_path;
+    }
+
+    aws_logger_init_standard(&s_logger, allocator, &log_options);
+    aws_logger_set(&s_logger);
+
+    Py_RETURN_NONE;
+}
+
+/*******************************************************************************
+ * Background logger
+ ******************************************************************************/
+
+/* Longer messages are truncated, so that logging never allocates */
+#define PY_LOG_MESSAGE_MAX 1024
+
+/* How long the writer thread sleeps when it finds the queue empty. Polling keeps locks off the logging threads. */
+static const uint64_t s_writer_idle_ns = 10 * 1000 * 1000;
+
+struct py_log_record {
+    /* position the slot is free to be written at, or that plus one once it holds a record for the writer to read */
+    struct aws_atomic_var sequence;
+    enum aws_log_level level;
+    aws_log_subject_t subject;
+    uint64_t thread_id;
+    uint64_t timestamp_ns;
+    size_t message_len;
+    char message[PY_LOG_MESSAGE_MAX];
+};
+
+struct py_background_logger {
+    struct aws_allocator *allocator;
+    enum aws_log_level level;
+
+    /* bounded multi-producer queue, the writer thread is its only consumer */
+    struct py_log_record *records;
+    size_t capacity; /* power of 2 */
+    struct aws_atomic_var write_pos;
+    size_t read_pos; /* writer thread only */
+    size_t batch_size;
+
+    /* where records go, exactly one of these is set */
+    FILE *file;
+    bool close_file;
+    PyObject *on_batch;
+
+    struct aws_thread thread;
+    bool thread_running; /* only touched under the GIL */
+    struct aws_atomic_var stopping;
+
+    struct aws_atomic_var written;
+    struct aws_atomic_var dropped;
+};
+
+static int s_background_log(
+    struct aws_logger *logger,
+    enum aws_log_level log_level,
+    aws_log_subject_t subject,
+    const char *format,
+    ...) {
+
+    struct py_background_logger *impl = logger->p_impl;
+
+    if (aws_atomic_load_int(&impl->stopping)) {
+        aws_atomic_fetch_add(&impl->dropped, 1);
+        return AWS_OP_SUCCESS;
+    }
+
+    size_t pos = aws_atomic_load_int(&impl->write_pos);
+    struct py_log_record *record = NULL;
+    while (true) {
+        record = &impl->records[pos & (impl->capacity - 1)];
+        size_t sequence = aws_atomic_load_int(&record->sequence);
+        if (sequence == pos) {
+            if (aws_atomic_compare_exchange_int(&impl->write_pos, &pos, pos + 1)) {
+                break;
+            }
+            /* another thread claimed the slot, pos now holds the current write position */
+        } else if ((ptrdiff_t)(sequence - pos) < 0) {
+            /* the writer hasn't read this slot's last record yet, the queue is full */
+            aws_atomic_fetch_add(&impl->dropped, 1);
+            return AWS_OP_SUCCESS;
+        } else {
+            pos = aws_atomic_load_int(&impl->write_pos);
+        }
+    }
+
+    record->level = log_level;
+    record->subject = subject;
+    record->thread_id = aws_thread_current_thread_id();
+    record->timestamp_ns = 0;
+    aws_sys_clock_get_ticks(&record->timestamp_ns);
+
+    va_list format_args;
+    va_start(format_args, format);
+    int message_len = vsnprintf(record->message, sizeof(record->message), format, format_args);
+    va_end(format_args);
+    if (message_len < 0) {
+        message_len = 0;
+    } else if ((size_t)message_len >= sizeof(record->message)) {
+        message_len = sizeof(record->message) - 1;
+    }
+    record->message_len = (size_t)message_len;
+
+    aws_atomic_store_int(&record->sequence, pos + 1);
+    return AWS_OP_SUCCESS;
+}
+
+static enum aws_log_level s_background_get_log_level(struct aws_logger *logger, aws_log_subject_t subject) {
+    (void)subject;
+
+    struct py_background_logger *impl = logger->p_impl;
+    return impl->level;
+}
+
+/* Returns the next record for the writer thread, or NULL if there is none yet */
+static struct py_log_record *s_peek_record(struct py_background_logger *impl) {
+    struct py_log_record *record = &impl->records[impl->read_pos & (impl->capacity - 1)];
+    if (aws_atomic_load_int(&record->sequence) != impl->read_pos + 1) {
+        return NULL;
+    }
+    return record;
+}
+
+/* Hands the record's slot back to the logging threads */
+static void s_pop_record(struct py_background_logger *impl, struct py_log_record *record) {
+    aws_atomic_store_int(&record->sequence, impl->read_pos + impl->capacity);
+    impl->read_pos++;
+}
+
+static const char *s_subject_name(aws_log_subject_t subject) {
+    const char *name = aws_log_subject_name(subject);
+    return name ? name : "unknown";
+}
+
+static size_t s_write_batch_to_file(struct py_background_logger *impl) {
+    size_t count = 0;
+    struct py_log_record *record = NULL;
+    while (count < impl->batch_size && (record = s_peek_record(impl))) {
+        const char *level_name = NULL;
+        if (aws_log_level_to_string(record->level, &level_name)) {
+            level_name = "UNKNOWN";
+        }
+
+        time_t secs = (time_t)(record->timestamp_ns / 1000000000);
+        struct tm utc;
+        char date[32] = "";
+#ifdef _WIN32
+        gmtime_s(&utc, &secs);
+#else
+        gmtime_r(&secs, &utc);
+#endif
+        strftime(date, sizeof(date), "%Y-%m-%dT%H:%M:%S", &utc);
+
+        /* same layout as the CRT's standard logger */
+        fprintf(
+            impl->file,
+            "[%s] [%s.%03dZ] [%llu] [%s] - %.*s\n",
+            level_name,
+            date,
+            (int)(record->timestamp_ns / 1000000 % 1000),
+            (unsigned long long)record->thread_id,
+            s_subject_name(record->subject),
+            (int)record->message_len,
+            record->message);
+
+        s_pop_record(impl, record);
+        count++;
+    }
+
+    if (count) {
+        fflush(impl->file);
+    }
+    return count;
+}
+
+static size_t s_write_batch_to_python(struct py_background_logger *impl) {
+    if (!s_peek_record(impl)) {
+        return 0;
+    }
+
+    PyGILState_STATE state = PyGILState_Ensure();
+
+    size_t count = 0;
+    PyObject *batch = PyList_New(0);
+    struct py_log_record *record = NULL;
+    while (batch && count < impl->batch_size && (record = s_peek_record(impl))) {
+        PyObject *entry = Py_BuildValue(
+            "(isKdN)",
+            (int)record->level,
+            s_subject_name(record->subject),
+            (unsigned long long)record->thread_id,
+            (double)record->timestamp_ns / 1e9,
+            /* truncation can split a multi-byte character */
+            PyUnicode_DecodeUTF8(record->message, (Py_ssize_t)record->message_len, "replace"));
+
+        s_pop_record(impl, record);
+        count++;
+
+        if (!entry || PyList_Append(batch, entry)) {
+            Py_XDECREF(entry);
+            Py_CLEAR(batch);
+            break;
+        }
+        Py_DECREF(entry);
+    }
+
+    PyObject *result = NULL;
+    if (batch) {
+        result = PyObject_CallFunction(impl->on_batch, "(O)", batch);
+    }
+    if (!result) {
+        PyErr_WriteUnraisable(PyErr_Occurred());
+    }
+    Py_XDECREF(result);
+    Py_XDECREF(batch);
+
+    PyGILState_Release(state);
+    return count;
+}
+
+static void s_writer_thread(void *arg) {
+    struct py_background_logger *impl = arg;
+
+    while (true) {
+        /* read before draining, so that everything logged before shutdown is written */
+        bool stopping = aws_atomic_load_int(&impl->stopping) != 0;
+
+        size_t count = impl->on_batch ? s_write_batch_to_python(impl) : s_write_batch_to_file(impl);
+        aws_atomic_fetch_add(&impl->written, count);
+
+        if (count == 0) {
+            if (stopping) {
+                break;
+            }
+            aws_thread_current_sleep(s_writer_idle_ns);
+        }
+    }
+}
+
+/* Must be called with the GIL held */
+static void s_background_logger_stop(struct py_background_logger *impl) {
+    if (!impl->thread_running) {
+        return;
+    }
+    impl->thread_running = false;
+
+    aws_atomic_store_int(&impl->stopping, 1);
+
+    /* the writer needs the GIL to drain to python */
+    Py_BEGIN_ALLOW_THREADS
+    aws_thread_join(&impl->thread);
+    Py_END_ALLOW_THREADS
+
+    aws_thread_clean_up(&impl->thread);
+}
+
+static void s_background_logger_destroy(struct py_background_logger *impl) {
+    if (impl->close_file) {
+        fclose(impl->file);
+    }
+    Py_XDECREF(impl->on_batch);
+    aws_mem_release(impl->allocator, impl->records);
+    aws_mem_release(impl->allocator, impl);
+}
+
+static void s_background_clean_up(struct aws_logger *logger) {
+    struct py_background_logger *impl = logger->p_impl;
+
+    s_background_logger_stop(impl);
+    s_background_logger_destroy(impl);
+}
+
+static struct aws_logger_vtable s_background_vtable = {
+    .log = s_background_log,
+    .get_log_level = s_background_get_log_level,
+    .clean_up = s_background_clean_up,
+};
+
+PyObject *aws_py_io_init_background_logging(PyObject *self, PyObject *args) {
+    (void)self;
+
+    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+
+    int log_level = 0;
+    const char *file_path = NULL;
+    PyObject *on_batch = NULL;
+    Py_ssize_t queue_size = 0;
+    Py_ssize_t batch_size = 0;
+    if (!PyArg_ParseTuple(args, "izOnn", &log_level, &file_path, &on_batch, &queue_size, &batch_size)) {
+        return NULL;
+    }
+    if (on_batch == Py_None) {
+        on_batch = NULL;
+    }
+    if (!file_path == !on_batch) {
+        PyErr_SetString(PyExc_ValueError, "exactly one of file_path and on_batch must be given");
+        return NULL;
+    }
+    if (queue_size <= 0 || batch_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "queue_size and batch_size must be positive");
+        return NULL;
+    }
+
+    if (s_logger_init) {
+        Py_RETURN_NONE;
+    }
+
+    struct py_background_logger *impl = aws_mem_calloc(allocator, 1, sizeof(struct py_background_logger));
+    if (!impl) {
+        return PyErr_AwsLastError();
+    }
+    impl->allocator = allocator;
+    impl->level = (enum aws_log_level)log_level;
+    impl->batch_size = (size_t)batch_size;
+
+    impl->capacity = 1;
+    while (impl->capacity < (size_t)queue_size) {
+        impl->capacity <<= 1;
+    }
+    impl->records = aws_mem_calloc(allocator, impl->capacity, sizeof(struct py_log_record));
+    if (!impl->records) {
+        aws_mem_release(allocator, impl);
+        return PyErr_AwsLastError();
+    }
+    for (size_t i = 0; i < impl->capacity; ++i) {
+        aws_atomic_init_int(&impl->records[i].sequence, i);
+    }
+    aws_atomic_init_int(&impl->write_pos, 0);
+    aws_atomic_init_int(&impl->stopping, 0);
+    aws_atomic_init_int(&impl->written, 0);
+    aws_atomic_init_int(&impl->dropped, 0);
+
+    if (on_batch) {
+        Py_INCREF(on_batch);
+        impl->on_batch = on_batch;
+    } else if (strcmp(file_path, "stdout") == 0) {
+        impl->file = stdout;
+    } else if (strcmp(file_path, "stderr") == 0) {
+        impl->file = stderr;
+    } else {
+        impl->file = fopen(file_path, "a");
+        if (!impl->file) {
+            PyErr_SetFromErrnoWithFilename(PyExc_IOError, file_path);
+            s_background_logger_destroy(impl);
+            return NULL;
+        }
+        impl->close_file = true;
+    }
+
+    if (aws_thread_init(&impl->thread, allocator) ||
+        aws_thread_launch(&impl->thread, s_writer_thread, impl, NULL)) {
+        PyErr_SetAwsLastError();
+        aws_thread_clean_up(&impl->thread);
+        s_background_logger_destroy(impl);
+        return NULL;
+    }
+    impl->thread_running = true;
+
+    s_logger.vtable = &s_background_vtable;
+    s_logger.allocator = allocator;
+    s_logger.p_impl = impl;
+    aws_logger_set(&s_logger);
+    s_logger_init = true;
+
+    Py_RETURN_NONE;
+}
+
+static struct py_background_logger *s_get_background_logger(void) {
+    if (!s_logger_init || s_logger.vtable != &s_background_vtable) {
+        return NULL;
+    }
+    return s_logger.p_impl;
+}
+
+PyObject *aws_py_io_shutdown_background_logging(PyObject *self, PyObject *args) {
+    (void)self;
+    (void)args;
+
+    struct py_background_logger *impl = s_get_background_logger();
+    if (impl) {
+        /* the queue stays allocated, other threads may be logging into it until the module is unloaded */
+        s_background_logger_stop(impl);
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyObject *aws_py_io_get_logging_stats(PyObject *self, PyObject *args) {
+    (void)self;
+    (void)args;
+
+    struct py_background_logger *impl = s_get_background_logger();
+    if (!impl) {
+        return Py_BuildValue("(KK)", 0ULL, 0ULL);
+    }
+
+    return Py_BuildValue(
+        "(KK)",
+        (unsigned long long)aws_atomic_load_int(&impl->written),
+        (unsigned long long)aws_atomic_load_int(&impl->dropped));
+}
+
+void aws_py_logging_clean_up(void) {
+    struct py_background_logger *impl = s_get_background_logger();
+    if (impl) {
+        /* Event-loop threads may still be logging, or about to, with the logger they already looked up. Only the
+         * writer is stopped: from then on records are dropped without touching the file or python, and the queue is
+         * deliberately leaked so that those late calls never see freed memory. */
+        s_background_logger_stop(impl);
+        if (impl->close_file) {
+            fclose(impl->file);
+            impl->close_file = false;
+        }
+        return;
+    }
+
+    if (s_logger_init) {
+        aws_logger_set(NULL);
+        aws_logger_clean_up(&s_logger);
+    }
+}
@@ -0,0 +1,48 @@
+#ifndef AWS_CRT_PYTHON_LOGGING_H
+#define AWS_CRT_PYTHON_LOGGING_H
+/*
+ * Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+#include "module.h"
+
+/**
+ * Starts the logging sub-system with the CRT's standard logger, writing to stdout, stderr or a file.
+ * Only the first call to this or aws_py_io_init_background_logging() installs a logger.
+ */
+PyObject *aws_py_io_init_logging(PyObject *self, PyObject *args);
+
+/**
+ * Starts the logging sub-system with a logger that never blocks the thread logging: records go into a fixed size
+ * lock-free queue, and are dropped and counted when it is full. A dedicated thread drains the queue, either to
+ * stdout, stderr or a file, or in batches to a python callable.
+ */
+PyObject *aws_py_io_init_background_logging(PyObject *self, PyObject *args);
+
+/**
+ * Stops the background logger's thread once it has drained the queue. Records logged afterwards are dropped.
+ */
+PyObject *aws_py_io_shutdown_background_logging(PyObject *self, PyObject *args);
+
+/**
+ * Returns the background logger's (records written, records dropped) counters.
+ */
+PyObject *aws_py_io_get_logging_stats(PyObject *self, PyObject *args);
+
+/**
+ * Cleans up whichever logger was installed, at module unload. The background logger's writer thread is stopped but
+ * its queue is never freed, since other threads may still be logging into it.
+ */
+void aws_py_logging_clean_up(void);
+
+#endif /* AWS_CRT_PYTHON_LOGGING_H */
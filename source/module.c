@@ -13,9 +13,14 @@
  * permissions and limitations under the License.
  */
 #include "module.h"
+#include "allocator.h"
 #include "crypto.h"
 #include "http_client_connection.h"
+#include "http_content_encoding.h"
+#include "http_headers.h"
+#include "http_server.h"
 #include "io.h"
+#include "logging.h"
 #include "mqtt_client.h"
 #include "mqtt_client_connection.h"
 
@@ -29,53 +34,6 @@
 
 #include <memoryobject.h>
 
-static struct aws_logger s_logger;
-static bool s_logger_init = false;
-
-PyObject *aws_py_io_init_logging(PyObject *self, PyObject *args) {
-    (void)self;
-
-    if (s_logger_init) {
-        Py_RETURN_NONE;
-    }
-
-    s_logger_init = true;
-
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
-
-    int log_level = 0;
-    const char *file_path = NULL;
-    Py_ssize_t file_path_len = 0;
-
-    if (!PyArg_ParseTuple(args, "bs#", &log_level, &file_path, &file_path_len)) {
-        PyErr_SetNone(PyExc_ValueError);
-        return NULL;
-    }
-
-    struct aws_logger_standard_options log_options = {
-        .level = log_level,
-        .file = NULL,
-        .filename = NULL,
-    };
-
-    Py_ssize_t stdout_len = (Py_ssize_t)strlen("stdout");
-
-    Py_ssize_t cmp_len = file_path_len > stdout_len ? stdout_len : file_path_len;
-
-    if (!memcmp("stdout", file_path, (size_t)cmp_len)) {
-        log_options.file = stdout;
-    } else if (!memcmp("stderr", file_path, (size_t)cmp_len)) {
-        log_options.file = stderr;
-    } else {
-        log_options.filename = file_path;
-    }
-
-    aws_logger_init_standard(&s_logger, allocator, &log_options);
-    aws_logger_set(&s_logger);
-
-    Py_RETURN_NONE;
-}
-
 #if PY_MAJOR_VERSION == 3
 #    define INIT_FN PyInit__aws_crt_python
 #    define UNICODE_GET_BYTES_FN PyUnicode_DATA
@@ -123,6 +81,17 @@ PyObject *PyErr_AwsLastError(void) {
     return PyErr_Format(PyExc_RuntimeError, "%d: %s", err, msg);
 }
 
+PyObject *aws_py_get_error_name(PyObject *self, PyObject *args) {
+    (void)self;
+
+    int error_code = 0;
+    if (!PyArg_ParseTuple(args, "i", &error_code)) {
+        return NULL;
+    }
+
+    return PyString_FromString(aws_error_name(error_code));
+}
+
 PyObject *aws_py_memory_view_from_byte_buffer(struct aws_byte_buf *buf, int flags) {
 #if PY_MAJOR_VERSION == 3
     return PyMemoryView_FromMemory((char *)(buf->buffer + buf->len), (Py_ssize_t)(buf->capacity - buf->len), flags);
@@ -139,12 +108,38 @@ PyObject *aws_py_memory_view_from_byte_buffer(struct aws_byte_buf *buf, int flag
 #endif /* PY_MAJOR_VERSION */
 }
 
+PyObject *aws_py_memory_view_from_byte_cursor(const struct aws_byte_cursor *cursor) {
+    /* The view can't point at the cursor's memory: release() fails while python code is exporting the view's
+     * buffer, slices of the view survive its release, and python 2 can't release a view at all. So it gets a copy
+     * of its own, which lives as long as anything in python refers to it. */
+    PyObject *copy = PyBytes_FromStringAndSize((const char *)cursor->ptr, (Py_ssize_t)cursor->len);
+    if (!copy) {
+        return NULL;
+    }
+
+    PyObject *memory_view = PyMemoryView_FromObject(copy);
+    Py_DECREF(copy);
+    return memory_view;
+}
+
+void aws_py_memory_view_release(PyObject *memory_view) {
+#if PY_MAJOR_VERSION == 3
+    /* If python code is still exporting the view's buffer this fails, which is fine as the view owns its memory */
+    PyObject *result = PyObject_CallMethod(memory_view, "release", NULL);
+    if (!result) {
+        PyErr_Clear();
+    }
+    Py_XDECREF(result);
+#endif /* PY_MAJOR_VERSION */
+    Py_DECREF(memory_view);
+}
+
 /*******************************************************************************
  * Allocator
  ******************************************************************************/
 
 struct aws_allocator *aws_crt_python_get_allocator(void) {
-    return aws_default_allocator();
+    return aws_py_get_allocator(AWS_PY_SUBSYSTEM_COMMON);
 }
 
 /*******************************************************************************
@@ -152,12 +147,22 @@ struct aws_allocator *aws_crt_python_get_allocator(void) {
  ******************************************************************************/
 
 static PyMethodDef s_module_methods[] = {
+    {"aws_py_allocator_get_mode", aws_py_allocator_get_mode, METH_NOARGS, NULL},
+    {"aws_py_allocator_get_stats", aws_py_allocator_get_stats, METH_NOARGS, NULL},
+    {"aws_py_get_error_name", aws_py_get_error_name, METH_VARARGS, NULL},
+
     /* IO */
     {"aws_py_is_alpn_available", aws_py_is_alpn_available, METH_NOARGS, NULL},
     {"aws_py_io_event_loop_group_new", aws_py_io_event_loop_group_new, METH_VARARGS, NULL},
+    {"aws_py_io_event_loop_group_schedule", aws_py_io_event_loop_group_schedule, METH_VARARGS, NULL},
     {"aws_py_io_host_resolver_new_default", aws_py_io_host_resolver_new_default, METH_VARARGS, NULL},
+    {"aws_py_io_host_resolver_resolve", aws_py_io_host_resolver_resolve, METH_VARARGS, NULL},
+    {"aws_py_io_host_resolver_purge_cache", aws_py_io_host_resolver_purge_cache, METH_VARARGS, NULL},
+    {"aws_py_io_host_resolver_get_stats", aws_py_io_host_resolver_get_stats, METH_VARARGS, NULL},
     {"aws_py_io_client_bootstrap_new", aws_py_io_client_bootstrap_new, METH_VARARGS, NULL},
+    {"aws_py_io_server_bootstrap_new", aws_py_io_server_bootstrap_new, METH_VARARGS, NULL},
     {"aws_py_io_client_tls_ctx_new", aws_py_io_client_tls_ctx_new, METH_VARARGS, NULL},
+    {"aws_py_io_server_tls_ctx_new", aws_py_io_server_tls_ctx_new, METH_VARARGS, NULL},
     {"aws_py_io_tls_connections_options_new_from_ctx",
      aws_py_io_tls_connections_options_new_from_ctx,
      METH_VARARGS,
@@ -171,6 +176,9 @@ static PyMethodDef s_module_methods[] = {
      METH_VARARGS,
      NULL},
     {"aws_py_io_init_logging", aws_py_io_init_logging, METH_VARARGS, NULL},
+    {"aws_py_io_init_background_logging", aws_py_io_init_background_logging, METH_VARARGS, NULL},
+    {"aws_py_io_shutdown_background_logging", aws_py_io_shutdown_background_logging, METH_NOARGS, NULL},
+    {"aws_py_io_get_logging_stats", aws_py_io_get_logging_stats, METH_NOARGS, NULL},
 
     /* MQTT Client */
     {"aws_py_mqtt_client_new", aws_py_mqtt_client_new, METH_VARARGS, NULL},
@@ -198,7 +206,23 @@ static PyMethodDef s_module_methods[] = {
     {"aws_py_http_client_connection_create", aws_py_http_client_connection_create, METH_VARARGS, NULL},
     {"aws_py_http_client_connection_close", aws_py_http_client_connection_close, METH_VARARGS, NULL},
     {"aws_py_http_client_connection_is_open", aws_py_http_client_connection_is_open, METH_VARARGS, NULL},
+    {"aws_py_http_client_connection_get_version", aws_py_http_client_connection_get_version, METH_VARARGS, NULL},
+    {"aws_py_http_client_connection_get_metrics", aws_py_http_client_connection_get_metrics, METH_VARARGS, NULL},
     {"aws_py_http_client_connection_make_request", aws_py_http_client_connection_make_request, METH_VARARGS, NULL},
+    {"aws_py_http_client_connection_make_requests", aws_py_http_client_connection_make_requests, METH_VARARGS, NULL},
+    {"aws_py_http_completion_queue_new", aws_py_http_completion_queue_new, METH_VARARGS, NULL},
+    {"aws_py_http_completion_queue_get", aws_py_http_completion_queue_get, METH_VARARGS, NULL},
+    {"aws_py_http_client_stream_update_window", aws_py_http_client_stream_update_window, METH_VARARGS, NULL},
+    {"aws_py_http_client_stream_read", aws_py_http_client_stream_read, METH_VARARGS, NULL},
+    {"aws_py_http_client_stream_get_metrics", aws_py_http_client_stream_get_metrics, METH_VARARGS, NULL},
+    {"aws_py_http_is_content_encoding_available", aws_py_http_is_content_encoding_available, METH_NOARGS, NULL},
+    {"aws_py_http_server_create", aws_py_http_server_create, METH_VARARGS, NULL},
+    {"aws_py_http_server_close", aws_py_http_server_close, METH_VARARGS, NULL},
+    {"aws_py_http_server_get_request_count", aws_py_http_server_get_request_count, METH_VARARGS, NULL},
+    {"aws_py_http_headers_new_from_dict", aws_py_http_headers_new_from_dict, METH_VARARGS, NULL},
+    {"aws_py_http_headers_len", aws_py_http_headers_len, METH_VARARGS, NULL},
+    {"aws_py_http_headers_get_index", aws_py_http_headers_get_index, METH_VARARGS, NULL},
+    {"aws_py_http_headers_get_values", aws_py_http_headers_get_values, METH_VARARGS, NULL},
 
     {NULL, NULL, 0, NULL},
 };
@@ -216,9 +240,7 @@ static void s_module_free(void *userdata) {
 
     aws_tls_clean_up_static_state();
 
-    if (s_logger_init) {
-        aws_logger_clean_up(&s_logger);
-    }
+    aws_py_logging_clean_up();
     aws_mqtt_library_clean_up();
 }
 
@@ -244,13 +266,16 @@ PyMODINIT_FUNC INIT_FN(void) {
     (void)m;
 #endif /* PY_MAJOR_VERSION */
 
+    /* before anything is allocated, the mode can't change once memory has been handed out */
+    aws_py_allocator_init();
+
     aws_load_error_strings();
     aws_io_load_error_strings();
 
     aws_io_load_log_subject_strings();
-    aws_tls_init_static_state(aws_crt_python_get_allocator());
-    aws_http_library_init(aws_crt_python_get_allocator());
-    aws_mqtt_library_init(aws_crt_python_get_allocator());
+    aws_tls_init_static_state(aws_py_get_allocator(AWS_PY_SUBSYSTEM_IO));
+    aws_http_library_init(aws_py_get_allocator(AWS_PY_SUBSYSTEM_HTTP));
+    aws_mqtt_library_init(aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT));
 
     if (!PyEval_ThreadsInitialized()) {
         PyEval_InitThreads();
@@ -25,9 +25,11 @@
 #include <aws/common/common.h>
 
 struct aws_byte_buf;
+struct aws_byte_cursor;
 
 #if PY_MAJOR_VERSION >= 3
 #    define PyString_FromStringAndSize PyUnicode_FromStringAndSize
+#    define PyString_FromString PyUnicode_FromString
 #    define BYTE_BUF_FORMAT_STR "y#"
 #else
 #    define BYTE_BUF_FORMAT_STR "s#"
@@ -42,6 +44,9 @@ long PyIntEnum_AsLong(PyObject *int_enum_obj);
 
 struct aws_byte_cursor aws_byte_cursor_from_pystring(PyObject *str);
 
+/* Returns the symbolic name, such as "AWS_IO_SOCKET_TIMEOUT", of a CRT error code */
+PyObject *aws_py_get_error_name(PyObject *self, PyObject *args);
+
 /* Set current thread's error indicator based on aws_last_error() */
 void PyErr_SetAwsLastError(void);
 
@@ -50,7 +55,14 @@ PyObject *PyErr_AwsLastError(void);
 
 PyObject *aws_py_memory_view_from_byte_buffer(struct aws_byte_buf *buf, int flags);
 
-/* Allocator that calls into PyObject_[Malloc|Free|Realloc] */
+/* Returns a read-only memoryview over a copy of the bytes in cursor, so it stays valid however long python keeps it. */
+PyObject *aws_py_memory_view_from_byte_cursor(const struct aws_byte_cursor *cursor);
+
+/* Releases a memoryview returned by aws_py_memory_view_from_byte_cursor(), invalidating it if nothing in python is
+ * still exporting its buffer, and releases the reference to it. */
+void aws_py_memory_view_release(PyObject *memory_view);
+
+/* Allocator for anything not attributed to a subsystem, see aws_py_get_allocator() in allocator.h */
 struct aws_allocator *aws_crt_python_get_allocator(void);
 
 #endif /* AWS_CRT_PYTHON_MODULE_H */
@@ -13,6 +13,7 @@
  * permissions and limitations under the License.
  */
 #include "mqtt_client.h"
+#include "allocator.h"
 
 #include "io.h"
 
@@ -38,7 +39,7 @@ static void s_mqtt_python_client_destructor(PyObject *client_capsule) {
 PyObject *aws_py_mqtt_client_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT);
 
     struct mqtt_python_client *py_client = NULL;
 
@@ -13,6 +13,7 @@
  * permissions and limitations under the License.
  */
 #include "mqtt_client_connection.h"
+#include "allocator.h"
 
 #include "io.h"
 #include "mqtt_client.h"
@@ -55,7 +56,7 @@ static void s_mqtt_python_connection_destructor_on_disconnect(
     struct aws_mqtt_client_connection *connection,
     void *userdata) {
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT);
     struct mqtt_python_connection *py_connection = userdata;
 
     Py_CLEAR(py_connection->on_connection_interrupted);
@@ -123,7 +124,7 @@ static void s_on_connection_resumed(
 PyObject *aws_py_mqtt_client_connection_new(PyObject *self, PyObject *args) {
     (void)self;
 
-    struct aws_allocator *allocator = aws_crt_python_get_allocator();
+    struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT);
 
     /* If anything goes wrong in this function: goto error */
     struct mqtt_python_connection *py_connection = NULL;
@@ -305,7 +306,7 @@ PyObject *aws_py_mqtt_client_connection_connect(PyObject *self, PyObject *args)
         }
 
         aws_tls_connection_options_init_from_ctx(&py_connection->tls_options, tls_ctx);
-        struct aws_allocator *allocator = aws_crt_python_get_allocator();
+        struct aws_allocator *allocator = aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT);
         struct aws_byte_cursor server_name_cur = aws_byte_cursor_from_c_str(server_name);
         aws_tls_connection_options_set_server_name(&py_connection->tls_options, allocator, &server_name_cur);
     }
@@ -487,7 +488,7 @@ static void s_publish_complete(
 
     PyGILState_Release(state);
 
-    aws_mem_release(aws_crt_python_get_allocator(), metadata);
+    aws_mem_release(aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT), metadata);
 }
 
 PyObject *aws_py_mqtt_client_connection_publish(PyObject *self, PyObject *args) {
@@ -530,7 +531,7 @@ PyObject *aws_py_mqtt_client_connection_publish(PyObject *self, PyObject *args)
     struct publish_complete_userdata *metadata = NULL;
 
     /* Heap allocate payload so that it may persist */
-    metadata = aws_mem_acquire(aws_crt_python_get_allocator(), sizeof(struct publish_complete_userdata));
+    metadata = aws_mem_acquire(aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT), sizeof(struct publish_complete_userdata));
     if (!metadata) {
         return PyErr_AwsLastError();
     }
@@ -554,7 +555,7 @@ PyObject *aws_py_mqtt_client_connection_publish(PyObject *self, PyObject *args)
 
     if (msg_id == 0) {
         Py_CLEAR(metadata->callback);
-        aws_mem_release(aws_crt_python_get_allocator(), metadata);
+        aws_mem_release(aws_py_get_allocator(AWS_PY_SUBSYSTEM_MQTT), metadata);
         return PyErr_AwsLastError();
     }
 
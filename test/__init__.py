@@ -0,0 +1,77 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import socket
+import unittest
+from awscrt import io, http
+
+# seconds to wait on anything that should finish quickly over loopback
+TIMEOUT = 10.0
+
+
+def free_port():
+    """
+    Returns a loopback port nothing is listening on, at least right now.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class HttpServerTestCase(unittest.TestCase):
+    """
+    Gives every test an event loop group, a client bootstrap and IPv4 socket options, and closes the loopback
+    HttpServers started with start_server() when it is done.
+    """
+
+    def setUp(self):
+        self.elg = io.EventLoopGroup(1)
+        self.bootstrap = io.ClientBootstrap(self.elg)
+        self.socket_options = io.SocketOptions()
+        self.socket_options.domain = io.SocketDomain.IPv4
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close().result(TIMEOUT)
+
+    def start_server(self, **kwargs):
+        """
+        Starts an HttpServer on a free loopback port with kwargs as its options, returns the port.
+        """
+        port = free_port()
+        self.servers.append(http.HttpServer(self.bootstrap, '127.0.0.1', port, self.socket_options, **kwargs))
+        return port
+
+    def connect(self, port, **kwargs):
+        """
+        Returns an open HttpClientConnection to the loopback port, kwargs go to new_connection().
+        """
+        return http.HttpClientConnection.new_connection(self.bootstrap, '127.0.0.1', port, self.socket_options,
+                                                        **kwargs).result(TIMEOUT)
+
+    def get(self, connection, path='/', headers=None, **kwargs):
+        """
+        Sends a GET and waits for it to complete, returns (request, body) where body is the response body as bytes
+        unless kwargs choose another way to receive it.
+        """
+        chunks = []
+        if 'on_incoming_body' not in kwargs:
+            kwargs['on_incoming_body'] = lambda chunk: chunks.append(bytes(chunk))
+        if headers is None:
+            headers = {'host': 'localhost'}
+        request = connection.make_request('GET', path, headers, None, **kwargs)
+        request.response_completed.result(TIMEOUT)
+        return request, b''.join(chunks)
@@ -0,0 +1,64 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import sys
+import tempfile
+import unittest
+from test import HttpServerTestCase, TIMEOUT
+
+BODY = b'outgoing' * 1000
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "awscrt.aio needs asyncio")
+class TestAioOutgoingBody(HttpServerTestCase):
+
+    def setUp(self):
+        super(TestAioOutgoingBody, self).setUp()
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def send(self, body):
+        """
+        Sends body with a PUT to a server that records what it receives, returns (request headers, request body).
+        """
+        import asyncio
+        from awscrt import aio
+        received = []
+
+        def on_incoming_request(request):
+            received.append((request.headers, bytes(request.body)))
+            return 200, None, b''
+
+        port = self.start_server(on_incoming_request=on_incoming_request)
+        connection = self.loop.run_until_complete(
+            aio.HttpClientConnection.new_connection(self.bootstrap, '127.0.0.1', port, self.socket_options,
+                                                    loop=self.loop))
+        request = connection.make_request('PUT', '/', {'host': 'localhost'}, body)
+        self.loop.run_until_complete(asyncio.wait_for(request.response_completed, TIMEOUT))
+        return received[0]
+
+    def test_bytes_body(self):
+        headers, body = self.send(BODY)
+        self.assertEqual(BODY, body)
+        self.assertEqual(str(len(BODY)), headers.get('content-length'))
+
+    def test_file_body(self):
+        with tempfile.TemporaryFile() as body_file:
+            body_file.write(BODY)
+            body_file.flush()
+            body_file.seek(0)
+            headers, body = self.send(body_file)
+        self.assertEqual(BODY, body)
+
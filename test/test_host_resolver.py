@@ -0,0 +1,67 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import unittest
+from awscrt import io
+from test import TIMEOUT
+
+# reserved by RFC 2606, never resolves
+BAD_HOST = 'no-such-host.invalid'
+
+
+class TestDefaultHostResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.elg = io.EventLoopGroup(1)
+        self.resolver = io.DefaultHostResolver(self.elg)
+
+    def resolve(self, host_name):
+        return self.resolver.resolve(host_name).result(TIMEOUT)
+
+    def test_resolve_localhost(self):
+        addresses = self.resolve('localhost')
+        self.assertTrue(set(addresses) & {'127.0.0.1', '::1'})
+
+    def test_resolve_failure(self):
+        with self.assertRaises(Exception):
+            self.resolve(BAD_HOST)
+        stats = self.resolver.stats()
+        self.assertEqual(0, stats.hits + stats.misses)
+
+    def test_prewarm_leaves_out_failed_hosts(self):
+        results = self.resolver.prewarm(['localhost', BAD_HOST]).result(TIMEOUT)
+        self.assertEqual(['localhost'], list(results.keys()))
+        self.assertEqual(sorted(self.resolve('localhost')), sorted(results['localhost']))
+
+    def test_prewarm_nothing(self):
+        self.assertEqual({}, self.resolver.prewarm([]).result(TIMEOUT))
+
+    def test_cached_resolve_is_a_hit(self):
+        self.resolve('localhost')
+        first = self.resolver.stats()
+        self.assertEqual(1, first.hits + first.misses)
+        self.assertGreaterEqual(first.dns_queries, 1)
+
+        self.resolve('localhost')
+        second = self.resolver.stats()
+        self.assertEqual(first.hits + 1, second.hits)
+        self.assertEqual(first.misses, second.misses)
+
+    def test_purge_cache_goes_back_to_dns(self):
+        self.resolve('localhost')
+        queries = self.resolver.stats().dns_queries
+
+        self.resolver.purge_cache()
+        self.resolve('localhost')
+        self.assertGreater(self.resolver.stats().dns_queries, queries)
@@ -0,0 +1,85 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import threading
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT
+
+PATHS = ['/item/{}'.format(i) for i in range(10)]
+
+
+def echo_path(request):
+    return 200, {'x-path': request.path_and_query}, request.path_and_query.encode('utf-8')
+
+
+class TestMakeRequests(HttpServerTestCase):
+
+    def setUp(self):
+        super(TestMakeRequests, self).setUp()
+        self.prepared = http.PreparedRequest('GET', {'host': 'localhost'})
+
+    def test_responses_come_back_in_request_order(self):
+        port = self.start_server(on_incoming_request=echo_path)
+        connections = [self.connect(port) for _ in range(3)]
+
+        responses = self.prepared.make_requests(connections, PATHS).result(TIMEOUT)
+        self.assertEqual(list(range(len(PATHS))), [response.tag for response in responses])
+        for path, response in zip(PATHS, responses):
+            self.assertEqual(0, response.error_code)
+            self.assertEqual(200, response.response_code)
+            self.assertEqual(path, response.headers.get('x-path'))
+            self.assertEqual(path.encode('utf-8'), response.body)
+
+    def test_failed_requests_keep_their_place(self):
+        port = self.start_server(on_incoming_request=echo_path)
+        shutdown = threading.Event()
+        closed = self.connect(port, on_connection_shutdown=lambda error_code: shutdown.set())
+        closed.close()
+        self.assertTrue(shutdown.wait(TIMEOUT))
+        connections = [self.connect(port), closed]
+
+        responses = self.prepared.make_requests(connections, PATHS).result(TIMEOUT)
+        self.assertEqual(len(PATHS), len(responses))
+        for i, (path, response) in enumerate(zip(PATHS, responses)):
+            self.assertEqual(i, response.tag)
+            if i % 2 == 0:
+                self.assertEqual(0, response.error_code)
+                self.assertEqual(path.encode('utf-8'), response.body)
+            else:
+                self.assertNotEqual(0, response.error_code)
+                self.assertIsNone(response.headers)
+
+    def test_completion_queue_collects_every_call(self):
+        port = self.start_server(on_incoming_request=echo_path)
+        connection = self.connect(port)
+        idle = threading.Event()
+        queue = http.HttpCompletionQueue(idle.set)
+
+        first_tag = self.prepared.make_requests(connection, PATHS[:4], completion_queue=queue)
+        second_tag = self.prepared.make_requests(connection, PATHS[4:], completion_queue=queue)
+        self.assertEqual(first_tag + 4, second_tag)
+
+        responses = []
+        while len(responses) < len(PATHS):
+            responses.extend(queue.get(timeout=TIMEOUT))
+        self.assertTrue(idle.wait(TIMEOUT))
+        self.assertEqual([], queue.get(timeout=0))
+        self.assertEqual(sorted(range(first_tag, first_tag + len(PATHS))),
+                         sorted(response.tag for response in responses))
+
+    def test_no_requests_gives_an_empty_result(self):
+        port = self.start_server(on_incoming_request=echo_path)
+        connection = self.connect(port)
+
+        self.assertEqual([], self.prepared.make_requests(connection, []).result(TIMEOUT))
@@ -0,0 +1,49 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+from test import HttpServerTestCase, TIMEOUT
+
+BODY = os.urandom(256 * 1024)
+CAPACITY = 16 * 1024
+
+
+class TestIncomingBodyStream(HttpServerTestCase):
+
+    def request(self, connection, **kwargs):
+        return connection.make_request('GET', '/', {'host': 'localhost'}, None, None,
+                                       incoming_body_stream_capacity=CAPACITY, **kwargs)
+
+    def test_body_is_read_through_a_bounded_buffer(self):
+        port = self.start_server(response_body=BODY)
+        connection = self.connect(port, initial_window_size=CAPACITY)
+
+        request = self.request(connection)
+        chunks = list(request.iter_body(4096))
+        self.assertEqual(BODY, b''.join(chunks))
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(0, request.response_completed.result(TIMEOUT))
+
+    def test_window_larger_than_capacity_is_rejected(self):
+        port = self.start_server(response_body=BODY)
+
+        with self.assertRaises(AssertionError):
+            self.request(self.connect(port, initial_window_size=CAPACITY * 2))
+        with self.assertRaises(AssertionError):
+            self.request(self.connect(port))
+
+    def test_decode_content_is_rejected(self):
+        port = self.start_server(response_body=BODY)
+
+        with self.assertRaises(AssertionError):
+            self.request(self.connect(port, initial_window_size=CAPACITY), decode_content=True)
@@ -0,0 +1,102 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+from concurrent.futures import TimeoutError, wait
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT, free_port
+
+
+class TestHttpClientConnectionManager(HttpServerTestCase):
+
+    def new_manager(self, **kwargs):
+        manager = http.HttpClientConnectionManager(self.bootstrap, self.socket_options, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+
+    def test_released_connection_is_reused(self):
+        port = self.start_server(response_body=b'pooled')
+        manager = self.new_manager()
+
+        connection = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        request, body = self.get(connection)
+        self.assertEqual(200, request.response_code)
+        self.assertEqual(b'pooled', body)
+        manager.release_connection(connection)
+
+        self.assertIs(connection, manager.acquire_connection('127.0.0.1', port).result(TIMEOUT))
+        manager.release_connection(connection)
+
+    def test_waiter_gets_released_connection(self):
+        port = self.start_server()
+        manager = self.new_manager(max_connections_per_endpoint=2)
+
+        first = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        second = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        waiter = manager.acquire_connection('127.0.0.1', port)
+        self.assertFalse(waiter.done())
+
+        manager.release_connection(second)
+        self.assertIs(second, waiter.result(TIMEOUT))
+
+        manager.release_connection(first)
+        manager.release_connection(second)
+
+    def test_waiter_connects_when_leased_connection_dies(self):
+        port = self.start_server()
+        manager = self.new_manager(max_connections_per_endpoint=1)
+
+        connection = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        waiter = manager.acquire_connection('127.0.0.1', port)
+        connection.close()
+        manager.release_connection(connection)
+
+        replacement = waiter.result(TIMEOUT)
+        self.assertIsNot(connection, replacement)
+        self.assertTrue(replacement.is_open())
+        manager.release_connection(replacement)
+
+    def test_acquire_timeout(self):
+        port = self.start_server()
+        manager = self.new_manager(max_connections_per_endpoint=1)
+
+        connection = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        waiter = manager.acquire_connection('127.0.0.1', port, timeout_ms=50)
+        self.assertRaises(TimeoutError, waiter.result, TIMEOUT)
+
+        # the waiter that timed out doesn't swallow the connection
+        manager.release_connection(connection)
+        self.assertIs(connection, manager.acquire_connection('127.0.0.1', port).result(TIMEOUT))
+        manager.release_connection(connection)
+
+    def test_queued_waiters_fail_when_endpoint_refuses(self):
+        port = free_port()
+        manager = self.new_manager(max_connections_per_endpoint=2)
+
+        futures = [manager.acquire_connection('127.0.0.1', port) for _ in range(6)]
+        done, not_done = wait(futures, TIMEOUT)
+        self.assertEqual(0, len(not_done))
+        for future in futures:
+            self.assertIsInstance(future.exception(), http.CrtError)
+
+    def test_close_fails_waiters(self):
+        port = self.start_server()
+        manager = self.new_manager(max_connections_per_endpoint=1)
+
+        connection = manager.acquire_connection('127.0.0.1', port).result(TIMEOUT)
+        waiter = manager.acquire_connection('127.0.0.1', port)
+        manager.close()
+
+        self.assertIsNotNone(waiter.exception(TIMEOUT))
+        self.assertIsNotNone(manager.acquire_connection('127.0.0.1', port).exception(TIMEOUT))
+        manager.release_connection(connection)
+        self.assertFalse(connection.is_open())
@@ -0,0 +1,133 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import gzip
+import io as py_io
+import unittest
+import zlib
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT
+
+BODY = b''.join(b'line %d of a body that compresses well\n' % i for i in range(2000))
+
+
+def gzip_bytes(data):
+    out = py_io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as fh:
+        fh.write(data)
+    return out.getvalue()
+
+
+def raw_deflate_bytes(data):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+@unittest.skipUnless(http.is_content_encoding_available(), 'built without zlib')
+class TestDecodeContent(HttpServerTestCase):
+
+    def fetch(self, encoding, encoded_body):
+        port = self.start_server(response_headers={'content-encoding': encoding}, response_body=encoded_body)
+        return self.get(self.connect(port), decode_content=True)
+
+    def test_gzip(self):
+        request, body = self.fetch('gzip', gzip_bytes(BODY))
+        self.assertEqual(BODY, body)
+        # headers are left as they came, content-length describes the encoded body
+        self.assertEqual('gzip', request.response_headers.get('content-encoding'))
+
+    def test_gzip_members(self):
+        _, body = self.fetch('gzip', gzip_bytes(BODY) + gzip_bytes(BODY))
+        self.assertEqual(BODY + BODY, body)
+
+    def test_zlib_deflate(self):
+        _, body = self.fetch('deflate', zlib.compress(BODY))
+        self.assertEqual(BODY, body)
+
+    def test_raw_deflate(self):
+        _, body = self.fetch('deflate', raw_deflate_bytes(BODY))
+        self.assertEqual(BODY, body)
+
+    def test_identity_is_untouched(self):
+        _, body = self.fetch('identity', BODY)
+        self.assertEqual(BODY, body)
+
+    def test_accept_encoding_is_sent(self):
+        seen = []
+
+        def on_incoming_request(request):
+            seen.append(request.headers.get('accept-encoding'))
+            return 200, {'content-encoding': 'gzip'}, gzip_bytes(b'hi')
+
+        port = self.start_server(on_incoming_request=on_incoming_request)
+        _, body = self.get(self.connect(port), decode_content=True)
+        self.assertEqual(b'hi', body)
+        self.assertEqual(['gzip, deflate'], seen)
+
+    def test_truncated_gzip_fails(self):
+        encoded = gzip_bytes(BODY)
+        with self.assertRaises(http.CrtError):
+            self.fetch('gzip', encoded[:len(encoded) // 2])
+
+    def test_truncated_trailer_fails(self):
+        # all of the data is there, only the gzip trailer is cut short
+        encoded = gzip_bytes(BODY)
+        with self.assertRaises(http.CrtError):
+            self.fetch('gzip', encoded[:-4])
+
+    def test_truncated_deflate_fails(self):
+        encoded = raw_deflate_bytes(BODY)
+        with self.assertRaises(http.CrtError):
+            self.fetch('deflate', encoded[:len(encoded) // 2])
+
+    def test_corrupt_body_fails(self):
+        with self.assertRaises(http.CrtError):
+            self.fetch('gzip', b'\x1f\x8b' + b'\xff' * 64)
+
+
+@unittest.skipUnless(http.is_content_encoding_available(), 'built without zlib')
+class TestCompressOutgoingBody(HttpServerTestCase):
+
+    def put(self, port, body, headers=None):
+        """
+        PUTs body with compress_outgoing_body=True, returns the response body.
+        """
+        if headers is None:
+            headers = {'host': 'localhost'}
+        chunks = []
+        request = self.connect(port).make_request('PUT', '/', headers, body, lambda chunk: chunks.append(bytes(chunk)),
+                                                  compress_outgoing_body=True)
+        request.response_completed.result(TIMEOUT)
+        return b''.join(chunks)
+
+    def test_echoed_body_is_gzip(self):
+        port = self.start_server(echo=True)
+        sent = self.put(port, BODY)
+        self.assertLess(len(sent), len(BODY))
+        self.assertEqual(BODY, zlib.decompress(sent, 16 + zlib.MAX_WBITS))
+
+    def test_encoding_headers_describe_the_compressed_body(self):
+        seen = []
+
+        def on_incoming_request(request):
+            seen.append((request.headers, bytes(request.body)))
+            return 200, None, None
+
+        port = self.start_server(on_incoming_request=on_incoming_request)
+        # lengths python worked out for the uncompressed body must not reach the wire
+        self.put(port, BODY, {'host': 'localhost', 'content-length': str(len(BODY))})
+
+        headers, body = seen[0]
+        self.assertEqual('gzip', headers.get('content-encoding'))
+        self.assertEqual(str(len(body)), headers.get('content-length'))
+        self.assertEqual(BODY, zlib.decompress(body, 16 + zlib.MAX_WBITS))
@@ -0,0 +1,57 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import unittest
+from awscrt import http
+from test import HttpServerTestCase
+
+# a dict can only repeat a header name by spelling it differently
+COOKIES = {'Set-Cookie': 'a=1', 'set-cookie': 'b=2', 'SET-COOKIE': 'c=3'}
+
+
+class TestHttpHeaders(unittest.TestCase):
+
+    def test_lookups_ignore_case(self):
+        headers = http.HttpHeaders.from_dict({'Content-Type': 'text/plain'})
+        self.assertEqual('text/plain', headers.get('content-type'))
+        self.assertEqual('text/plain', headers['CONTENT-TYPE'])
+        self.assertIn('content-TYPE', headers)
+
+    def test_missing_names(self):
+        headers = http.HttpHeaders.from_dict({'a': '1'})
+        self.assertIsNone(headers.get('b'))
+        self.assertEqual('x', headers.get('b', 'x'))
+        self.assertEqual([], headers.get_values('b'))
+        self.assertNotIn('b', headers)
+        with self.assertRaises(KeyError):
+            headers['b']
+
+    def test_repeated_names_keep_every_value(self):
+        headers = http.HttpHeaders.from_dict(COOKIES)
+        self.assertEqual(3, len(headers))
+        self.assertEqual(sorted(COOKIES.values()), sorted(headers.get_values('set-cookie')))
+        self.assertEqual(sorted(COOKIES.items()), sorted(headers.items()))
+        self.assertEqual(sorted(COOKIES.keys()), sorted(headers.keys()))
+
+
+class TestResponseHeaders(HttpServerTestCase):
+
+    def test_repeated_response_headers_keep_every_value(self):
+        port = self.start_server(response_headers=COOKIES)
+        request, _ = self.get(self.connect(port))
+
+        headers = request.response_headers
+        self.assertEqual(sorted(COOKIES.values()), sorted(headers.get_values('Set-Cookie')))
+        self.assertIn(headers.get('set-cookie'), COOKIES.values())
+        self.assertEqual(3, sum(1 for name in headers.keys() if name.lower() == 'set-cookie'))
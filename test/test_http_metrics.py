@@ -0,0 +1,47 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+from awscrt import http
+from test import HttpServerTestCase
+
+BODY = b'metrics' * 100
+
+
+class TestHttpMetrics(HttpServerTestCase):
+
+    def test_connection_metrics_count_completed_requests(self):
+        port = self.start_server(response_body=BODY)
+        connection = self.connect(port)
+        request, body = self.get(connection)
+        self.assertEqual(BODY, body)
+
+        metrics = connection.metrics()
+        self.assertEqual(1, metrics.request_count)
+        self.assertEqual(len(BODY), metrics.bytes_received)
+        self.assertIsNotNone(metrics.connect_start)
+        self.assertIsNone(metrics.tls_negotiated)
+        self.assertLessEqual(metrics.connect_start, metrics.established)
+
+        request_metrics = request.metrics()
+        self.assertEqual(len(BODY), request_metrics.bytes_received)
+        self.assertLessEqual(request_metrics.request_made, request_metrics.completed)
+
+    def test_unconnected_connection_has_empty_metrics(self):
+        connection = http.HttpClientConnection(self.bootstrap, None, None)
+
+        metrics = connection.metrics()
+        self.assertIsNone(metrics.connect_start)
+        self.assertIsNone(metrics.established)
+        self.assertEqual(0, metrics.request_count)
+        self.assertEqual(0, metrics.bytes_sent)
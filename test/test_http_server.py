@@ -0,0 +1,88 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import time
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT, free_port
+
+
+class TestHttpServer(HttpServerTestCase):
+
+    def request(self, connection, method='GET', path='/', body=None):
+        """
+        Sends a request and waits for it to complete, returns (request, response body).
+        """
+        chunks = []
+        headers = {'host': 'localhost'}
+        request = connection.make_request(method, path, headers, body, lambda chunk: chunks.append(bytes(chunk)))
+        request.response_completed.result(TIMEOUT)
+        return request, b''.join(chunks)
+
+    def test_static_response(self):
+        port = self.start_server(response_status=202, response_headers={'x-static': 'yes'}, response_body=b'static')
+        connection = self.connect(port)
+
+        for path in ('/', '/other'):
+            request, body = self.request(connection, path=path)
+            self.assertEqual(202, request.response_code)
+            self.assertEqual('yes', request.response_headers.get('x-static'))
+            self.assertEqual('6', request.response_headers.get('content-length'))
+            self.assertEqual(b'static', body)
+
+    def test_echo(self):
+        port = self.start_server(echo=True)
+        request, body = self.request(self.connect(port), 'PUT', body=b'echo me')
+        self.assertEqual(200, request.response_code)
+        self.assertEqual(b'echo me', body)
+
+    def test_on_incoming_request(self):
+        seen = []
+
+        def on_incoming_request(request):
+            seen.append((request.method, request.path_and_query, request.headers.get('host'), bytes(request.body)))
+            return 201, {'x-handled': 'yes'}, b'handled'
+
+        port = self.start_server(on_incoming_request=on_incoming_request)
+        request, body = self.request(self.connect(port), 'POST', '/path?query=1', b'request body')
+
+        self.assertEqual([('POST', '/path?query=1', 'localhost', b'request body')], seen)
+        self.assertEqual(201, request.response_code)
+        self.assertEqual('yes', request.response_headers.get('x-handled'))
+        self.assertEqual(b'handled', body)
+
+    def test_raising_handler_closes_the_connection(self):
+        def on_incoming_request(request):
+            raise RuntimeError('handler failed')
+
+        port = self.start_server(on_incoming_request=on_incoming_request)
+        connection = self.connect(port)
+        with self.assertRaises(http.CrtError):
+            self.request(connection)
+
+    def test_request_count(self):
+        port = self.start_server(response_body=b'')
+        connection = self.connect(port)
+        for _ in range(3):
+            self.request(connection)
+
+        # the server finishes with a request just after the client has its response
+        deadline = time.time() + TIMEOUT
+        while self.servers[-1].request_count() < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(3, self.servers[-1].request_count())
+
+    def test_close_completes_shutdown_future(self):
+        server = http.HttpServer(self.bootstrap, '127.0.0.1', free_port(), self.socket_options)
+        self.assertIs(server.shutdown_future, server.close())
+        self.assertIsNone(server.shutdown_future.result(TIMEOUT))
@@ -0,0 +1,63 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import logging
+import threading
+from awscrt import io
+from test import HttpServerTestCase, TIMEOUT
+
+
+class TestBackgroundLogging(HttpServerTestCase):
+    """
+    The first logger installed stays for the life of the process, so everything is checked in one test.
+    """
+
+    def test_full_queue_drops_and_counts(self):
+        release = threading.Event()
+        handled = []
+
+        class BlockingHandler(logging.Handler):
+            def emit(self, record):
+                # holds up the writer thread so the queue fills behind it
+                release.wait(TIMEOUT)
+                handled.append(record)
+
+        logger = logging.getLogger('awscrt.test_logging')
+        logger.propagate = False
+        logger.setLevel(1)
+        logger.addHandler(BlockingHandler())
+
+        io.init_logging_to_python(io.LogLevel.Trace, logger, queue_size=16, batch_size=1)
+        self.addCleanup(io.shutdown_logging)
+
+        # connecting and making requests logs far more than 16 records at trace level
+        port = self.start_server(response_body=b'hello')
+        connection = self.connect(port)
+        for _ in range(5):
+            _, body = self.get(connection)
+            self.assertEqual(b'hello', body)
+        connection.close()
+
+        release.set()
+        io.shutdown_logging()
+
+        stats = io.logging_stats()
+        self.assertGreater(stats.dropped, 0)
+        self.assertGreater(stats.written, 0)
+        self.assertEqual(len(handled), stats.written)
+        self.assertTrue(all(hasattr(record, 'crt_subject') for record in handled))
+
+        # once stopped, records are still counted but never written
+        self.get(self.connect(port))
+        self.assertEqual(stats.written, io.logging_stats().written)
+        self.assertGreater(io.logging_stats().dropped, stats.dropped)
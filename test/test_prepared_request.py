@@ -0,0 +1,90 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import threading
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT
+
+
+class TestPreparedRequest(HttpServerTestCase):
+
+    def start_recording_server(self):
+        """
+        Starts a server that answers every request with its path. Returns (port, seen) where seen gets an
+        HttpServerRequest, with the body copied to bytes, for every request.
+        """
+        seen = []
+
+        def on_incoming_request(request):
+            seen.append(http.HttpServerRequest(request.method, request.path_and_query, request.headers,
+                                               bytes(request.body)))
+            return 200, None, request.path_and_query.encode('utf-8')
+
+        return self.start_server(on_incoming_request=on_incoming_request), seen
+
+    def test_prepared_headers_are_sent_with_overrides(self):
+        port, seen = self.start_recording_server()
+        connection = self.connect(port)
+        prepared = http.PreparedRequest('GET', {'host': 'localhost', 'x-common': 'yes', 'X-Replaced': 'old'})
+
+        request = prepared.make_request(connection, '/a', {'x-replaced': 'new', 'x-extra': '1'})
+        self.assertEqual(0, request.response_completed.result(TIMEOUT))
+        self.assertEqual(200, request.response_code)
+
+        headers = seen[0].headers
+        self.assertEqual('/a', seen[0].path_and_query)
+        self.assertEqual('yes', headers.get('x-common'))
+        self.assertEqual(['new'], headers.get_values('x-replaced'))
+        self.assertEqual('1', headers.get('x-extra'))
+
+    def test_prepared_headers_are_reused_unchanged(self):
+        port, seen = self.start_recording_server()
+        connection = self.connect(port)
+        prepared = http.PreparedRequest('GET', {'host': 'localhost', 'x-common': 'yes'})
+
+        for path in ('/1', '/2', '/3'):
+            prepared.make_request(connection, path, {'x-path': path}).response_completed.result(TIMEOUT)
+
+        self.assertEqual(['/1', '/2', '/3'], [request.path_and_query for request in seen])
+        self.assertEqual(['/1', '/2', '/3'], [request.headers.get('x-path') for request in seen])
+        self.assertTrue(all(request.headers.get('x-common') == 'yes' for request in seen))
+
+    def test_on_complete_replaces_the_futures(self):
+        port, _ = self.start_recording_server()
+        connection = self.connect(port)
+        prepared = http.PreparedRequest('GET', {'host': 'localhost'})
+        done = threading.Event()
+        completions = []
+        chunks = []
+
+        def on_complete(request, error_code):
+            completions.append((request, error_code))
+            done.set()
+
+        request = prepared.make_request(connection, '/done', on_incoming_body=lambda chunk: chunks.append(chunk),
+                                        on_complete=on_complete)
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual([(request, 0)], completions)
+        self.assertIsNone(request.response_completed)
+        self.assertEqual(b'/done', b''.join(chunks))
+
+    def test_body(self):
+        port, seen = self.start_recording_server()
+        connection = self.connect(port)
+        prepared = http.PreparedRequest('PUT', {'host': 'localhost'})
+
+        prepared.make_request(connection, '/', on_outgoing_body=b'payload').response_completed.result(TIMEOUT)
+        self.assertEqual('PUT', seen[0].method)
+        self.assertEqual(b'payload', seen[0].body)
+        self.assertEqual('7', seen[0].headers.get('content-length'))
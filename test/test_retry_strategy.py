@@ -0,0 +1,137 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import threading
+from awscrt import http
+from test import HttpServerTestCase, TIMEOUT, free_port
+
+
+class TestRetryStrategy(HttpServerTestCase):
+
+    def strategy(self, **kwargs):
+        kwargs.setdefault('base_backoff_ms', 1)
+        return http.RetryStrategy(self.elg, **kwargs)
+
+    def test_backoff_is_full_jitter_within_the_ceiling(self):
+        strategy = self.strategy(base_backoff_ms=100, max_backoff_ms=1000)
+        for attempt, ceiling in enumerate([100, 200, 400, 800, 1000, 1000]):
+            delays = [strategy.backoff_ms(attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            # spread over the whole range rather than bunched at the top
+            self.assertLess(min(delays), ceiling // 4)
+            self.assertGreater(max(delays), ceiling * 3 // 4)
+
+    def test_backoff_of_late_attempts_stays_capped(self):
+        strategy = self.strategy(base_backoff_ms=100, max_backoff_ms=1000)
+        self.assertLessEqual(strategy.backoff_ms(1000), 1000)
+
+    def test_schedule_retry_runs_callback_and_takes_tokens(self):
+        strategy = self.strategy(max_tokens=20, retry_cost=5)
+        ran = threading.Event()
+
+        self.assertTrue(strategy.schedule_retry(0, ran.set, response_code=503))
+        self.assertTrue(ran.wait(TIMEOUT))
+        self.assertEqual(15, strategy.available_tokens())
+
+    def test_no_retry_past_max_retries(self):
+        strategy = self.strategy(max_retries=2)
+        self.assertTrue(strategy.schedule_retry(1, lambda: None, response_code=503))
+        self.assertFalse(strategy.schedule_retry(2, lambda: None, response_code=503))
+
+    def test_no_retry_for_other_statuses(self):
+        strategy = self.strategy()
+        self.assertFalse(strategy.schedule_retry(0, lambda: None, response_code=404))
+        self.assertEqual(strategy.max_tokens, strategy.available_tokens())
+
+    def test_empty_bucket_stops_retries(self):
+        strategy = self.strategy(max_retries=100, max_tokens=10, retry_cost=5, success_refill=3)
+        self.assertTrue(strategy.schedule_retry(0, lambda: None, response_code=503))
+        self.assertTrue(strategy.schedule_retry(0, lambda: None, response_code=503))
+        self.assertFalse(strategy.schedule_retry(0, lambda: None, response_code=503))
+
+        strategy.record_success()
+        self.assertEqual(3, strategy.available_tokens())
+        for _ in range(10):
+            strategy.record_success()
+        self.assertEqual(10, strategy.available_tokens())
+
+
+class TestRetriedRequests(HttpServerTestCase):
+
+    def start_counting_server(self, statuses):
+        """
+        Starts a server answering with each of statuses in turn, then 200s. Returns (port, calls) where calls is a
+        list that gets the path of every request.
+        """
+        statuses = list(statuses)
+        calls = []
+        lock = threading.Lock()
+
+        def on_incoming_request(request):
+            with lock:
+                calls.append(request.path_and_query)
+                status = statuses.pop(0) if statuses else 200
+            return status, None, b'status %d' % status
+
+        return self.start_server(on_incoming_request=on_incoming_request), calls
+
+    def manager(self, strategy):
+        manager = http.HttpClientConnectionManager(self.bootstrap, self.socket_options, retry_strategy=strategy)
+        self.addCleanup(manager.close)
+        return manager
+
+    def request(self, manager, port):
+        return manager.make_request('127.0.0.1', port, 'GET', '/', {'host': 'localhost'}).result(TIMEOUT)
+
+    def test_retryable_statuses_are_retried(self):
+        strategy = http.RetryStrategy(self.elg, base_backoff_ms=1, max_tokens=100, retry_cost=5, success_refill=1)
+        port, calls = self.start_counting_server([503, 500])
+
+        response = self.request(self.manager(strategy), port)
+        self.assertEqual(200, response.response_code)
+        self.assertEqual(b'status 200', response.body)
+        self.assertEqual(3, len(calls))
+        self.assertEqual(100 - 5 - 5 + 1, strategy.available_tokens())
+
+    def test_last_response_once_retries_run_out(self):
+        strategy = http.RetryStrategy(self.elg, max_retries=2, base_backoff_ms=1)
+        port, calls = self.start_counting_server([503] * 10)
+
+        response = self.request(self.manager(strategy), port)
+        self.assertEqual(503, response.response_code)
+        self.assertEqual(3, len(calls))
+
+    def test_other_statuses_are_not_retried(self):
+        strategy = http.RetryStrategy(self.elg, base_backoff_ms=1)
+        port, calls = self.start_counting_server([404])
+
+        self.assertEqual(404, self.request(self.manager(strategy), port).response_code)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(strategy.max_tokens, strategy.available_tokens())
+
+    def test_refused_connections_are_retried(self):
+        strategy = http.RetryStrategy(self.elg, max_retries=2, base_backoff_ms=1, max_tokens=100, retry_cost=5)
+        manager = self.manager(strategy)
+
+        future = manager.acquire_connection('127.0.0.1', free_port())
+        self.assertIsInstance(future.exception(TIMEOUT), http.CrtError)
+        self.assertEqual(100 - 2 * 5, strategy.available_tokens())
+
+    def test_per_request_strategy_retries_connecting(self):
+        strategy = http.RetryStrategy(self.elg, max_retries=2, base_backoff_ms=1, max_tokens=100, retry_cost=5)
+        manager = self.manager(None)
+
+        future = manager.make_request('127.0.0.1', free_port(), 'GET', '/', {'host': 'localhost'},
+                                      retry_strategy=strategy)
+        self.assertIsInstance(future.exception(TIMEOUT), http.CrtError)
+        self.assertEqual(100 - 2 * 5, strategy.available_tokens())
@@ -0,0 +1,65 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+
+import unittest
+from awscrt import io
+
+
+class TestSharedTlsContext(unittest.TestCase):
+
+    def test_equal_options_share_a_context(self):
+        first = io.ClientTlsContext(io.TlsContextOptions())
+        size = io.tls_context_cache_size()
+        second = io.ClientTlsContext(io.TlsContextOptions())
+        self.assertIs(first._internal_tls_ctx, second._internal_tls_ctx)
+        self.assertEqual(size, io.tls_context_cache_size())
+
+    def test_different_options_get_their_own_context(self):
+        options = io.TlsContextOptions()
+        other_options = io.TlsContextOptions()
+        other_options.verify_peer = False
+
+        first = io.ClientTlsContext(options)
+        second = io.ClientTlsContext(other_options)
+        self.assertIsNot(first._internal_tls_ctx, second._internal_tls_ctx)
+
+    def test_buffers_are_compared_by_content(self):
+        options = io.TlsContextOptions()
+        options.alpn_list = 'http/1.1'
+        options.ca_buffer = b'-----BEGIN CERTIFICATE-----'
+        same = io.TlsContextOptions()
+        same.alpn_list = 'http/1.1'
+        same.ca_buffer = b''.join([b'-----BEGIN ', b'CERTIFICATE-----'])
+        self.assertEqual(options._cache_key(), same._cache_key())
+
+        same.ca_buffer = b'-----BEGIN CERTIFICATE-----\n'
+        self.assertNotEqual(options._cache_key(), same._cache_key())
+
+    def test_options_read_from_paths_are_never_shared(self):
+        options = io.TlsContextOptions()
+        options.ca_path = '/etc/ssl/certs'
+        self.assertIsNone(options._cache_key())
+
+        pkcs12_options = io.TlsContextOptions.create_client_with_mtls_pkcs12('client.p12', 'password')
+        self.assertIsNone(pkcs12_options._cache_key())
+
+    def test_contexts_leave_the_cache_with_their_last_user(self):
+        options = io.TlsContextOptions()
+        options.alpn_list = 'x-test-only'
+        size = io.tls_context_cache_size()
+
+        context = io.ClientTlsContext(options)
+        self.assertEqual(size + 1, io.tls_context_cache_size())
+        del context
+        self.assertEqual(size, io.tls_context_cache_size())
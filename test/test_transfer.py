@@ -0,0 +1,193 @@
+# Copyright 2010-2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#  http://aws.amazon.com/apache2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import shutil
+import tempfile
+import threading
+from awscrt import http, transfer
+from test import HttpServerTestCase, TIMEOUT
+
+OBJECT = os.urandom(1000)
+PART_SIZE = 100
+
+
+def range_handler(data, errors=None, ignore_range=False):
+    """
+    Returns an on_incoming_request that serves data to range requests. errors maps the first byte of a range to a
+    list of (status, headers, body) responses that requests for that range get, one each, before the data.
+    """
+    errors = dict(errors or {})
+    lock = threading.Lock()
+
+    def on_incoming_request(request):
+        if ignore_range:
+            return 200, None, data
+
+        first, _, last = request.headers.get('range').split('=', 1)[1].partition('-')
+        first, last = int(first), int(last)
+        with lock:
+            pending = errors.get(first)
+            if pending:
+                return pending.pop(0)
+
+        if first >= len(data):
+            return 416, {'content-range': 'bytes */{}'.format(len(data))}, b'range not satisfiable'
+
+        last = min(last, len(data) - 1)
+        return 206, {'content-range': 'bytes {}-{}/{}'.format(first, last, len(data))}, data[first:last + 1]
+
+    return on_incoming_request
+
+
+class TransferTestCase(HttpServerTestCase):
+
+    def setUp(self):
+        super(TransferTestCase, self).setUp()
+        self.manager = http.HttpClientConnectionManager(self.bootstrap, self.socket_options)
+        self.addCleanup(self.manager.close)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read(self, path):
+        with open(path, 'rb') as fh:
+            return fh.read()
+
+
+class TestParallelDownloader(TransferTestCase):
+
+    def download(self, port, destination):
+        downloader = transfer.ParallelDownloader(self.manager, '127.0.0.1', port, part_size=PART_SIZE,
+                                                 max_parallel=4, max_retries=2)
+        return downloader.download('/object', destination)
+
+    def test_parts_reassemble_into_file(self):
+        port = self.start_server(on_incoming_request=range_handler(OBJECT))
+        destination = self.path('object')
+
+        self.assertEqual(len(OBJECT), self.download(port, destination).result(TIMEOUT))
+        self.assertEqual(OBJECT, self.read(destination))
+
+    def test_parts_reassemble_into_buffer(self):
+        port = self.start_server(on_incoming_request=range_handler(OBJECT))
+        destination = bytearray(len(OBJECT))
+
+        self.assertEqual(len(OBJECT), self.download(port, destination).result(TIMEOUT))
+        self.assertEqual(OBJECT, bytes(destination))
+
+    def test_server_ignoring_ranges(self):
+        port = self.start_server(on_incoming_request=range_handler(OBJECT, ignore_range=True))
+        destination = self.path('object')
+
+        self.assertEqual(len(OBJECT), self.download(port, destination).result(TIMEOUT))
+        self.assertEqual(OBJECT, self.read(destination))
+
+    def test_empty_object(self):
+        port = self.start_server(on_incoming_request=range_handler(b''))
+        destination = self.path('object')
+        with open(destination, 'wb') as fh:
+            fh.write(b'stale contents')
+
+        self.assertEqual(0, self.download(port, destination).result(TIMEOUT))
+        # the 416's own body must not end up in the file
+        self.assertEqual(b'', self.read(destination))
+
+    def test_empty_object_leaves_buffer_alone(self):
+        port = self.start_server(on_incoming_request=range_handler(b''))
+        destination = bytearray(b'\0' * 64)
+
+        self.assertEqual(0, self.download(port, destination).result(TIMEOUT))
+        self.assertEqual(b'\0' * 64, bytes(destination))
+
+    def test_retried_part_error_body_is_discarded(self):
+        # the error page is longer than the part, written out it would run past the end of the object
+        last_part = len(OBJECT) - PART_SIZE
+        errors = {last_part: [(503, None, b'E' * 500)]}
+        port = self.start_server(on_incoming_request=range_handler(OBJECT, errors))
+        destination = self.path('object')
+
+        self.assertEqual(len(OBJECT), self.download(port, destination).result(TIMEOUT))
+        self.assertEqual(OBJECT, self.read(destination))
+
+    def test_failed_part_error_body_is_discarded(self):
+        errors = {300: [(404, None, b'N' * PART_SIZE)]}
+        port = self.start_server(on_incoming_request=range_handler(OBJECT, errors))
+        destination = bytearray(len(OBJECT))
+
+        self.assertIsNotNone(self.download(port, destination).exception(TIMEOUT))
+        self.assertNotIn(b'N' * 10, bytes(destination))
+
+    def test_probe_error_fails(self):
+        errors = {0: [(403, None, b'forbidden')]}
+        port = self.start_server(on_incoming_request=range_handler(OBJECT, errors))
+        destination = self.path('object')
+
+        self.assertIsNotNone(self.download(port, destination).exception(TIMEOUT))
+        self.assertEqual(b'', self.read(destination))
+
+
+class TestParallelUploader(TransferTestCase):
+
+    def start_receiver(self, statuses=None):
+        """
+        Starts a server that keeps every part's body by its content-range, returns (port, parts).
+        statuses is a list of statuses that requests get, one each, before they start succeeding.
+        """
+        parts = {}
+        statuses = list(statuses or [])
+        lock = threading.Lock()
+
+        def on_incoming_request(request):
+            with lock:
+                if statuses:
+                    return statuses.pop(0), None, b'try again'
+                content_range = request.headers.get('content-range')
+                parts[transfer._parse_content_range(content_range)[0]] = bytes(request.body)
+            return 200, {'etag': str(len(parts))}, None
+
+        return self.start_server(on_incoming_request=on_incoming_request), parts
+
+    def upload(self, port, source):
+        uploader = transfer.ParallelUploader(self.manager, '127.0.0.1', port, part_size=PART_SIZE, max_parallel=4,
+                                             max_retries=2)
+        return uploader.upload('PUT', '/object', source)
+
+    def test_buffer_parts_reassemble(self):
+        port, parts = self.start_receiver()
+
+        responses = self.upload(port, OBJECT).result(TIMEOUT)
+        self.assertEqual(len(OBJECT) // PART_SIZE, len(responses))
+        self.assertEqual(OBJECT, b''.join(parts[first] for first in sorted(parts)))
+
+    def test_file_parts_reassemble(self):
+        port, parts = self.start_receiver()
+        source = self.path('object')
+        with open(source, 'wb') as fh:
+            fh.write(OBJECT)
+
+        self.upload(port, source).result(TIMEOUT)
+        self.assertEqual(OBJECT, b''.join(parts[first] for first in sorted(parts)))
+
+    def test_server_errors_are_retried(self):
+        port, parts = self.start_receiver(statuses=[500, 503])
+
+        self.upload(port, OBJECT).result(TIMEOUT)
+        self.assertEqual(OBJECT, b''.join(parts[first] for first in sorted(parts)))
+
+    def test_client_error_fails(self):
+        port, _ = self.start_receiver(statuses=[400])
+
+        self.assertIsNotNone(self.upload(port, OBJECT).exception(TIMEOUT))